@@ -0,0 +1,56 @@
+from django.contrib import admin
+from django.utils.html import format_html
+from django.utils.translation import gettext_lazy as _
+
+from .jobs import retry
+from .models import Job, RequestProfile
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('created', 'method', 'path', 'view', 'status',
+                    'duration', 'samples', 'triggered')
+    list_filter = ('view', 'triggered')
+    search_fields = ('path',)
+    list_select_related = ('user',)
+    readonly_fields = ('created', 'view', 'method', 'path', 'user', 'status',
+                       'duration', 'samples', 'triggered', 'file',
+                       'get_stacks')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Стеки (collapsed, для flamegraph)')
+    def get_stacks(self, obj):
+        try:
+            stacks = obj.file_path.read_text(encoding='utf-8')
+        except FileNotFoundError:
+            stacks = ''
+        return format_html('<pre style="white-space: pre">{}</pre>', stacks)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at', 'created')
+    list_filter = ('status', 'name')
+    readonly_fields = ('name', 'payload', 'status', 'attempts',
+                       'max_attempts', 'run_at', 'created', 'started',
+                       'heartbeat', 'get_error')
+    exclude = ('last_error',)
+    actions = ('retry_jobs',)
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description='Последняя ошибка')
+    def get_error(self, obj):
+        return format_html('<pre style="white-space: pre">{}</pre>',
+                           obj.last_error)
+
+    @admin.action(description=_('Повторить'))
+    def retry_jobs(self, request, queryset):
+        self.message_user(
+            request, _('Поставлено в очередь: {}.').format(retry(queryset)))
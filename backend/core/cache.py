@@ -0,0 +1,216 @@
+"""Кеш с отдачей устаревших данных на время пересчёта (stale-while-revalidate).
+
+Запись живёт HARD_TTL секунд, свежей считается SOFT_TTL. Устаревшую
+запись пересчитывает один процесс — тот, кто взял блокировку, — а
+остальные в это время получают старое значение. Номер блокировки
+(fencing token) растёт с каждым захватом, и запись от процесса, чья
+блокировка уже истекла, не затирает более новую: сравнение номеров и
+запись атомарны (compare_and_set).
+
+Если пересчёт падает с ошибкой базы или идёт дольше SLOW секунд,
+срабатывает предохранитель: пока он открыт, пересчёт не запускается и
+отдаются устаревшие данные.
+"""
+import hashlib
+import logging
+import threading
+import time
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.memcached import PyMemcacheCache
+from django.db import DatabaseError, transaction
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def request_key(request):
+    """Ключ по хосту и полному пути: ссылки в ответе абсолютные."""
+    return hashlib.sha256(
+        f'{request.get_host()}{request.get_full_path()}'.encode(),
+    ).hexdigest()
+
+
+_local_lock = threading.Lock()
+
+
+def compare_and_set(cache, key, update, timeout, attempts=5):
+    """Атомарно заменяет значение по ключу на update(текущее значение).
+
+    update возвращает новое значение или None — оставить как есть.
+    В memcached это gets/cas с повтором, если значение успели изменить;
+    кеш в памяти процесса защищает блокировка потоков. Для прочих
+    бэкендов get и set не атомарны. Возвращает True, если записали.
+    """
+    if isinstance(cache, PyMemcacheCache):
+        client = cache._cache
+        key = cache.make_key(key)
+        cache.validate_key(key)
+        timeout = cache.get_backend_timeout(timeout)
+        for _ in range(attempts):
+            current, cas_id = client.gets(key)
+            value = update(current)
+            if value is None:
+                return False
+            if cas_id is None:
+                if client.add(key, value, timeout):
+                    return True
+            elif client.cas(key, value, cas_id, timeout):
+                return True
+        return False
+    with _local_lock if isinstance(cache, LocMemCache) else nullcontext():
+        value = update(cache.get(key))
+        if value is None:
+            return False
+        cache.set(key, value, timeout)
+        return True
+
+
+class StaleCache:
+    cache = default_cache
+    timer = time.time
+
+    def __init__(self, namespace, **options):
+        self.namespace = namespace
+        self.config = {**settings.STALE_CACHE, **options}
+
+    def key(self, *parts):
+        return ':'.join(('swr', self.namespace, *map(str, parts)))
+
+    def get(self, key, compute, group=None):
+        """Значение по ключу; compute() считает его заново.
+
+        group — имя для точечной инвалидации (например, id рецепта).
+        """
+        keys = [self.key('entry', key), self.key('stale')]
+        if group is not None:
+            keys.append(self.key('stale', group))
+        found = self.cache.get_many(keys)
+        entry = found.get(keys[0])
+        stale_before = max(
+            (found.get(name, 0) for name in keys[1:]), default=0)
+        now = self.timer()
+        if entry is not None:
+            value, created, token = entry
+            if (now - created < self.config['SOFT_TTL']
+                    and created > stale_before):
+                metrics.cache_lookup(self.namespace, True)
+                return value
+            if self.breaker_open():
+                metrics.cache_lookup(self.namespace, True)
+                return value
+        metrics.cache_lookup(self.namespace, False)
+
+        token = self.acquire(key, entry)
+        if token is None and entry is not None:
+            # Пересчитывает другой процесс.
+            return entry[0]
+        if token is None:
+            value = self.wait(key)
+            if value is not None:
+                return value
+        try:
+            return self.compute(key, compute, token, entry)
+        finally:
+            if token is not None:
+                self.release(key, token)
+
+    def compute(self, key, compute, token, entry):
+        start = self.timer()
+        try:
+            value = compute()
+        except DatabaseError:
+            self.failure()
+            if entry is None:
+                raise
+            logger.warning('%s: отдаются устаревшие данные', self.namespace,
+                           exc_info=True)
+            return entry[0]
+        if self.timer() - start > self.config['SLOW']:
+            self.failure()
+        self.store(key, value, start, token)
+        return value
+
+    def store(self, key, value, created, token):
+        entry = (value, created, token)
+
+        def update(current):
+            # Запись с более новым токеном уже есть — наша устарела. Без
+            # токена (блокировку держал другой) чужую запись не трогаем.
+            if current is not None and (token is None or (
+                    current[2] is not None and current[2] > token)):
+                return None
+            return entry
+
+        compare_and_set(self.cache, self.key('entry', key), update,
+                        self.config['HARD_TTL'])
+
+    def acquire(self, key, entry=None):
+        """Номер блокировки или None, если её держит другой процесс.
+
+        Счётчик могут вытеснить из кеша. Пропавший счётчик или счётчик
+        ниже номера записи entry считается сброшенным и продолжается с
+        номера записи, иначе все новые записи отвергались бы как старые.
+        """
+        fence_key = self.key('fence', key)
+        stored = entry[2] if entry is not None and entry[2] else 0
+        try:
+            token = self.cache.incr(fence_key)
+        except ValueError:
+            self.cache.add(fence_key, stored, None)
+            token = self.cache.incr(fence_key)
+        if token <= stored:
+            token = self.cache.incr(fence_key, stored - token + 1)
+        if self.cache.add(
+                self.key('lock', key), token, self.config['LOCK_TTL']):
+            return token
+        return None
+
+    def release(self, key, token):
+        lock_key = self.key('lock', key)
+        if self.cache.get(lock_key) == token:
+            self.cache.delete(lock_key)
+
+    def wait(self, key):
+        """Ждёт значение, которое считает другой процесс, до LOCK_WAIT с."""
+        deadline = self.timer() + self.config['LOCK_WAIT']
+        while self.timer() < deadline:
+            time.sleep(0.05)
+            entry = self.cache.get(self.key('entry', key))
+            if entry is not None:
+                return entry[0]
+        return None
+
+    def failure(self):
+        failures_key = self.key('failures')
+        if self.cache.add(failures_key, 1, self.config['BREAKER_WINDOW']):
+            failures = 1
+        else:
+            try:
+                failures = self.cache.incr(failures_key)
+            except ValueError:
+                failures = 1
+        if failures >= self.config['BREAKER_THRESHOLD']:
+            self.cache.set(
+                self.key('open'), True, self.config['BREAKER_OPEN'])
+            self.cache.delete(failures_key)
+
+    def breaker_open(self):
+        return self.cache.get(self.key('open')) is not None
+
+    def invalidate(self, group=None):
+        """Помечает устаревшими все записи или записи группы.
+
+        Записи не удаляются: до пересчёта их ещё можно отдавать. Метка
+        ставится после фиксации транзакции, чтобы пересчёт увидел новые
+        данные.
+        """
+        def mark():
+            key = (self.key('stale') if group is None
+                   else self.key('stale', group))
+            self.cache.set(key, self.timer(), self.config['HARD_TTL'])
+        transaction.on_commit(mark)
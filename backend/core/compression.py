@@ -0,0 +1,86 @@
+import gzip
+import zlib
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def accepted(header):
+    """Accept-Encoding -> {кодировка: q}."""
+    result = {}
+    for item in header.split(','):
+        coding, *params = item.strip().lower().split(';')
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        result[coding] = q
+    return result
+
+
+def choose(header):
+    """Лучшая из поддерживаемых кодировок, br предпочтительнее gzip."""
+    codings = accepted(header)
+    supported = ('br', 'gzip') if brotli is not None else ('gzip',)
+    best = max(
+        supported,
+        key=lambda coding: codings.get(coding, codings.get('*', 0)))
+    if codings.get(best, codings.get('*', 0)) <= 0:
+        return None
+    return best
+
+
+def compress(content, coding):
+    config = settings.COMPRESSION
+    if coding == 'br':
+        return brotli.compress(
+            content, mode=brotli.MODE_TEXT, quality=config['BROTLI_QUALITY'])
+    return gzip.compress(content, compresslevel=config['GZIP_LEVEL'], mtime=0)
+
+
+class GzipStream:
+    def __init__(self):
+        # wbits 16 + MAX_WBITS — формат gzip с заголовком.
+        self.compressor = zlib.compressobj(
+            settings.COMPRESSION['GZIP_LEVEL'], zlib.DEFLATED,
+            16 + zlib.MAX_WBITS)
+
+    def write(self, chunk):
+        return (self.compressor.compress(chunk)
+                + self.compressor.flush(zlib.Z_SYNC_FLUSH))
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+class BrotliStream:
+    def __init__(self):
+        self.compressor = brotli.Compressor(
+            mode=brotli.MODE_TEXT,
+            quality=settings.COMPRESSION['BROTLI_QUALITY'])
+
+    def write(self, chunk):
+        return self.compressor.process(chunk) + self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+def compress_stream(chunks, coding):
+    """Сжатие потока: каждый кусок сразу уходит клиенту, не копится."""
+    stream = BrotliStream() if coding == 'br' else GzipStream()
+    for chunk in chunks:
+        data = stream.write(chunk)
+        if data:
+            yield data
+    yield stream.finish()
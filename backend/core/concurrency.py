@@ -0,0 +1,84 @@
+import asyncio
+import contextvars
+import copy
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.urls import URLResolver
+
+from .metrics import current_query_stats
+
+_executor = None
+
+
+def get_executor():
+    """Ограниченный пул потоков для работы с ORM в ASGI-режиме."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ASGI_ORM_THREADS,
+            thread_name_prefix='orm',
+        )
+    return _executor
+
+
+def _call(func, args, kwargs):
+    try:
+        with ExitStack() as stack:
+            stats = current_query_stats.get()
+            if stats is not None:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+            return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_sync(func, *args, **kwargs):
+    """Выполняет синхронный код (ORM, кеш) в пуле потоков.
+
+    Контекстные переменные запроса (реплики, метрики) передаются в поток.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        get_executor(), context.run, _call, func, args, kwargs)
+
+
+def async_view(view):
+    """Обёртка синхронного view для ASGI-режима.
+
+    Без неё Django 3.2 выполняет все синхронные view процесса
+    в одном потоке.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        def call():
+            response = view(request, *args, **kwargs)
+            if callable(getattr(response, 'render', None)):
+                response = response.render()
+            return response
+        return await run_sync(call)
+    return wrapper
+
+
+def asyncify_urlpatterns(patterns):
+    """Копии маршрутов, в которых синхронные view обёрнуты async_view.
+
+    Исходные маршруты не меняются: их могут использовать и другие
+    urlconf процесса.
+    """
+    result = []
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            pattern = URLResolver(
+                pattern.pattern, asyncify_urlpatterns(pattern.url_patterns),
+                pattern.default_kwargs, pattern.app_name, pattern.namespace)
+        elif not asyncio.iscoroutinefunction(pattern.callback):
+            pattern = copy.copy(pattern)
+            pattern.callback = async_view(pattern.callback)
+        result.append(pattern)
+    return result
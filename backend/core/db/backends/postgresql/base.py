@@ -0,0 +1,85 @@
+import contextvars
+
+from django.core.signals import request_started
+from django.db.backends.postgresql import base
+
+from ...pool import get_pool
+
+# Метка текущего HTTP-запроса. В ASGI-режиме она попадает в потоки
+# run_sync вместе с контекстом, так что соединение проверяется раз на
+# запрос, а не при каждом переходе в поток.
+current_request = contextvars.ContextVar('db_current_request', default=None)
+
+
+def start_request(**kwargs):
+    current_request.set(object())
+
+
+request_started.connect(start_request)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL с проверкой постоянных соединений и пулом.
+
+    Дополнительные ключи в настройках базы:
+    CONN_HEALTH_CHECKS — перед первым запросом в рамках HTTP-запроса
+    проверять, что постоянное соединение живо (как в Django 4.1);
+    POOL — пул соединений процесса для потоковых воркеров. С пулом
+    соединение возвращается в пул по окончании каждого запроса.
+    """
+
+    def __init__(self, settings_dict, *args, **kwargs):
+        super().__init__(settings_dict, *args, **kwargs)
+        self.health_checks_enabled = settings_dict.get(
+            'CONN_HEALTH_CHECKS', False)
+        # Запрос, в котором соединение уже проверено или открыто.
+        self.health_check_request = None
+        pool_options = settings_dict.get('POOL') or {}
+        self.pool = None
+        if pool_options.get('ENABLED'):
+            self.pool = get_pool(self.alias, pool_options)
+            self.settings_dict['CONN_MAX_AGE'] = 0
+
+    def get_new_connection(self, conn_params):
+        if self.pool is None:
+            return super().get_new_connection(conn_params)
+        connection = self.pool.get(
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params))
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level)
+        return connection
+
+    def connect(self):
+        super().connect()
+        self.health_check_request = current_request.get()
+
+    def close_if_health_check_failed(self):
+        """Закрывает постоянное соединение, если оно умерло.
+
+        Вызывается перед курсором, а не в ensure_connection: тот
+        вызывается и посреди connect(), где SELECT 1 открыл бы
+        транзакцию до включения autocommit.
+        """
+        request = current_request.get()
+        if (
+            self.connection is None
+            or not self.health_checks_enabled
+            or self.health_check_request is request
+        ):
+            return
+        if not self.in_atomic_block and not self.is_usable():
+            self.close()
+        self.health_check_request = request
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
+
+    def _close(self):
+        if self.pool is None:
+            return super()._close()
+        if self.connection is not None:
+            broken = self.errors_occurred and not self.is_usable()
+            with self.wrap_database_errors:
+                self.pool.put(self.connection, broken=broken)
@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import deque
+
+from core import metrics
+from django.db import DatabaseError
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+
+class PoolTimeout(DatabaseError):
+    pass
+
+
+class ConnectionPool:
+    """Пул соединений psycopg2, общий для потоков одного процесса.
+
+    Соединение, простоявшее в пуле дольше check_idle секунд, перед
+    выдачей проверяется запросом SELECT 1.
+    """
+
+    def __init__(self, alias, max_size, timeout, check_idle):
+        self.alias = alias
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_idle = check_idle
+        self.size = 0
+        self._idle = deque()
+        self._condition = threading.Condition()
+
+    def get(self, connect):
+        start = time.perf_counter()
+        while True:
+            connection, returned_at = self._checkout(start)
+            if connection is None:
+                try:
+                    connection = connect()
+                except Exception:
+                    self._discard()
+                    raise
+            elif not self._is_usable(connection, returned_at):
+                self._discard(connection)
+                continue
+            break
+        metrics.DB_POOL_WAIT.labels(self.alias).observe(
+            time.perf_counter() - start)
+        self._report()
+        return connection
+
+    def put(self, connection, broken=False):
+        if broken or connection.closed:
+            self._discard(connection)
+            return
+        if connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except Exception:
+                self._discard(connection)
+                return
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+        self._report()
+
+    def _checkout(self, start):
+        deadline = start + self.timeout
+        with self._condition:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self.size < self.max_size:
+                    self.size += 1
+                    return None, None
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    metrics.DB_POOL_TIMEOUTS.labels(self.alias).inc()
+                    raise PoolTimeout(
+                        f'Нет свободных соединений в пуле {self.alias}.')
+                self._condition.wait(remaining)
+
+    def _is_usable(self, connection, returned_at):
+        if connection.closed:
+            return False
+        if time.monotonic() - returned_at < self.check_idle:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Exception:
+            return False
+        return True
+
+    def _discard(self, connection=None):
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+        with self._condition:
+            self.size -= 1
+            self._condition.notify()
+        self._report()
+
+    def _report(self):
+        idle = len(self._idle)
+        metrics.DB_POOL_CONNECTIONS.labels(self.alias, 'idle').set(idle)
+        metrics.DB_POOL_CONNECTIONS.labels(self.alias, 'used').set(
+            self.size - idle)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, options):
+    with _pools_lock:
+        if alias not in _pools:
+            _pools[alias] = ConnectionPool(
+                alias,
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 5),
+                check_idle=options.get('CHECK_IDLE', 30),
+            )
+        return _pools[alias]
@@ -0,0 +1,36 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Реплика для чтения в текущем запросе, её выбирает ReplicaMiddleware
+# для безопасных запросов; None — читать из default.
+read_from_replica = ContextVar('read_from_replica', default=None)
+
+
+def choose_replica():
+    """Реплика на весь запрос.
+
+    Реплики отстают по-разному: если выбирать её на каждый SQL-запрос,
+    страница и счётчик в одном ответе могут прийти из разных реплик и
+    не сойтись.
+    """
+    if not settings.DATABASE_REPLICAS:
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+class PrimaryReplicaRouter:
+    """Чтение с реплик в рамках запроса, запись — всегда в default."""
+
+    def db_for_read(self, model, **hints):
+        return read_from_replica.get() or 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
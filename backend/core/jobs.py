@@ -0,0 +1,161 @@
+import random
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .metrics import JOB_DURATION, JOB_LAG, JOBS
+from .models import Job
+
+registry = {}
+
+
+def job(name=None, max_attempts=None, every=None):
+    """Регистрирует функцию как задачу; аргументы — JSON-совместимые.
+
+    Задача с every (секунды) периодическая и без аргументов: воркер
+    ставит её в очередь сам (schedule), а после выполнения она снова
+    встаёт в очередь через every секунд.
+    """
+    def decorator(func):
+        func.job_name = name or f'{func.__module__}.{func.__name__}'
+        func.max_attempts = max_attempts
+        func.every = every
+        registry[func.job_name] = func
+        return func
+    return decorator
+
+
+def enqueue(func, delay=None, **payload):
+    """Ставит задачу в очередь в текущей транзакции.
+
+    Воркер увидит задачу только после коммита, при откате её не будет.
+    """
+    return Job.objects.create(
+        name=func.job_name,
+        payload=payload,
+        max_attempts=func.max_attempts or settings.JOBS['MAX_ATTEMPTS'],
+        run_at=timezone.now() + timedelta(seconds=delay or 0),
+    )
+
+
+def discover():
+    autodiscover_modules('jobs')
+
+
+def is_scheduled(func, exclude=None):
+    return Job.objects.filter(
+        name=func.job_name, status__in=(Job.QUEUED, Job.RUNNING),
+    ).exclude(pk=exclude).exists()
+
+
+def schedule():
+    """Ставит в очередь периодические задачи, которых в ней нет.
+
+    Воркеры вызывают её одновременно, так что изредка задача может
+    встать дважды; лишняя копия после выполнения не повторяется.
+    """
+    for func in registry.values():
+        if func.every and not is_scheduled(func):
+            enqueue(func)
+
+
+def reschedule(job):
+    func = registry.get(job.name)
+    if func is not None and func.every and not is_scheduled(
+            func, exclude=job.pk):
+        enqueue(func, delay=func.every)
+
+
+def backoff(attempts):
+    config = settings.JOBS
+    delay = min(config['BACKOFF'] * 2 ** (attempts - 1), config['MAX_BACKOFF'])
+    return delay * random.uniform(0.5, 1)
+
+
+def claim(names=None):
+    """Забирает ближайшую задачу.
+
+    SELECT ... FOR UPDATE SKIP LOCKED: строки, которые прямо сейчас
+    забирают другие воркеры, пропускаются без ожидания.
+    """
+    with transaction.atomic():
+        queryset = Job.objects.select_for_update(skip_locked=True).filter(
+            status=Job.QUEUED, run_at__lte=timezone.now())
+        if names:
+            queryset = queryset.filter(name__in=names)
+        job = queryset.order_by('run_at').first()
+        if job is None:
+            return None
+        job.status = Job.RUNNING
+        job.attempts += 1
+        job.started = job.heartbeat = timezone.now()
+        job.save(update_fields=('status', 'attempts', 'started', 'heartbeat'))
+    return job
+
+
+def run(job):
+    """Выполняет задачу: удаляет при успехе, иначе повтор или dead."""
+    start = time.perf_counter()
+    try:
+        JOB_LAG.labels(job.name).observe(
+            (job.started - job.run_at).total_seconds())
+        func = registry.get(job.name)
+        if func is None:
+            raise LookupError(f'Задача {job.name} не зарегистрирована.')
+        func(**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = Job.DEAD
+            JOBS.labels(job.name, 'dead').inc()
+            reschedule(job)
+        else:
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + timedelta(
+                seconds=backoff(job.attempts))
+            JOBS.labels(job.name, 'retried').inc()
+        job.save(update_fields=('status', 'run_at', 'last_error'))
+    else:
+        reschedule(job)
+        job.delete()
+        JOBS.labels(job.name, 'succeeded').inc()
+    finally:
+        JOB_DURATION.labels(job.name).observe(time.perf_counter() - start)
+        close_old_connections()
+
+
+def heartbeat(ids):
+    """Отмечает, что задачи ids ещё выполняются.
+
+    Воркер вызывает её чаще, чем раз в JOBS['TIMEOUT']: долгая задача,
+    у которой отметка свежая, не считается брошенной.
+    """
+    if ids:
+        Job.objects.filter(pk__in=ids, status=Job.RUNNING).update(
+            heartbeat=timezone.now())
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи упавших воркеров.
+
+    Брошенная задача — без отметки heartbeat дольше JOBS['TIMEOUT'],
+    а не просто долгая.
+    """
+    deadline = timezone.now() - timedelta(seconds=settings.JOBS['TIMEOUT'])
+    return Job.objects.filter(
+        Q(heartbeat__lt=deadline)
+        | Q(heartbeat__isnull=True, started__lt=deadline),
+        status=Job.RUNNING,
+    ).update(status=Job.QUEUED, run_at=timezone.now())
+
+
+def retry(queryset):
+    """Снова ставит задачи в очередь с чистым счётчиком попыток."""
+    return queryset.update(
+        status=Job.QUEUED, attempts=0, run_at=timezone.now())
@@ -0,0 +1,342 @@
+import base64
+import http.client
+import io
+import json
+import multiprocessing
+import os
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+from PIL import Image
+
+DEFAULT_MIX = {
+    'browse': 50,
+    'recipe': 10,
+    'favorite': 10,
+    'shopping_cart': 10,
+    'subscribe': 5,
+    'create': 5,
+    'download': 10,
+}
+
+
+def parse_mix(value):
+    """'browse=60,favorite=10' -> {'browse': 60, 'favorite': 10}."""
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        if name not in DEFAULT_MIX:
+            raise ValueError(f'Неизвестный сценарий: {name}')
+        mix[name] = int(weight)
+    return mix
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Client:
+    """HTTP/1.1 keep-alive соединение одного виртуального пользователя."""
+
+    def __init__(self, base_url, token=None):
+        url = urlsplit(base_url)
+        connection_class = (http.client.HTTPSConnection
+                            if url.scheme == 'https'
+                            else http.client.HTTPConnection)
+        self.connection = connection_class(url.netloc, timeout=30)
+        self.headers = {'Content-Type': 'application/json'}
+        if token:
+            self.headers['Authorization'] = f'Token {token}'
+        self.reused = False
+
+    def request(self, method, path, data=None):
+        body = None if data is None else json.dumps(data)
+        # Сервер закрывает простаивающие keep-alive соединения (keepalive
+        # gunicorn): запрос по такому соединению повторяется один раз.
+        retry = self.reused
+        while True:
+            try:
+                self.connection.request(method, path, body, self.headers)
+                response = self.connection.getresponse()
+                content = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError,
+                    BrokenPipeError):
+                self.connection.close()
+                self.reused = False
+                if not retry:
+                    raise
+                retry = False
+                continue
+            except (OSError, http.client.HTTPException):
+                self.connection.close()
+                self.reused = False
+                raise
+            self.reused = True
+            return response.status, content
+
+
+def random_image():
+    buffer = io.BytesIO()
+    Image.frombytes('RGB', (64, 64), os.urandom(64 * 64 * 3)).save(
+        buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()).decode()
+
+
+def prepare(base_url, users):
+    """Тестовые пользователи с токенами и справочники для сценариев."""
+    client = Client(base_url)
+    run = uuid.uuid4().hex[:8]
+    accounts = []
+    for number in range(users):
+        email = f'load-{run}-{number}@example.com'
+        password = uuid.uuid4().hex
+        status, content = client.request('POST', '/api/users/', {
+            'email': email, 'username': f'load_{run}_{number}',
+            'first_name': 'Load', 'last_name': 'Test',
+            'password': password,
+        })
+        if status != 201:
+            raise RuntimeError(f'Регистрация: {status} {content[:200]}')
+        status, content = client.request(
+            'POST', '/api/auth/token/login/',
+            {'email': email, 'password': password})
+        if status != 200:
+            raise RuntimeError(f'Вход: {status} {content[:200]}')
+        accounts.append(json.loads(content)['auth_token'])
+
+    status, content = client.request('GET', '/api/tags/')
+    tags = json.loads(content)
+    status, content = client.request('GET', '/api/ingredients/')
+    ingredients = [item['id'] for item in json.loads(content)][:500]
+    status, content = client.request('GET', '/api/recipes/?limit=200')
+    recipes = json.loads(content)['results']
+    if not recipes or not ingredients or not tags:
+        raise RuntimeError('Нужны теги, ингредиенты и хотя бы один рецепт.')
+    return {
+        'tokens': accounts,
+        'tags': [tag['slug'] for tag in tags],
+        'tag_ids': [tag['id'] for tag in tags],
+        'ingredients': ingredients,
+        'recipes': [recipe['id'] for recipe in recipes],
+        'authors': sorted({recipe['author']['id'] for recipe in recipes}),
+    }
+
+
+class VirtualUser:
+    """Сценарии одного пользователя; переключатели чередуют POST/DELETE."""
+
+    def __init__(self, base_url, token, data, record):
+        self.anonymous = Client(base_url)
+        self.client = Client(base_url, token)
+        self.data = data
+        self.record = record
+        self.active = defaultdict(set)
+
+    def call(self, label, client, method, path, body=None):
+        start = time.perf_counter()
+        try:
+            status, _ = client.request(method, path, body)
+        except (OSError, http.client.HTTPException):
+            status = 0
+        self.record(label, status, time.perf_counter() - start)
+        return status
+
+    def browse(self):
+        query = {'page': random.randint(1, 3)}
+        if random.random() < 0.5:
+            query['tags'] = random.choice(self.data['tags'])
+        self.call('GET recipes', self.anonymous, 'GET',
+                  f'/api/recipes/?{urlencode(query)}')
+
+    def recipe(self):
+        self.call('GET recipe', self.anonymous, 'GET',
+                  f'/api/recipes/{random.choice(self.data["recipes"])}/')
+        self.call('GET tags', self.anonymous, 'GET', '/api/tags/')
+
+    def toggle(self, name, path, ids):
+        target = random.choice(ids)
+        if target in self.active[name]:
+            self.active[name].discard(target)
+            method = 'DELETE'
+        else:
+            self.active[name].add(target)
+            method = 'POST'
+        self.call(f'{method} {name}', self.client, method,
+                  path.format(target))
+
+    def favorite(self):
+        self.toggle('favorite', '/api/recipes/{}/favorite/',
+                    self.data['recipes'])
+
+    def shopping_cart(self):
+        self.toggle('shopping_cart', '/api/recipes/{}/shopping_cart/',
+                    self.data['recipes'])
+
+    def subscribe(self):
+        self.toggle('subscribe', '/api/users/{}/subscribe/',
+                    self.data['authors'])
+
+    def create(self):
+        ingredients = random.sample(
+            self.data['ingredients'], min(5, len(self.data['ingredients'])))
+        self.call('POST recipes', self.client, 'POST', '/api/recipes/', {
+            'name': f'Нагрузка {uuid.uuid4().hex}',
+            'text': 'Рецепт нагрузочного теста.',
+            'cooking_time': random.randint(1, 120),
+            'tags': [random.choice(self.data['tag_ids'])],
+            'ingredients': [
+                {'id': ingredient, 'amount': random.randint(1, 500)}
+                for ingredient in ingredients
+            ],
+            'image': random_image(),
+        })
+
+    def download(self):
+        self.call('GET download_shopping_cart', self.client, 'GET',
+                  '/api/recipes/download_shopping_cart/')
+
+
+def run_process(base_url, tokens, data, mix, duration, results):
+    """Процесс с виртуальными пользователями (по потоку на каждого)."""
+    lock = threading.Lock()
+    latencies = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(label, status, elapsed):
+        with lock:
+            latencies[label].append(elapsed)
+            statuses[label][status] += 1
+
+    deadline = time.monotonic() + duration
+    names, weights = zip(*mix.items())
+
+    def loop(token):
+        user = VirtualUser(base_url, token, data, record)
+        while time.monotonic() < deadline:
+            getattr(user, random.choices(names, weights)[0])()
+
+    threads = [threading.Thread(target=loop, args=(token,))
+               for token in tokens]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put({
+        label: (latencies[label], dict(statuses[label]))
+        for label in latencies
+    })
+
+
+def run(base_url, data, mix, duration, processes):
+    """Запускает процессы и собирает результаты по эндпоинтам."""
+    tokens = data['tokens']
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(
+            target=run_process,
+            args=(base_url, tokens[number::processes], data, mix, duration,
+                  results))
+        for number in range(processes)
+    ]
+    start = time.monotonic()
+    for worker in workers:
+        worker.start()
+    merged = defaultdict(lambda: ([], defaultdict(int)))
+    for _ in workers:
+        for label, (latencies, statuses) in results.get().items():
+            merged[label][0].extend(latencies)
+            for status, count in statuses.items():
+                merged[label][1][status] += count
+    for worker in workers:
+        worker.join()
+    return merged, time.monotonic() - start
+
+
+def summary(merged, elapsed):
+    """Строки отчёта: эндпоинт, запросы, rps, p50/p95/p99, ошибки."""
+    rows = []
+    for label in sorted(merged):
+        latencies, statuses = merged[label]
+        latencies.sort()
+        total = len(latencies)
+        errors = sum(count for status, count in statuses.items()
+                     if status == 0 or status >= 500)
+        client_errors = sum(count for status, count in statuses.items()
+                            if 400 <= status < 500)
+        rows.append({
+            'endpoint': label,
+            'requests': total,
+            'rps': total / elapsed,
+            'p50': percentile(latencies, 0.50) * 1000,
+            'p95': percentile(latencies, 0.95) * 1000,
+            'p99': percentile(latencies, 0.99) * 1000,
+            'errors': errors / total * 100,
+            '4xx': client_errors / total * 100,
+            'throttled': statuses.get(429, 0),
+        })
+    return rows
+
+
+def worker_pids(master):
+    """Дочерние процессы мастера gunicorn (воркеры) по /proc."""
+    pids = []
+    for stat in Path('/proc').glob('[0-9]*/stat'):
+        try:
+            fields = stat.read_text().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == master:
+            pids.append(int(stat.parent.name))
+    return sorted(pids)
+
+
+def rss(pid):
+    """Резидентная память процесса в КБ (VmRSS)."""
+    try:
+        for line in Path(f'/proc/{pid}/status').read_text().splitlines():
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+class MemoryWatcher(threading.Thread):
+    """Раз в interval секунд снимает VmRSS воркеров gunicorn."""
+
+    def __init__(self, master, interval, report):
+        super().__init__(daemon=True)
+        self.master = master
+        self.interval = interval
+        self.report = report
+        self.samples = defaultdict(list)
+        self.stopping = threading.Event()
+
+    def run(self):
+        start = time.monotonic()
+        while not self.stopping.is_set():
+            elapsed = time.monotonic() - start
+            snapshot = {pid: rss(pid) for pid in worker_pids(self.master)}
+            for pid, value in snapshot.items():
+                if value is not None:
+                    self.samples[pid].append((elapsed, value))
+            self.report(elapsed, snapshot)
+            self.stopping.wait(self.interval)
+
+    def growth(self):
+        """{pid: (первый замер, последний, прирост КБ/ч)}."""
+        result = {}
+        for pid, samples in self.samples.items():
+            (first_time, first), (last_time, last) = samples[0], samples[-1]
+            hours = (last_time - first_time) / 3600
+            result[pid] = (first, last,
+                           (last - first) / hours if hours else 0.0)
+        return result
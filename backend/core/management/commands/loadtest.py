@@ -0,0 +1,90 @@
+from core.loadtest import (DEFAULT_MIX, MemoryWatcher, parse_mix, prepare, run,
+                           summary)
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.translation import gettext_lazy as _
+
+
+class Command(BaseCommand):
+    help = _(
+        'Нагрузочный тест запущенного сервера (gunicorn foodgram.wsgi). '
+        'Лимиты частоты (DEFAULT_THROTTLE_RATES) на время теста стоит '
+        'поднять: ответы 429 считаются отдельно.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000')
+        parser.add_argument(
+            '--users', type=int, default=20,
+            help=_('Число виртуальных пользователей.'))
+        parser.add_argument(
+            '--processes', type=int, default=4,
+            help=_('Процессы, между которыми делятся пользователи.'))
+        parser.add_argument(
+            '--duration', type=int, default=60, help=_('Секунды.'))
+        parser.add_argument(
+            '--mix', type=parse_mix,
+            default=DEFAULT_MIX,
+            help=_('Доли сценариев: browse=50,recipe=10,favorite=10,'
+                   'shopping_cart=10,subscribe=5,create=5,download=10.'))
+        parser.add_argument(
+            '--soak', action='store_true',
+            help=_('Следить за памятью воркеров gunicorn (нужен --pid).'))
+        parser.add_argument(
+            '--pid', type=int, help=_('PID мастера gunicorn.'))
+        parser.add_argument(
+            '--interval', type=int, default=30,
+            help=_('Интервал замеров памяти, с.'))
+
+    def report_memory(self, elapsed, snapshot):
+        total = sum(value or 0 for value in snapshot.values())
+        workers = ' '.join(
+            f'{pid}:{(value or 0) // 1024}M'
+            for pid, value in sorted(snapshot.items()))
+        self.stdout.write(
+            f'[{elapsed:7.0f} с] RSS {total // 1024} МБ — {workers}')
+
+    def handle(self, *args, **options):
+        if options['soak'] and not options['pid']:
+            raise CommandError(_('Для --soak укажите --pid мастера.'))
+        processes = min(options['processes'], options['users'])
+        try:
+            data = prepare(options['url'], options['users'])
+        except (RuntimeError, OSError) as error:
+            raise CommandError(error)
+        self.stdout.write(_('{} пользователей в {} процессах, {} с.').format(
+            options['users'], processes, options['duration']))
+
+        watcher = None
+        if options['soak']:
+            watcher = MemoryWatcher(
+                options['pid'], options['interval'], self.report_memory)
+            watcher.start()
+        try:
+            merged, elapsed = run(
+                options['url'], data, options['mix'], options['duration'],
+                processes)
+        finally:
+            if watcher is not None:
+                watcher.stopping.set()
+                watcher.join()
+
+        rows = summary(merged, elapsed)
+        self.stdout.write(
+            f'{"endpoint":32} {"req":>7} {"rps":>8} {"p50 мс":>8} '
+            f'{"p95 мс":>8} {"p99 мс":>8} {"5xx %":>6} {"4xx %":>6} '
+            f'{"429":>5}')
+        for row in rows:
+            self.stdout.write(
+                f'{row["endpoint"]:32} {row["requests"]:7} '
+                f'{row["rps"]:8.1f} {row["p50"]:8.1f} {row["p95"]:8.1f} '
+                f'{row["p99"]:8.1f} {row["errors"]:6.2f} {row["4xx"]:6.2f} '
+                f'{row["throttled"]:5}')
+        total = sum(row['requests'] for row in rows)
+        self.stdout.write(
+            _('Всего: {} запросов за {:.1f} с, {:.1f} rps.').format(
+                total, elapsed, total / elapsed))
+
+        if watcher is not None:
+            for pid, (first, last, per_hour) in watcher.growth().items():
+                self.stdout.write(
+                    _('Воркер {}: {} → {} МБ, {:+.1f} МБ/ч.').format(
+                        pid, first // 1024, last // 1024, per_hour / 1024))
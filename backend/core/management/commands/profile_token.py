@@ -0,0 +1,13 @@
+from core.profiling import get_token
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.translation import gettext_lazy as _
+
+
+class Command(BaseCommand):
+    help = _('Токен для профилирования запроса (заголовок X-Profile).')
+
+    def handle(self, *args, **options):
+        self.stdout.write(get_token())
+        self.stdout.write(_('Токен действителен {} с.').format(
+            settings.PROFILER['TOKEN_MAX_AGE']))
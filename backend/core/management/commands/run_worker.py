@@ -0,0 +1,89 @@
+import logging
+import os
+import signal
+import threading
+
+from core.jobs import (claim, discover, heartbeat, registry, requeue_stale,
+                       run, schedule)
+from core.metrics import get_registry
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils.translation import gettext_lazy as _
+from prometheus_client import start_http_server
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = _('Воркер очереди задач (core.jobs).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help=_('Число потоков, выполняющих задачи.'))
+        parser.add_argument(
+            '--only', action='append', metavar='JOB',
+            help=_('Выполнять только задачи с этим именем.'))
+        parser.add_argument(
+            '--once', action='store_true',
+            help=_('Завершиться, когда очередь опустеет.'))
+        parser.add_argument(
+            '--metrics-port', type=int,
+            help=_('Порт для метрик Prometheus.'))
+
+    def handle(self, *args, **options):
+        discover()
+        self.stdout.write(_('Задачи: {}.').format(', '.join(sorted(registry))))
+        # Образ общий с gunicorn, а каталог метрик создаёт только его
+        # on_starting: без каталога первая же метрика падает.
+        if path := os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+            os.makedirs(path, exist_ok=True)
+        if options['metrics_port']:
+            start_http_server(options['metrics_port'], registry=get_registry())
+
+        self.stopping = threading.Event()
+        self.running = set()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *args: self.stopping.set())
+
+        threads = [
+            threading.Thread(
+                target=self.work, args=(options['only'], options['once']),
+                name=f'worker-{number}')
+            for number in range(options['concurrency'])
+        ]
+        for thread in threads:
+            thread.start()
+        # Основной поток отмечает свои задачи живыми, подбирает задачи
+        # упавших воркеров и ставит в очередь периодические.
+        interval = settings.JOBS['TIMEOUT'] / 10
+        while any(thread.is_alive() for thread in threads):
+            heartbeat(list(self.running))
+            requeue_stale()
+            schedule()
+            connections.close_all()
+            for thread in threads:
+                thread.join(interval / len(threads))
+        self.stdout.write(_('Воркер остановлен.'))
+
+    def work(self, names, once):
+        try:
+            while not self.stopping.is_set():
+                job = claim(names)
+                if job is None:
+                    if once:
+                        return
+                    self.stopping.wait(settings.JOBS['POLL_INTERVAL'])
+                    continue
+                self.running.add(job.pk)
+                try:
+                    run(job)
+                except Exception:
+                    # Ошибка вне задачи (база, метрики) не должна убивать
+                    # поток: задачу подберёт requeue_stale.
+                    logger.exception('Сбой при выполнении задачи %s', job)
+                finally:
+                    self.running.discard(job.pk)
+        finally:
+            connections.close_all()
@@ -0,0 +1,128 @@
+import os
+import time
+from contextvars import ContextVar
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+REQUEST_LATENCY = Histogram(
+    'foodgram_request_latency_seconds',
+    'Время обработки запроса.',
+    ['view', 'method'],
+)
+REQUESTS = Counter(
+    'foodgram_requests',
+    'Количество обработанных запросов.',
+    ['view', 'method', 'status'],
+)
+DB_QUERIES = Histogram(
+    'foodgram_db_queries',
+    'Количество SQL-запросов на один запрос к API.',
+    ['view'],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, float('inf')),
+)
+DB_TIME = Histogram(
+    'foodgram_db_time_seconds',
+    'Суммарное время SQL-запросов на один запрос к API.',
+    ['view'],
+)
+RESPONSE_SIZE = Histogram(
+    'foodgram_response_size_bytes',
+    'Размер тела ответа.',
+    ['view'],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, float('inf')),
+)
+CACHE_REQUESTS = Counter(
+    'foodgram_cache_requests',
+    'Обращения к кешу (hit/miss).',
+    ['cache', 'result'],
+)
+ACTION_OUTCOMES = Counter(
+    'foodgram_recipe_actions',
+    'Результаты запросов /favorite и /shopping_cart.',
+    ['model', 'outcome'],
+)
+
+DB_POOL_CONNECTIONS = Gauge(
+    'foodgram_db_pool_connections',
+    'Соединения в пуле по состоянию (idle/used).',
+    ['alias', 'state'],
+    multiprocess_mode='livesum',
+)
+DB_POOL_WAIT = Histogram(
+    'foodgram_db_pool_wait_seconds',
+    'Время ожидания соединения из пула.',
+    ['alias'],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, float('inf')),
+)
+DB_POOL_TIMEOUTS = Counter(
+    'foodgram_db_pool_timeouts',
+    'Запросы, не дождавшиеся соединения из пула.',
+    ['alias'],
+)
+
+JOBS = Counter(
+    'foodgram_jobs',
+    'Выполненные задачи очереди (succeeded/retried/dead).',
+    ['job', 'outcome'],
+)
+JOB_DURATION = Histogram(
+    'foodgram_job_duration_seconds',
+    'Время выполнения задачи очереди.',
+    ['job'],
+)
+JOB_LAG = Histogram(
+    'foodgram_job_lag_seconds',
+    'Задержка между плановым и фактическим запуском задачи.',
+    ['job'],
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 1800, float('inf')),
+)
+
+
+# Статистика SQL-запросов текущего HTTP-запроса, см. MetricsMiddleware.
+current_query_stats = ContextVar('current_query_stats', default=None)
+
+
+class QueryStats:
+    """Счётчик SQL-запросов и их суммарного времени."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+def cache_lookup(cache_name, hit):
+    """Учитывает обращение к кешу для расчёта hit ratio."""
+    CACHE_REQUESTS.labels(cache_name, 'hit' if hit else 'miss').inc()
+
+
+def action_outcome(model, outcome):
+    """Учитывает результат action_method: created/duplicate/deleted."""
+    ACTION_OUTCOMES.labels(model._meta.model_name, outcome).inc()
+
+
+def get_registry():
+    """Реестр метрик для выдачи.
+
+    При PROMETHEUS_MULTIPROC_DIR значения собираются из файлов всех
+    процессов: воркеров gunicorn или потоков run_worker.
+    """
+    if not os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def exposition():
+    """Метрики в текстовом формате Prometheus."""
+    return generate_latest(get_registry()), CONTENT_TYPE_LATEST
@@ -0,0 +1,240 @@
+import asyncio
+import hashlib
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+
+from . import compression, metrics, profiling
+from .concurrency import run_sync
+from .db.routers import choose_replica, read_from_replica
+
+
+class AsyncCapableMiddleware:
+    """Основа для middleware, работающих и в WSGI, и в ASGI-режиме."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return self.handle(request)
+
+    def handle(self, request):
+        raise NotImplementedError
+
+    async def __acall__(self, request):
+        raise NotImplementedError
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """Сбор метрик времени ответа, SQL-запросов и размера ответа."""
+
+    def handle(self, request):
+        stats = metrics.QueryStats()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        self.observe(request, response, stats, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        # SQL-запросы учитываются в потоках run_sync.
+        stats = metrics.QueryStats()
+        token = metrics.current_query_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current_query_stats.reset(token)
+        self.observe(request, response, stats, time.perf_counter() - start)
+        return response
+
+    def observe(self, request, response, stats, duration):
+        match = request.resolver_match
+        view = match.view_name if match else '<unresolved>'
+        metrics.REQUEST_LATENCY.labels(view, request.method).observe(duration)
+        metrics.REQUESTS.labels(
+            view, request.method, response.status_code).inc()
+        metrics.DB_QUERIES.labels(view).observe(stats.count)
+        metrics.DB_TIME.labels(view).observe(stats.duration)
+        if not response.streaming:
+            metrics.RESPONSE_SIZE.labels(view).observe(len(response.content))
+
+
+class ProfilingMiddleware:
+    """Профилирование запросов по токену или по случайной выборке.
+
+    Токен передаётся в заголовке X-Profile или параметре _profile,
+    см. команду profile_token. Работает только в WSGI-режиме.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        state = getattr(request, '_profiling', None)
+        if state is not None:
+            state.attach(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.PROFILER['ENABLED']:
+            return None
+        token = (request.headers.get('X-Profile')
+                 or request.GET.get('_profile'))
+        triggered = bool(token) and profiling.token_is_valid(token)
+        if not triggered and not profiling.should_sample(
+                request.resolver_match.view_name):
+            return None
+        if profiling.acquire_slot():
+            request._profiling = profiling.ProfilingRequest(triggered)
+        return None
+
+
+class ReplicaMiddleware(AsyncCapableMiddleware):
+    """Направляет безопасные запросы на реплики.
+
+    После успешной записи клиент на REPLICA_LAG_TOLERANCE секунд
+    закрепляется за основной базой, чтобы видеть свои изменения.
+    Клиент определяется по заголовку Authorization, без него — по cookie.
+    """
+
+    cookie_name = 'db_primary'
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def handle(self, request):
+        safe = request.method in self.safe_methods
+        token = read_from_replica.set(
+            choose_replica() if safe and not self.is_pinned(request) else None)
+        try:
+            response = self.get_response(request)
+        finally:
+            read_from_replica.reset(token)
+        if not safe and response.status_code < 400:
+            self.pin(request, response)
+        return response
+
+    async def __acall__(self, request):
+        safe = request.method in self.safe_methods
+        pinned = safe and await run_sync(self.is_pinned, request)
+        token = read_from_replica.set(
+            choose_replica() if safe and not pinned else None)
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_from_replica.reset(token)
+        if not safe and response.status_code < 400:
+            await run_sync(self.pin, request, response)
+        return response
+
+    def pin_key(self, request):
+        authorization = request.headers.get('Authorization')
+        if not authorization:
+            return None
+        digest = hashlib.sha256(authorization.encode()).hexdigest()
+        return f'db:primary:{digest}'
+
+    def is_pinned(self, request):
+        if request.COOKIES.get(self.cookie_name):
+            return True
+        key = self.pin_key(request)
+        return key is not None and cache.get(key) is not None
+
+    def pin(self, request, response):
+        timeout = settings.REPLICA_LAG_TOLERANCE
+        key = self.pin_key(request)
+        if key is None:
+            response.set_cookie(
+                self.cookie_name, '1', max_age=timeout, httponly=True)
+        else:
+            cache.set(key, True, timeout)
+
+
+class CompressionMiddleware(AsyncCapableMiddleware):
+    """Сжатие ответов brotli или gzip по Accept-Encoding.
+
+    Сжимаются ответы 200 с типом из COMPRESSION['CONTENT_TYPES']: обычные —
+    от MIN_SIZE байт, потоковые (список покупок) — по мере генерации.
+    ETag ослабляется (W/), как у GZipMiddleware: тело другое, смысл тот
+    же, и ConditionalGetMiddleware отвечает 304 без сжатия. Для
+    анонимных запросов сжатое тело кешируется по хешу содержимого.
+    """
+
+    def handle(self, request):
+        return self.process(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        return await run_sync(self.process, request, response)
+
+    def process(self, request, response):
+        config = settings.COMPRESSION
+        content_type = response.get('Content-Type', '').split(';')[0]
+        if (response.status_code != 200
+                or response.has_header('Content-Encoding')
+                or content_type.strip() not in config['CONTENT_TYPES']):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        coding = compression.choose(request.headers.get('Accept-Encoding', ''))
+        if coding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compression.compress_stream(
+                response.streaming_content, coding)
+            if response.has_header('Content-Length'):
+                del response['Content-Length']
+        else:
+            content = response.content
+            if len(content) < config['MIN_SIZE']:
+                return response
+            digest = hashlib.blake2b(content, digest_size=16).hexdigest()
+            etag = response.get('ETag') or quote_etag(digest)
+            if not etag.startswith('W/'):
+                etag = f'W/{etag}'
+            response['ETag'] = etag
+            if self.not_modified(request, etag):
+                # Тело всё равно заменит 304 от ConditionalGetMiddleware.
+                return response
+            response.content = self.compress(request, content, digest, coding)
+            response['Content-Length'] = str(len(response.content))
+        response['Content-Encoding'] = coding
+        return response
+
+    @staticmethod
+    def not_modified(request, etag):
+        if request.method not in ('GET', 'HEAD'):
+            return False
+        etags = parse_etags(request.headers.get('If-None-Match', ''))
+        return '*' in etags or any(
+            candidate.removeprefix('W/') == etag.removeprefix('W/')
+            for candidate in etags)
+
+    @staticmethod
+    def compress(request, content, digest, coding):
+        config = settings.COMPRESSION
+        if (request.headers.get('Authorization')
+                or len(content) > config['CACHE_MAX_SIZE']
+                or not config['CACHE_TTL']):
+            return compression.compress(content, coding)
+        key = f'compressed:{coding}:{digest}'
+        compressed = cache.get(key)
+        metrics.cache_lookup('compression', compressed is not None)
+        if compressed is None:
+            compressed = compression.compress(content, coding)
+            cache.set(key, compressed, config['CACHE_TTL'])
+        return compressed
@@ -0,0 +1,38 @@
+# Generated by Django 3.2.3 on 2026-10-19 08:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата')),
+                ('view', models.CharField(max_length=200, verbose_name='View')),
+                ('method', models.CharField(max_length=10, verbose_name='Метод')),
+                ('path', models.CharField(max_length=2000, verbose_name='Путь')),
+                ('status', models.PositiveSmallIntegerField(verbose_name='Статус ответа')),
+                ('duration', models.FloatField(verbose_name='Длительность, с')),
+                ('samples', models.PositiveIntegerField(verbose_name='Количество сэмплов')),
+                ('triggered', models.BooleanField(default=False, help_text='Иначе — случайная выборка запросов.', verbose_name='Запущен по токену')),
+                ('file', models.CharField(max_length=200, verbose_name='Файл стеков')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Профиль запроса',
+                'verbose_name_plural': 'Профили запросов',
+                'ordering': ['-created'],
+            },
+        ),
+    ]
@@ -0,0 +1,90 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class RequestProfile(models.Model):
+    created = models.DateTimeField(_('Дата'), auto_now_add=True)
+    view = models.CharField(_('View'), max_length=200)
+    method = models.CharField(_('Метод'), max_length=10)
+    path = models.CharField(_('Путь'), max_length=2000)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name=_('Пользователь'),
+    )
+    status = models.PositiveSmallIntegerField(_('Статус ответа'))
+    duration = models.FloatField(_('Длительность, с'))
+    samples = models.PositiveIntegerField(_('Количество сэмплов'))
+    triggered = models.BooleanField(
+        _('Запущен по токену'),
+        default=False,
+        help_text=_('Иначе — случайная выборка запросов.'),
+    )
+    file = models.CharField(_('Файл стеков'), max_length=200)
+
+    class Meta:
+        ordering = ['-created']
+        verbose_name = _('Профиль запроса')
+        verbose_name_plural = _('Профили запросов')
+
+    def __str__(self) -> str:
+        return f'{self.method} {self.path} ({self.duration:.3f} с)'
+
+    @property
+    def file_path(self) -> Path:
+        return Path(settings.PROFILER['DIR']) / self.file
+
+    def delete(self, *args, **kwargs):
+        path = self.file_path
+        super().delete(*args, **kwargs)
+        # Удалить файл со стеками вместе с записью.
+        path.unlink(missing_ok=True)
+
+
+class Job(models.Model):
+    """Задача очереди core.jobs; выполненные задачи удаляются."""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DEAD = 'dead'
+    STATUSES = (
+        (QUEUED, _('В очереди')),
+        (RUNNING, _('Выполняется')),
+        (DEAD, _('Не выполнена')),
+    )
+
+    name = models.CharField(_('Задача'), max_length=200)
+    payload = models.JSONField(_('Аргументы'), default=dict)
+    status = models.CharField(
+        _('Статус'), max_length=10, choices=STATUSES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(_('Попыток'), default=0)
+    max_attempts = models.PositiveSmallIntegerField(_('Максимум попыток'))
+    run_at = models.DateTimeField(_('Запуск не раньше'), default=timezone.now)
+    created = models.DateTimeField(_('Создана'), auto_now_add=True)
+    started = models.DateTimeField(_('Начало выполнения'), null=True)
+    # Обновляет воркер, пока задача выполняется (core.jobs.heartbeat).
+    heartbeat = models.DateTimeField(_('Воркер жив'), null=True)
+    last_error = models.TextField(_('Последняя ошибка'), blank=True)
+
+    class Meta:
+        ordering = ['run_at']
+        verbose_name = _('Задача')
+        verbose_name_plural = _('Задачи')
+        indexes = [
+            models.Index(
+                fields=['run_at'],
+                name='core_job_queued_idx',
+                condition=Q(status='queued'),
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.name} #{self.pk}'
@@ -0,0 +1,187 @@
+import logging
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+
+TOKEN_SALT = 'core.profiling'
+
+logger = logging.getLogger(__name__)
+
+_slots = None
+_slots_lock = threading.Lock()
+
+
+def get_token():
+    """Подписанный токен для запуска профилирования запроса."""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign('profile')
+
+
+def token_is_valid(value):
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(
+            value, max_age=settings.PROFILER['TOKEN_MAX_AGE'])
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def acquire_slot():
+    """Ограничивает число одновременно профилируемых запросов."""
+    global _slots
+    with _slots_lock:
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(
+                settings.PROFILER['MAX_CONCURRENT'])
+    return _slots.acquire(blocking=False)
+
+
+def release_slot():
+    _slots.release()
+
+
+def should_sample(view_name):
+    config = settings.PROFILER
+    return (
+        view_name in config['VIEWS']
+        and random.random() < config['SAMPLE_RATE']
+    )
+
+
+def collapse(frame):
+    """Стек в формате collapsed stacks (flamegraph.pl, speedscope)."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({code.co_filename}:{frame.f_lineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class Sampler(threading.Thread):
+    """Статистический профайлер одного потока.
+
+    Раз в interval секунд снимает стек целевого потока, но не более
+    max_samples раз — так накладные расходы ограничены сверху.
+    """
+
+    def __init__(self, thread_id, interval, max_samples):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_samples = max_samples
+        self.stacks = Counter()
+        self.samples = 0
+        self.finished = threading.Event()
+
+    def run(self):
+        while (not self.finished.wait(self.interval)
+               and self.samples < self.max_samples):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            self.stacks[collapse(frame)] += 1
+            self.samples += 1
+
+    def stop(self):
+        self.finished.set()
+        self.join()
+
+
+def start_sampler():
+    config = settings.PROFILER
+    sampler = Sampler(
+        threading.get_ident(), config['INTERVAL'], config['MAX_SAMPLES'])
+    sampler.start()
+    return sampler
+
+
+def save_profile(sampler, request, response, duration, triggered):
+    """Сохраняет стеки на диск и удаляет самые старые профили."""
+    from .models import RequestProfile
+
+    config = settings.PROFILER
+    directory = Path(config['DIR'])
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f'{uuid.uuid4().hex}.txt'
+    with open(directory / name, 'w', encoding='utf-8') as file:
+        for stack, count in sampler.stacks.most_common():
+            file.write(f'{stack} {count}\n')
+
+    user = request.user if request.user.is_authenticated else None
+    RequestProfile.objects.create(
+        view=request.resolver_match.view_name,
+        method=request.method,
+        path=request.get_full_path()[:2000],
+        user=user,
+        status=response.status_code,
+        duration=duration,
+        samples=sampler.samples,
+        triggered=triggered,
+        file=name,
+    )
+    for profile in RequestProfile.objects.all()[config['MAX_PROFILES']:]:
+        profile.delete()
+
+
+class ProfilingRequest:
+    """Состояние профилирования, привязанное к запросу."""
+
+    def __init__(self, triggered):
+        self.triggered = triggered
+        self.sampler = start_sampler()
+        self.start = time.perf_counter()
+        self.finished = False
+
+    def attach(self, request, response):
+        """Завершает профиль, когда ответ отдан целиком.
+
+        Тело потокового ответа генерируется уже после выхода из
+        middleware, поэтому профиль сохраняется по его окончании.
+        """
+        if response.streaming:
+            response.streaming_content = ProfiledStream(
+                response.streaming_content,
+                lambda: self.finish(request, response))
+        else:
+            self.finish(request, response)
+
+    def finish(self, request, response):
+        if self.finished:
+            return
+        self.finished = True
+        self.sampler.stop()
+        try:
+            save_profile(self.sampler, request, response,
+                         time.perf_counter() - self.start, self.triggered)
+        except Exception:
+            # Профиль вспомогательный: ошибка записи не ломает ответ.
+            logger.exception('Не удалось сохранить профиль запроса')
+        finally:
+            release_slot()
+
+
+class ProfiledStream:
+    """Тело потокового ответа, по окончании которого вызывается on_close.
+
+    close() вызывает и сервер, если клиент не дочитал ответ.
+    """
+
+    def __init__(self, chunks, on_close):
+        self.chunks = chunks
+        self.on_close = on_close
+
+    def __iter__(self):
+        try:
+            yield from self.chunks
+        finally:
+            self.close()
+
+    def close(self):
+        self.on_close()
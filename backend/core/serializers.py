@@ -0,0 +1,47 @@
+from rest_framework.serializers import ListSerializer
+
+
+def requested_fields(request, fields):
+    """Поля ответа с учётом параметров ?fields= и ?omit=."""
+    if request is None:
+        return tuple(fields)
+    params = getattr(request, 'query_params', request.GET)
+    result = tuple(fields)
+    if only := params.get('fields'):
+        only = set(only.split(','))
+        result = tuple(field for field in result if field in only)
+    if omit := params.get('omit'):
+        omit = set(omit.split(','))
+        result = tuple(field for field in result if field not in omit)
+    return result
+
+
+class SparseFieldsMixin:
+    """Выдача только запрошенных полей (?fields=, ?omit=).
+
+    Действует на корневой сериализатор ответа и не влияет на разбор
+    входных данных. Поля, которые to_representation добавляет сам,
+    перечисляются в extra_output_fields.
+    """
+
+    extra_output_fields = ()
+
+    def is_output_root(self):
+        parent = self.parent
+        return parent is None or (
+            isinstance(parent, ListSerializer) and parent.parent is None)
+
+    @property
+    def output_fields(self):
+        if not hasattr(self, '_output_fields'):
+            fields = (*self.Meta.fields, *self.extra_output_fields)
+            if self.is_output_root():
+                fields = requested_fields(self.context.get('request'), fields)
+            self._output_fields = frozenset(fields)
+        return self._output_fields
+
+    @property
+    def _readable_fields(self):
+        for field in super()._readable_fields:
+            if field.field_name in self.output_fields:
+                yield field
@@ -0,0 +1,136 @@
+import csv
+import io
+from unittest import mock, skipIf, skipUnless
+
+from core import admin_tools
+from core.admin_tools import EstimatedCountPaginator, estimated_count
+from django.db import connection
+from django.test import TestCase
+from recipes.models import Ingredient, Recipe
+from users.models import User
+
+
+def create_user(name, **extra):
+    return User.objects.create_user(
+        email=f'{name}@example.com', username=name,
+        first_name=name.title(), last_name='Cook', password='pw', **extra)
+
+
+class EstimatedCountPaginatorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'Соль {number}', measurement_unit='г')
+            for number in range(5))
+
+    def count(self, queryset, estimate):
+        with mock.patch.object(connection, 'vendor', 'postgresql'), \
+                mock.patch.object(
+                    admin_tools, 'estimated_count',
+                    return_value=estimate) as estimated:
+            count = EstimatedCountPaginator(queryset, 10).count
+        return count, estimated.called
+
+    def test_estimate_for_large_unfiltered_table(self):
+        with self.assertNumQueries(0):
+            count, __ = self.count(Ingredient.objects.all(), 50000)
+        self.assertEqual(count, 50000)
+
+    def test_exact_count_fallback(self):
+        cases = {
+            # Маленькая таблица: точный COUNT дёшев.
+            'small': (Ingredient.objects.all(), 100, True),
+            # Таблицу ещё не анализировали: reltuples = -1.
+            'never analyzed': (Ingredient.objects.all(), -1, True),
+            'filtered': (
+                Ingredient.objects.filter(name__startswith='Соль 1'),
+                50000, False),
+        }
+        for name, (queryset, estimate, estimated) in cases.items():
+            exact = queryset.count()
+            with self.subTest(name), self.assertNumQueries(1):
+                self.assertEqual(
+                    self.count(queryset, estimate), (exact, estimated))
+
+    def test_list_counted_exactly(self):
+        self.assertEqual(
+            EstimatedCountPaginator(list(range(3)), 10).count, 3)
+
+    @skipIf(connection.vendor == 'postgresql', 'без pg_class')
+    def test_other_backends_count_exactly(self):
+        with mock.patch.object(admin_tools, 'estimated_count') as estimated:
+            self.assertEqual(
+                EstimatedCountPaginator(Ingredient.objects.all(), 10).count,
+                5)
+        estimated.assert_not_called()
+
+    @skipUnless(connection.vendor == 'postgresql', 'pg_class')
+    def test_estimated_count_reads_pg_class(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE {}'.format(
+                connection.ops.quote_name(Ingredient._meta.db_table)))
+        self.assertEqual(estimated_count(Ingredient, 'default'), 5)
+
+
+class AdminToolsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user('admin', is_staff=True, is_superuser=True)
+        cls.author = create_user('author')
+        cls.recipes = [
+            Recipe.objects.create(
+                author=author, name=name, text='Текст', cooking_time=5,
+                image='recipe/img/borsch.png')
+            for author, name in (
+                (cls.author, 'Борщ, "украинский"'),
+                (cls.author, 'Щи\nзелёные'),
+                (cls.admin, 'Каша'),
+            )
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def changelist(self, **params):
+        response = self.client.get('/admin/recipes/recipe/', params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_id_filter(self):
+        response = self.changelist(author_id=str(self.author.pk))
+        self.assertEqual(
+            {recipe.pk for recipe in response.context['cl'].result_list},
+            {recipe.pk for recipe in self.recipes[:2]})
+        self.assertContains(
+            response, f'name="author_id" value="{self.author.pk}"')
+        self.assertEqual(self.changelist(author_id='').context[
+            'cl'].result_count, 3)
+
+    def test_id_filter_bad_input(self):
+        for value in ('abc', '-1', '1.5', ' 1', '²', '١٢', '9' * 30):
+            with self.subTest(value=value):
+                response = self.changelist(author_id=value)
+                self.assertEqual(response.context['cl'].result_count, 0)
+
+    def test_export_csv(self):
+        response = self.client.post('/admin/recipes/recipe/', {
+            'action': 'export_csv',
+            '_selected_action': [recipe.pk for recipe in self.recipes],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(
+            response['Content-Disposition'], 'attachment; filename=recipe.csv')
+        content = b''.join(response.streaming_content).decode()
+        # Запятые, кавычки и переводы строк в полях экранируются.
+        self.assertIn('"Борщ, ""украинский"""', content)
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0], [
+            'id', 'name', 'author_id', 'author__username', 'cooking_time',
+            'pub_date'])
+        self.assertEqual(
+            [row[:4] for row in rows[1:]],
+            [[str(recipe.pk), recipe.name, str(recipe.author_id),
+              recipe.author.username] for recipe in self.recipes])
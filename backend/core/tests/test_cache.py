@@ -0,0 +1,240 @@
+from unittest import mock
+
+from core import cache as stale_cache
+from core.cache import StaleCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.memcached import PyMemcacheCache
+from django.db import DatabaseError
+from django.test import SimpleTestCase, TestCase
+
+OPTIONS = {
+    'SOFT_TTL': 30,
+    'HARD_TTL': 3600,
+    'LOCK_TTL': 10,
+    'LOCK_WAIT': 2,
+    'SLOW': 2,
+    'BREAKER_THRESHOLD': 3,
+    'BREAKER_WINDOW': 60,
+    'BREAKER_OPEN': 30,
+}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeMemcacheClient:
+    """gets/cas/add pymemcache поверх словаря.
+
+    before_cas(key) вызывается между gets и cas — место для гонки.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.version = 0
+        self.before_cas = None
+
+    def write(self, key, value):
+        self.version += 1
+        self.data[key] = (value, self.version)
+
+    def gets(self, key):
+        return self.data.get(key, (None, None))
+
+    def add(self, key, value, expire):
+        if key in self.data:
+            return False
+        self.write(key, value)
+        return True
+
+    def cas(self, key, value, cas, expire):
+        if self.before_cas is not None:
+            self.before_cas(key)
+        if key not in self.data:
+            return None
+        if self.data[key][1] != cas:
+            return False
+        self.write(key, value)
+        return True
+
+
+class StaleCacheMixin:
+    def setUp(self):
+        self.clock = Clock()
+        self.cache = LocMemCache(f'stale-{id(self)}', {})
+        self.stale = self.make()
+        self.computed = []
+
+    def make(self):
+        stale = StaleCache('test', **OPTIONS)
+        stale.cache = self.cache
+        stale.timer = self.clock
+        return stale
+
+    def compute(self, value):
+        def compute():
+            self.computed.append(value)
+            return value
+        return compute
+
+    def entry(self, key='key'):
+        return self.cache.get(self.stale.key('entry', key))
+
+
+class StaleCacheTests(StaleCacheMixin, SimpleTestCase):
+
+    def test_stale_served_while_other_holds_lock(self):
+        self.stale.get('key', self.compute('old'))
+        self.clock.now += OPTIONS['SOFT_TTL'] + 1
+        self.cache.add(self.stale.key('lock', 'key'), 99)
+        self.assertEqual(self.stale.get('key', self.compute('new')), 'old')
+        self.assertEqual(self.computed, ['old'])
+
+    def test_expired_lock_does_not_overwrite_newer_entry(self):
+        other = self.make()
+
+        def slow():
+            # Блокировка истекла, пока считали: пересчёт начал другой.
+            self.cache.delete(self.stale.key('lock', 'key'))
+            self.assertEqual(other.get('key', self.compute('new')), 'new')
+            return 'old'
+
+        self.assertEqual(self.stale.get('key', slow), 'old')
+        self.assertEqual(self.entry()[0], 'new')
+        self.assertEqual(self.stale.get('key', self.compute('x')), 'new')
+
+    def test_breaker_opens_after_threshold(self):
+        self.stale.get('key', self.compute('old'))
+
+        def fail():
+            self.computed.append('fail')
+            raise DatabaseError('timeout')
+
+        for _ in range(OPTIONS['BREAKER_THRESHOLD']):
+            self.clock.now += OPTIONS['SOFT_TTL'] + 1
+            self.assertFalse(self.stale.breaker_open())
+            with self.assertLogs('core.cache', 'WARNING'):
+                self.assertEqual(self.stale.get('key', fail), 'old')
+        self.assertTrue(self.stale.breaker_open())
+        # Пока предохранитель открыт, пересчёт не запускается.
+        self.assertEqual(self.stale.get('key', fail), 'old')
+        self.assertEqual(
+            self.computed, ['old'] + ['fail'] * OPTIONS['BREAKER_THRESHOLD'])
+
+    def test_failure_without_entry_raises(self):
+        def fail():
+            raise DatabaseError('timeout')
+
+        with self.assertRaises(DatabaseError):
+            self.stale.get('key', fail)
+        self.assertIsNone(self.cache.get(self.stale.key('lock', 'key')))
+
+    def test_waits_for_other_computation(self):
+        self.cache.add(self.stale.key('lock', 'key'), 99)
+
+        def sleep(seconds):
+            self.clock.now += seconds
+            self.cache.set(self.stale.key('entry', 'key'),
+                           ('other', self.clock.now, 99))
+
+        with mock.patch.object(stale_cache.time, 'sleep', sleep):
+            self.assertEqual(self.stale.get('key', self.compute('x')),
+                             'other')
+        self.assertEqual(self.computed, [])
+
+    def test_evicted_fence_counter_is_reset(self):
+        self.stale.get('key', self.compute('first'))
+        fence = self.stale.key('fence', 'key')
+        for reset in ('evicted', 'lower'):
+            with self.subTest(reset=reset):
+                token = self.entry()[2]
+                if reset == 'evicted':
+                    self.cache.delete(fence)
+                else:
+                    self.cache.set(fence, 0)
+                self.clock.now += OPTIONS['SOFT_TTL'] + 1
+                self.stale.get('key', self.compute(reset))
+                # Запись с новым номером принята, а не отвергнута.
+                self.assertEqual(self.entry()[0], reset)
+                self.assertGreater(self.entry()[2], token)
+
+
+class InvalidateTests(StaleCacheMixin, TestCase):
+
+    def test_only_after_commit(self):
+        for key in ('one', 'two'):
+            self.stale.get(key, self.compute(key), group=key)
+        self.clock.now += 1
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.stale.invalidate('one')
+            self.assertEqual(
+                self.stale.get('one', self.compute('new'), group='one'),
+                'one')
+        self.assertEqual(
+            self.stale.get('one', self.compute('new one'), group='one'),
+            'new one')
+        self.assertEqual(
+            self.stale.get('two', self.compute('new two'), group='two'),
+            'two')
+
+        self.clock.now += 1
+        with self.captureOnCommitCallbacks(execute=True):
+            self.stale.invalidate()
+            self.assertEqual(
+                self.stale.get('two', self.compute('new'), group='two'),
+                'two')
+        self.assertEqual(
+            self.stale.get('two', self.compute('new two'), group='two'),
+            'new two')
+        self.assertEqual(self.computed, ['one', 'two', 'new one', 'new two'])
+
+    def test_rolled_back_change_does_not_invalidate(self):
+        self.stale.get('key', self.compute('old'))
+        self.clock.now += 1
+        with self.captureOnCommitCallbacks():
+            self.stale.invalidate()
+        self.assertEqual(self.stale.get('key', self.compute('new')), 'old')
+
+
+class CompareAndSetTests(SimpleTestCase):
+
+    def setUp(self):
+        self.cache = PyMemcacheCache('fake:11211', {})
+        self.client = FakeMemcacheClient()
+        self.cache.__dict__['_cache'] = self.client
+        self.key = self.cache.make_key('swr:test:entry:key')
+
+    def newer(self, token):
+        def update(current):
+            if current is not None and current[2] > token:
+                return None
+            return ('value', 0, token)
+        return update
+
+    def test_add_then_cas(self):
+        self.assertTrue(stale_cache.compare_and_set(
+            self.cache, 'swr:test:entry:key', self.newer(1), 60))
+        self.assertTrue(stale_cache.compare_and_set(
+            self.cache, 'swr:test:entry:key', self.newer(2), 60))
+        self.assertFalse(stale_cache.compare_and_set(
+            self.cache, 'swr:test:entry:key', self.newer(1), 60))
+        self.assertEqual(self.client.data[self.key][0][2], 2)
+
+    def test_concurrent_newer_write_wins(self):
+        stale_cache.compare_and_set(
+            self.cache, 'swr:test:entry:key', self.newer(1), 60)
+
+        def race(key):
+            # Между gets и cas запись с номером 3 успел сделать другой.
+            self.client.before_cas = None
+            self.client.write(key, ('newer', 0, 3))
+
+        self.client.before_cas = race
+        self.assertFalse(stale_cache.compare_and_set(
+            self.cache, 'swr:test:entry:key', self.newer(2), 60))
+        self.assertEqual(self.client.data[self.key][0], ('newer', 0, 3))
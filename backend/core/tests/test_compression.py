@@ -0,0 +1,159 @@
+import gzip
+import json
+from unittest import mock
+
+import brotli
+from core import compression
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.test import SimpleTestCase, override_settings
+from django.urls import path
+
+BODY = {'items': [{'id': number, 'name': 'Соль'} for number in range(200)]}
+LINES = [f'Соль (г) — {number}\n'.encode() for number in range(500)]
+
+
+def json_view(request):
+    return JsonResponse(BODY)
+
+
+def small_view(request):
+    return JsonResponse({'id': 1})
+
+
+def html_view(request):
+    return HttpResponse('<p>csrf</p>' * 500)
+
+
+def stream_view(request):
+    return StreamingHttpResponse(
+        iter(LINES), content_type='text/plain; charset=utf-8')
+
+
+urlpatterns = [
+    path('json/', json_view),
+    path('small/', small_view),
+    path('html/', html_view),
+    path('stream/', stream_view),
+]
+
+
+def decompress(content, coding):
+    if coding == 'br':
+        return brotli.decompress(content)
+    return gzip.decompress(content)
+
+
+class ChooseTests(SimpleTestCase):
+
+    def test_q_values(self):
+        cases = {
+            '': None,
+            'identity': None,
+            'gzip': 'gzip',
+            'gzip, br': 'br',
+            'br;q=0.5, gzip': 'gzip',
+            'br;q=0, gzip;q=0.1': 'gzip',
+            'br;q=0, gzip;q=0': None,
+            'gzip;q=bad': None,
+            '*': 'br',
+            '*;q=0': None,
+            'br;q=0, *': 'gzip',
+            'GZIP;Q=0.8, deflate': 'gzip',
+        }
+        for header, coding in cases.items():
+            with self.subTest(header=header):
+                self.assertEqual(compression.choose(header), coding)
+
+    def test_without_brotli(self):
+        with mock.patch.object(compression, 'brotli', None):
+            self.assertEqual(compression.choose('br, gzip;q=0.1'), 'gzip')
+            self.assertIsNone(compression.choose('br'))
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class CompressionMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url, coding, **headers):
+        return self.client.get(url, HTTP_ACCEPT_ENCODING=coding, **headers)
+
+    def test_compressed(self):
+        for coding in ('br', 'gzip'):
+            with self.subTest(coding=coding):
+                response = self.get('/json/', coding)
+                self.assertEqual(response['Content-Encoding'], coding)
+                self.assertEqual(response['Vary'], 'Accept-Encoding')
+                self.assertEqual(
+                    int(response['Content-Length']), len(response.content))
+                self.assertEqual(
+                    json.loads(decompress(response.content, coding)), BODY)
+
+    def test_etag_weakened_and_not_modified(self):
+        response = self.get('/json/', 'gzip')
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        # То же содержимое в другой кодировке — тот же ETag.
+        self.assertEqual(self.get('/json/', 'br')['ETag'], etag)
+        for value in (etag, etag.removeprefix('W/'), '*'):
+            with self.subTest(value=value):
+                response = self.get(
+                    '/json/', 'gzip', HTTP_IF_NONE_MATCH=value)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                self.assertFalse(response.has_header('Content-Encoding'))
+        response = self.get('/json/', 'gzip', HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_stream_round_trip(self):
+        for coding in ('br', 'gzip'):
+            with self.subTest(coding=coding):
+                response = self.get('/stream/', coding)
+                self.assertEqual(response['Content-Encoding'], coding)
+                self.assertFalse(response.has_header('Content-Length'))
+                chunks = list(response.streaming_content)
+                # Куски уходят по мере генерации, а не одним телом.
+                self.assertGreater(len(chunks), 1)
+                self.assertEqual(
+                    decompress(b''.join(chunks), coding), b''.join(LINES))
+
+    def test_not_compressed(self):
+        cases = {
+            # Меньше MIN_SIZE: сжатие не окупается.
+            'small': ('/small/', 'gzip'),
+            # HTML не сжимается: защита от BREACH.
+            'html': ('/html/', 'gzip, br'),
+            'identity': ('/json/', 'identity'),
+        }
+        for name, (url, coding) in cases.items():
+            with self.subTest(name):
+                response = self.get(url, coding)
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(response.has_header('Content-Encoding'))
+        html = self.get('/html/', 'gzip')
+        self.assertEqual(html.content, b'<p>csrf</p>' * 500)
+        self.assertNotIn('Accept-Encoding', html.get('Vary', ''))
+
+    def test_anonymous_body_cached(self):
+        with mock.patch.object(
+                compression, 'compress',
+                wraps=compression.compress) as compress:
+            first = self.get('/json/', 'gzip')
+            second = self.get('/json/', 'gzip')
+            self.assertEqual(compress.call_count, 1)
+            self.assertEqual(second.content, first.content)
+            self.get('/json/', 'br')
+            self.assertEqual(compress.call_count, 2)
+            # Ответы с токеном не кешируются.
+            for _ in range(2):
+                self.get('/json/', 'gzip', HTTP_AUTHORIZATION='Token abc')
+            self.assertEqual(compress.call_count, 4)
+            with override_settings(COMPRESSION={
+                    **settings.COMPRESSION, 'CACHE_MAX_SIZE': 10}):
+                cache.clear()
+                self.get('/json/', 'gzip')
+                self.get('/json/', 'gzip')
+            self.assertEqual(compress.call_count, 6)
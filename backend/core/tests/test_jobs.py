@@ -0,0 +1,88 @@
+from datetime import timedelta
+from unittest import mock
+
+from core import jobs
+from core.models import Job
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+
+@jobs.job(name='tests.noop')
+def noop():
+    pass
+
+
+@jobs.job(name='tests.periodic', every=60)
+def periodic():
+    pass
+
+
+@override_settings(JOBS={
+    'MAX_ATTEMPTS': 3,
+    'BACKOFF': 1,
+    'MAX_BACKOFF': 1,
+    'POLL_INTERVAL': 0,
+    'TIMEOUT': 60,
+})
+class JobQueueTests(TestCase):
+    def setUp(self):
+        # Воркер закрывает соединения после задачи; в TestCase это
+        # закрыло бы соединение посреди транзакции теста.
+        patcher = mock.patch.object(jobs, 'close_old_connections')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def claim(self):
+        jobs.enqueue(noop)
+        return jobs.claim(['tests.noop'])
+
+    def test_long_job_with_heartbeat_not_requeued(self):
+        job = self.claim()
+        long_ago = timezone.now() - timedelta(minutes=10)
+        Job.objects.filter(pk=job.pk).update(
+            started=long_ago, heartbeat=long_ago)
+        jobs.heartbeat([job.pk])
+        self.assertEqual(jobs.requeue_stale(), 0)
+        self.assertEqual(Job.objects.get().status, Job.RUNNING)
+
+    def test_job_without_heartbeat_requeued(self):
+        job = self.claim()
+        long_ago = timezone.now() - timedelta(minutes=10)
+        Job.objects.filter(pk=job.pk).update(heartbeat=long_ago)
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(Job.objects.get().status, Job.QUEUED)
+
+    def test_metrics_error_does_not_escape(self):
+        job = self.claim()
+        with mock.patch.object(
+                jobs.JOB_LAG, 'labels', side_effect=FileNotFoundError):
+            jobs.run(job)
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('FileNotFoundError', job.last_error)
+
+    def test_success(self):
+        jobs.run(self.claim())
+        self.assertFalse(Job.objects.exists())
+
+    def test_periodic_scheduled_once(self):
+        jobs.schedule()
+        jobs.schedule()
+        job = Job.objects.get(name='tests.periodic')
+        self.assertLessEqual(job.run_at, timezone.now())
+
+    def test_periodic_requeued_after_run(self):
+        jobs.schedule()
+        job = jobs.claim(['tests.periodic'])
+        jobs.run(job)
+        job = Job.objects.get(name='tests.periodic')
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=50))
+        jobs.schedule()
+        self.assertEqual(Job.objects.filter(name='tests.periodic').count(), 1)
+
+    def test_periodic_duplicate_not_requeued(self):
+        jobs.enqueue(periodic)
+        jobs.enqueue(periodic)
+        jobs.run(jobs.claim(['tests.periodic']))
+        self.assertEqual(Job.objects.filter(name='tests.periodic').count(), 1)
@@ -0,0 +1,70 @@
+import http.client
+import json
+from unittest import mock
+
+from core.loadtest import Client, prepare
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+
+
+def responses(*items):
+    return [
+        (status, json.dumps(body).encode()) for status, body in items
+    ]
+
+
+class PrepareTests(SimpleTestCase):
+
+    def test_failed_login_stops(self):
+        with mock.patch.object(Client, 'request', side_effect=responses(
+                (201, {'id': 1}), (400, {'non_field_errors': ['нет']}))):
+            with self.assertRaisesMessage(RuntimeError, 'Вход: 400'):
+                prepare('http://localhost:8000', 1)
+
+    def test_command_error(self):
+        with mock.patch.object(Client, 'request', side_effect=responses(
+                (201, {'id': 1}), (401, {}))):
+            with self.assertRaisesMessage(CommandError, 'Вход: 401'):
+                call_command('loadtest', users=1)
+
+    def test_tokens(self):
+        with mock.patch.object(Client, 'request', side_effect=responses(
+                (201, {'id': 1}), (200, {'auth_token': 'abc'}),
+                (200, [{'id': 1, 'slug': 'lunch'}]),
+                (200, [{'id': 5}]),
+                (200, {'results': [{'id': 7, 'author': {'id': 3}}]}))):
+            data = prepare('http://localhost:8000', 1)
+        self.assertEqual(data['tokens'], ['abc'])
+        self.assertEqual(data['recipes'], [7])
+        self.assertEqual(data['authors'], [3])
+
+
+class ClientTests(SimpleTestCase):
+
+    def response(self, status):
+        response = mock.Mock(status=status)
+        response.read.return_value = b'{}'
+        return response
+
+    def test_retries_stale_keep_alive(self):
+        client = Client('http://localhost:8000')
+        client.connection = mock.Mock()
+        client.connection.getresponse.side_effect = [
+            self.response(200),
+            http.client.RemoteDisconnected('closed'),
+            self.response(201),
+        ]
+        self.assertEqual(client.request('GET', '/api/tags/')[0], 200)
+        self.assertEqual(client.request('POST', '/api/tags/')[0], 201)
+        self.assertEqual(client.connection.request.call_count, 3)
+
+    def test_fresh_connection_not_retried(self):
+        client = Client('http://localhost:8000')
+        client.connection = mock.Mock()
+        client.connection.getresponse.side_effect = [
+            http.client.RemoteDisconnected('closed'),
+            self.response(200),
+        ]
+        with self.assertRaises(http.client.RemoteDisconnected):
+            client.request('GET', '/api/tags/')
+        self.assertEqual(client.connection.request.call_count, 1)
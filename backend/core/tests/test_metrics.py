@@ -0,0 +1,100 @@
+from django.core.cache import cache
+from prometheus_client.parser import text_string_to_metric_families
+from recipes.models import Recipe, Tag
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+from users.models import User
+
+
+def scrape(client):
+    """Значения метрик /metrics: {(имя, метки): значение}."""
+    response = client.get('/metrics')
+    samples = {}
+    for family in text_string_to_metric_families(response.content.decode()):
+        for sample in family.samples:
+            labels = tuple(sorted(sample.labels.items()))
+            samples[sample.name, labels] = sample.value
+    return response, samples
+
+
+def value(samples, name, **labels):
+    return samples.get((name, tuple(sorted(labels.items()))), 0)
+
+
+class MetricsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='cook@example.com', username='cook',
+            first_name='Cook', last_name='Cook', password='pw')
+        cls.token = Token.objects.create(user=cls.user)
+        Tag.objects.create(name='Завтрак', color='#fff000', slug='breakfast')
+        cls.recipe = Recipe.objects.create(
+            author=cls.user, name='Борщ', text='Текст', cooking_time=5,
+            image='recipe/img/borsch.png')
+
+    def setUp(self):
+        cache.clear()
+        self.auth_client = APIClient()
+        self.auth_client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_exposition_format(self):
+        response, samples = scrape(self.client)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertTrue(samples)
+
+    def test_request_metrics(self):
+        _, before = scrape(self.client)
+        self.client.get('/api/tags/')
+        self.client.get('/api/tags/')
+        _, after = scrape(self.client)
+        view = 'recipes:tags-list'
+        self.assertEqual(
+            value(after, 'foodgram_requests_total',
+                  view=view, method='GET', status='200')
+            - value(before, 'foodgram_requests_total',
+                    view=view, method='GET', status='200'),
+            2)
+        for name in ('foodgram_request_latency_seconds_count',
+                     'foodgram_db_queries_count',
+                     'foodgram_db_time_seconds_count',
+                     'foodgram_response_size_bytes_count'):
+            labels = {'view': view}
+            if name.startswith('foodgram_request_latency'):
+                labels['method'] = 'GET'
+            with self.subTest(metric=name):
+                self.assertEqual(
+                    value(after, name, **labels)
+                    - value(before, name, **labels), 2)
+
+    def test_action_outcomes(self):
+        _, before = scrape(self.client)
+        url = f'/api/recipes/{self.recipe.pk}/favorite/'
+        self.auth_client.post(url)
+        self.auth_client.post(url)
+        self.auth_client.delete(url)
+        _, after = scrape(self.client)
+        for outcome in ('created', 'duplicate', 'deleted'):
+            with self.subTest(outcome=outcome):
+                self.assertEqual(
+                    value(after, 'foodgram_recipe_actions_total',
+                          model='favorite', outcome=outcome)
+                    - value(before, 'foodgram_recipe_actions_total',
+                            model='favorite', outcome=outcome),
+                    1)
+
+    def test_cache_lookups(self):
+        _, before = scrape(self.client)
+        self.auth_client.get('/api/users/me/')
+        self.auth_client.get('/api/users/me/')
+        _, after = scrape(self.client)
+        for result in ('hit', 'miss'):
+            with self.subTest(result=result):
+                self.assertGreaterEqual(
+                    value(after, 'foodgram_cache_requests_total',
+                          cache='auth_token', result=result)
+                    - value(before, 'foodgram_cache_requests_total',
+                            cache='auth_token', result=result),
+                    1)
@@ -0,0 +1,218 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, skipUnless
+
+from core import concurrency
+from core.db.backends.postgresql.base import DatabaseWrapper, start_request
+from core.db.pool import ConnectionPool, PoolTimeout
+from django.db import connection
+from django.test import SimpleTestCase
+from psycopg2.extensions import (TRANSACTION_STATUS_IDLE,
+                                 TRANSACTION_STATUS_INTRANS)
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, sql):
+        self.connection.queries.append(sql)
+        if self.connection.dead:
+            raise OSError('server closed the connection')
+
+
+class FakeConnection:
+    """Соединение psycopg2 в той мере, в какой его трогает пул."""
+
+    def __init__(self):
+        self.closed = 0
+        self.dead = False
+        self.status = TRANSACTION_STATUS_IDLE
+        self.fail_rollback = False
+        self.queries = []
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        if self.fail_rollback:
+            raise OSError('rollback failed')
+        self.status = TRANSACTION_STATUS_IDLE
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def setUp(self):
+        self.connections = []
+
+    def connect(self):
+        connection = FakeConnection()
+        self.connections.append(connection)
+        return connection
+
+    def pool(self, max_size=2, timeout=1, check_idle=30):
+        return ConnectionPool('test', max_size, timeout, check_idle)
+
+    def test_reuses_returned_connection(self):
+        pool = self.pool()
+        first = pool.get(self.connect)
+        pool.put(first)
+        self.assertIs(pool.get(self.connect), first)
+        self.assertEqual(len(self.connections), 1)
+        self.assertEqual(first.queries, [])
+
+    def test_concurrent_checkout(self):
+        pool = self.pool(max_size=3, timeout=5)
+        lock = threading.Lock()
+        in_use, peak = set(), []
+
+        def work(_):
+            connection = pool.get(self.connect)
+            with lock:
+                self.assertNotIn(connection, in_use)
+                in_use.add(connection)
+                peak.append(len(in_use))
+            time.sleep(0.005)
+            with lock:
+                in_use.discard(connection)
+            pool.put(connection)
+
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            list(executor.map(work, range(100)))
+        self.assertLessEqual(max(peak), 3)
+        self.assertLessEqual(len(self.connections), 3)
+        self.assertEqual(pool.size, len(self.connections))
+
+    def test_timeout(self):
+        pool = self.pool(max_size=1, timeout=0.05)
+        pool.get(self.connect)
+        with self.assertRaises(PoolTimeout):
+            pool.get(self.connect)
+
+    def test_waiter_gets_returned_connection(self):
+        pool = self.pool(max_size=1, timeout=5)
+        first = pool.get(self.connect)
+        timer = threading.Timer(0.05, pool.put, (first,))
+        timer.start()
+        self.assertIs(pool.get(self.connect), first)
+        timer.join()
+
+    def test_idle_health_check(self):
+        pool = self.pool(check_idle=0)
+        first = pool.get(self.connect)
+        pool.put(first)
+        self.assertIs(pool.get(self.connect), first)
+        self.assertEqual(first.queries, ['SELECT 1'])
+
+        # Умершее в пуле соединение закрывается и заменяется новым.
+        first.dead = True
+        pool.put(first)
+        second = pool.get(self.connect)
+        self.assertIsNot(second, first)
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.size, 1)
+
+    def test_put_rolls_back_open_transaction(self):
+        pool = self.pool()
+        first = pool.get(self.connect)
+        first.status = TRANSACTION_STATUS_INTRANS
+        pool.put(first)
+        self.assertEqual(first.status, TRANSACTION_STATUS_IDLE)
+        self.assertIs(pool.get(self.connect), first)
+
+        first.status = TRANSACTION_STATUS_INTRANS
+        first.fail_rollback = True
+        pool.put(first)
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.size, 0)
+
+    def test_broken_connection_frees_slot(self):
+        pool = self.pool(max_size=1, timeout=0.05)
+        first = pool.get(self.connect)
+        pool.put(first, broken=True)
+        self.assertTrue(first.closed)
+        self.assertIsNot(pool.get(self.connect), first)
+
+    def test_connect_failure_frees_slot(self):
+        pool = self.pool(max_size=1, timeout=0.05)
+
+        def fail():
+            raise OSError('could not connect')
+
+        with self.assertRaises(OSError):
+            pool.get(fail)
+        self.assertEqual(pool.size, 0)
+        pool.get(self.connect)
+
+
+@skipUnless(connection.vendor == 'postgresql',
+            'Проверка соединений есть только в PostgreSQL.')
+class HealthCheckTests(SimpleTestCase):
+    """Постоянное соединение проверяется раз на HTTP-запрос."""
+
+    databases = {'default'}
+
+    def setUp(self):
+        # Один поток ORM: все переходы run_sync идут через одно соединение.
+        executor = ThreadPoolExecutor(max_workers=1)
+        patcher = mock.patch.object(concurrency, '_executor', executor)
+        patcher.start()
+        self.addCleanup(executor.shutdown)
+        self.addCleanup(patcher.stop)
+        self.checks = []
+        is_usable = DatabaseWrapper.is_usable
+
+        def counting_is_usable(wrapper):
+            self.checks.append(wrapper.alias)
+            return is_usable(wrapper)
+
+        patcher = mock.patch.object(
+            DatabaseWrapper, 'is_usable', counting_is_usable)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        concurrency._executor.submit(lambda: connection.close()).result()
+
+    def query(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+    async def request(self, hops):
+        # Как ASGIHandler: request_started, затем view по потокам.
+        start_request()
+        for _ in range(hops):
+            await concurrency.run_sync(self.query)
+
+    def test_once_per_request_across_thread_hops(self):
+        asyncio.run(self.request(3))
+        # Новое соединение не проверяется.
+        self.assertEqual(self.checks, [])
+        asyncio.run(self.request(3))
+        self.assertEqual(self.checks, ['default'])
+        asyncio.run(self.request(5))
+        self.assertEqual(self.checks, ['default', 'default'])
+
+    def test_dead_connection_replaced(self):
+        asyncio.run(self.request(1))
+        pid = concurrency._executor.submit(
+            lambda: connection.connection.get_backend_pid()).result()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+        connection.close()
+        asyncio.run(self.request(2))
+        self.assertEqual(self.checks, ['default'])
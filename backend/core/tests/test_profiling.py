@@ -0,0 +1,66 @@
+import tempfile
+from unittest import mock
+
+from core import profiling
+from core.models import RequestProfile
+from django.contrib.auth.models import AnonymousUser
+from django.core.signals import request_finished
+from django.db import close_old_connections
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import resolve
+
+
+@override_settings(PROFILER={
+    'ENABLED': True,
+    'SAMPLE_RATE': 0,
+    'VIEWS': [],
+    'INTERVAL': 0.001,
+    'MAX_SAMPLES': 100,
+    'MAX_CONCURRENT': 2,
+    'MAX_PROFILES': 10,
+    'DIR': tempfile.mkdtemp(),
+    'TOKEN_MAX_AGE': 60,
+})
+class ProfilingRequestTests(TestCase):
+    def setUp(self):
+        # Закрытие ответа шлёт request_finished; как тестовый клиент,
+        # не закрываем соединение посреди транзакции теста.
+        request_finished.disconnect(close_old_connections)
+        self.addCleanup(request_finished.connect, close_old_connections)
+        profiling._slots = None
+        self.request = RequestFactory().get('/api/tags/')
+        self.request.user = AnonymousUser()
+        self.request.resolver_match = resolve('/api/tags/')
+
+    def start(self):
+        self.assertTrue(profiling.acquire_slot())
+        return profiling.ProfilingRequest(triggered=True)
+
+    def test_streaming_profile_saved_after_body(self):
+        state = self.start()
+        response = StreamingHttpResponse(iter([b'a', b'b']))
+        state.attach(self.request, response)
+        self.assertFalse(RequestProfile.objects.exists())
+        self.assertEqual(b''.join(response.streaming_content), b'ab')
+        self.assertEqual(RequestProfile.objects.count(), 1)
+        # Повторное закрытие ответа сервером профиль не дублирует.
+        response.close()
+        self.assertEqual(RequestProfile.objects.count(), 1)
+
+    def test_unread_streaming_body_releases_slot(self):
+        for _ in range(3):
+            state = self.start()
+            response = StreamingHttpResponse(iter([b'a']))
+            state.attach(self.request, response)
+            response.close()
+        self.assertEqual(RequestProfile.objects.count(), 3)
+
+    def test_save_error_does_not_break_response(self):
+        state = self.start()
+        with mock.patch.object(
+                profiling, 'save_profile', side_effect=OSError('disk full')), \
+                self.assertLogs('core.profiling', 'ERROR'):
+            state.attach(self.request, HttpResponse('ok'))
+        # Слот освобождён и после ошибки.
+        self.assertTrue(profiling.acquire_slot())
@@ -0,0 +1,103 @@
+from unittest import mock
+
+from core.middleware import ReplicaMiddleware
+from django.conf import settings
+from django.db import connections, router
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Recipe, Tag
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from users.models import User
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2', 'replica3'])
+class ReplicaMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        pinned = mock.patch.object(
+            ReplicaMiddleware, 'is_pinned', return_value=False)
+        pinned.start()
+        self.addCleanup(pinned.stop)
+
+    def reads(self, request, count=20):
+        """Базы, выбранные роутером для count чтений в одном запросе."""
+        aliases = []
+
+        def view(request):
+            aliases.extend(
+                router.db_for_read(Recipe) for _ in range(count))
+            return HttpResponse(status=404)
+
+        ReplicaMiddleware(view)(request)
+        return aliases
+
+    def test_one_replica_per_request(self):
+        for _ in range(10):
+            aliases = set(self.reads(self.factory.get('/api/recipes/')))
+            self.assertEqual(len(aliases), 1)
+            self.assertIn(aliases.pop(), settings.DATABASE_REPLICAS)
+
+    def test_unsafe_and_pinned_requests_read_primary(self):
+        self.assertEqual(
+            set(self.reads(self.factory.post('/api/recipes/'))), {'default'})
+        ReplicaMiddleware.is_pinned.return_value = True
+        self.assertEqual(
+            set(self.reads(self.factory.get('/api/recipes/'))), {'default'})
+
+    def test_outside_request(self):
+        self.assertEqual(router.db_for_read(Recipe), 'default')
+        self.assertEqual(router.db_for_write(Recipe), 'default')
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """Чтение с реплики через отдельное соединение.
+
+    Нужна настроенная реплика (DB_REPLICA_HOSTS); в тестах она —
+    зеркало основной базы (TEST MIRROR), но со своим соединением.
+    """
+
+    databases = '__all__'
+
+    def setUp(self):
+        if not settings.DATABASE_REPLICAS:
+            self.skipTest('Реплики не настроены (DB_REPLICA_HOSTS).')
+        user = User.objects.create_user(
+            email='cook@example.com', username='cook',
+            first_name='Cook', last_name='Cook', password='pw')
+        Tag.objects.create(name='Завтрак', color='#fff000', slug='breakfast')
+        self.recipe = Recipe.objects.create(
+            author=user, name='Борщ', text='Текст', cooking_time=5,
+            image='recipe/img/borsch.png')
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user)}')
+
+    def queries(self, method, url):
+        """Число запросов к каждой базе за один HTTP-запрос."""
+        contexts = {
+            alias: CaptureQueriesContext(connections[alias])
+            for alias in connections
+        }
+        for context in contexts.values():
+            context.__enter__()
+        try:
+            getattr(self.client, method)(url)
+        finally:
+            for context in contexts.values():
+                context.__exit__(None, None, None)
+        return {alias: len(context)
+                for alias, context in contexts.items() if len(context)}
+
+    def test_reads_go_to_one_replica(self):
+        used = self.queries('get', f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(len(used), 1)
+        self.assertIn(next(iter(used)), settings.DATABASE_REPLICAS)
+
+    def test_write_pins_client_to_primary(self):
+        used = self.queries('post', f'/api/recipes/{self.recipe.pk}/favorite/')
+        self.assertEqual(set(used), {'default'})
+        used = self.queries('get', f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(set(used), {'default'})
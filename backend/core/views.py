@@ -0,0 +1,12 @@
+from django.http import HttpResponse
+
+from .metrics import exposition
+
+
+def metrics_view(request):
+    """Метрики для Prometheus.
+
+    Эндпоинт внутренний: gateway проксирует только /api/ и /admin/.
+    """
+    content, content_type = exposition()
+    return HttpResponse(content, content_type=content_type)
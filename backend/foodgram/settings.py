@@ -25,11 +25,16 @@ INSTALLED_APPS = [
     'djoser',
     'django_filters',
     'recipes.apps.RecipesConfig',
+    'core.apps.CoreConfig',
 ]
 
 AUTH_USER_MODEL = 'users.User'
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,20 +64,108 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
+ASGI_APPLICATION = 'foodgram.asgi.application'
+
+# ASGI-режим: gunicorn с воркерами uvicorn, см. gunicorn.conf.py.
+ASGI = os.getenv('ASGI') == 'True'
+
+# Потоки для ORM и кеша в ASGI-режиме.
+ASGI_ORM_THREADS = int(os.getenv('ASGI_ORM_THREADS', 10))
+
+if not ASGI:
+    MIDDLEWARE.append('core.middleware.ProfilingMiddleware')
+
 
 # Database
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.backends.postgresql',
         'NAME': os.getenv('POSTGRES_DB', 'django'),
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', 'localhost'),
         'PORT': os.getenv('DB_PORT', 5432),
+        # Постоянные соединения с проверкой перед использованием.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        # Пул соединений для воркеров с потоками (gunicorn --threads).
+        'POOL': {
+            'ENABLED': os.getenv('DB_POOL') == 'True',
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 5)),
+            'CHECK_IDLE': 30,
+        },
+        # PgBouncer в режиме transaction не поддерживает серверные курсоры.
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DB_POOLER') == 'transaction',
     }
 }
 
+# Реплики для чтения: DB_REPLICA_HOSTS='replica1,replica2'.
+DATABASE_REPLICAS = []
+for number, host in enumerate(
+        filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['core.db.routers.PrimaryReplicaRouter']
+
+# Допустимое отставание реплик: столько секунд после записи клиент
+# читает из основной базы.
+REPLICA_LAG_TOLERANCE = int(os.getenv('REPLICA_LAG_TOLERANCE', 5))
+
+
+# Cache
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Сжатие ответов (core.middleware.CompressionMiddleware). Сжатые тела
+# анонимных ответов до CACHE_MAX_SIZE байт хранятся CACHE_TTL секунд.
+# HTML не сжимается: страницы админки с CSRF-токеном уязвимы к BREACH.
+COMPRESSION = {
+    'MIN_SIZE': 1024,
+    'CONTENT_TYPES': (
+        'application/json',
+        'text/plain',
+        'text/csv',
+        'text/css',
+        'application/javascript',
+    ),
+    'BROTLI_QUALITY': 5,
+    'GZIP_LEVEL': 6,
+    'CACHE_TTL': 5 * 60,
+    'CACHE_MAX_SIZE': 256 * 1024,
+}
+
+# Кеш ответов core.cache.StaleCache, секунды: запись свежая SOFT_TTL,
+# хранится HARD_TTL; блокировка пересчёта живёт LOCK_TTL, без записи
+# ждём чужой пересчёт LOCK_WAIT. Пересчёт дольше SLOW или с ошибкой
+# базы — сбой; BREAKER_THRESHOLD сбоев за BREAKER_WINDOW открывают
+# предохранитель на BREAKER_OPEN.
+STALE_CACHE = {
+    'SOFT_TTL': 30,
+    'HARD_TTL': 60 * 60,
+    'LOCK_TTL': 10,
+    'LOCK_WAIT': 2,
+    'SLOW': 2,
+    'BREAKER_THRESHOLD': 5,
+    'BREAKER_WINDOW': 60,
+    'BREAKER_OPEN': 30,
+}
+
+# Время жизни снимка пользователя для CachedTokenAuthentication, сек.
+AUTH_TOKEN_CACHE_TTL = int(os.getenv('AUTH_TOKEN_CACHE_TTL', 60))
+
 
 # Password validation
 
@@ -117,6 +210,22 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = '/media'
 
+# Файл картинки моложе стольких секунд не удаляется, даже если на него
+# нет ссылок: его может ждать ещё не зафиксированный рецепт
+# (recipes.storage.HashedStorage).
+IMAGE_DELETE_GRACE = 10 * 60
+
+# Период пересчёта статистики авторов, тегов и ингредиентов
+# (задача recipes.jobs.refresh_stats, её ставит в очередь воркер).
+STATS_REFRESH_INTERVAL = int(os.getenv('STATS_REFRESH_INTERVAL', 15 * 60))
+
+# Снимки каталога ингредиентов и тегов (recipes.catalog), их отдаёт nginx.
+CATALOG = {
+    'ROOT': os.getenv('CATALOG_ROOT', '/static/catalog'),
+    'URL': '/catalog/',
+    'KEEP': 3,
+}
+
 # Default primary key field type
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -137,7 +246,16 @@ DJOSER = {
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'recipes.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'recipes.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -145,4 +263,63 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'recipes.pagination.PageLimitNumberPagination',
     'PAGE_SIZE': 6,
     'SEARCH_PARAM': 'name',
+    # Частоты для recipes.throttling по throttle_scopes вьюсетов.
+    'DEFAULT_THROTTLE_RATES': {
+        'recipe_create': '30/h',
+        'recipe_create_ip': '60/h',
+        'shopping_cart': '10/m',
+        'shopping_cart_ip': '30/m',
+        'ingredient_search': '120/m',
+        'ingredient_search_ip': '300/m',
+    },
+    # За nginx: IP клиента — последний адрес в X-Forwarded-For.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 1)),
+}
+
+# Очередь задач в PostgreSQL (core.jobs, manage.py run_worker).
+JOBS = {
+    'MAX_ATTEMPTS': 5,
+    # Пауза перед повтором: BACKOFF * 2 ** (попытка - 1), не больше MAX.
+    'BACKOFF': 10,
+    'MAX_BACKOFF': 60 * 60,
+    'POLL_INTERVAL': 1,
+    # Задача в статусе running, чей воркер не отмечался (heartbeat)
+    # дольше TIMEOUT, считается брошенной. Отметки — раз в TIMEOUT / 10.
+    'TIMEOUT': 10 * 60,
+}
+
+# Похожие рецепты (recipes.similarity): K соседей на рецепт, порции
+# строк и пар рецептов с общим ингредиентом и число процессов для
+# полного пересчёта.
+SIMILARITY = {
+    'K': 10,
+    'CHUNK_SIZE': 1000,
+    'CHUNK_PAIRS': 10_000_000,
+    'PROCESSES': int(os.getenv('SIMILARITY_PROCESSES', 2)),
+}
+
+# Размер порции при массовом удалении (recipes.deletion).
+DELETION_BATCH_SIZE = 1000
+
+# Размер порции при пересборке снимков рецептов (recipes.snapshots).
+SNAPSHOT_BATCH_SIZE = 500
+
+# Максимум id в пакетных запросах /recipes/batch/ и /users/batch/.
+BATCH_MAX_SIZE = 100
+
+PROFILER = {
+    'ENABLED': os.getenv('PROFILER_ENABLED') == 'True',
+    # Доля профилируемых запросов к VIEWS.
+    'SAMPLE_RATE': float(os.getenv('PROFILER_SAMPLE_RATE', 0)),
+    'VIEWS': [
+        'recipes:recipes-download-shopping-cart',
+        'users:users-subscriptions',
+    ],
+    # Интервал между сэмплами стека и их максимальное число на запрос.
+    'INTERVAL': 0.005,
+    'MAX_SAMPLES': 2000,
+    'MAX_CONCURRENT': 2,
+    'MAX_PROFILES': 200,
+    'DIR': os.getenv('PROFILER_DIR', BASE_DIR / 'profiles'),
+    'TOKEN_MAX_AGE': 60 * 60,
 }
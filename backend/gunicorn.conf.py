@@ -0,0 +1,26 @@
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+if os.getenv('ASGI') == 'True':
+    wsgi_app = 'foodgram.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'foodgram.wsgi:application'
+
+# С DB_POOL=True потоки воркера делят пул соединений с базой.
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+
+
+def on_starting(server):
+    """Очистка файлов метрик, оставшихся от прошлого запуска."""
+    path = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(worker.pid)
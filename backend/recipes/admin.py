@@ -1,8 +1,25 @@
-from django.contrib import admin
+from core.admin_tools import EstimatedCountPaginator, export_csv, id_filter
+from django.contrib import admin, messages
+from django.db.models import Count, OuterRef, Subquery
 from django.utils.safestring import mark_safe
+from django.utils.translation import gettext_lazy as _
 
+from .deletion import delete_objects
 from .models import (Favorite, Ingredient, Recipe, RecipeIngredient, ShopCart,
                      Subscription, Tag)
+from .snapshots import rebuild as rebuild_snapshots
+from .utils import bump_state_owners
+
+
+@admin.action(description=_('Удалить порциями'), permissions=['delete'])
+def delete_in_batches(modeladmin, request, queryset):
+    """Удаление через recipes.deletion: без долгих блокировок таблиц."""
+    deleted = delete_objects(queryset)
+    summary = ', '.join(
+        f'{model._meta.verbose_name_plural}: {count}'
+        for model, count in deleted.items())
+    modeladmin.message_user(
+        request, _('Удалено — {}.').format(summary or 0), messages.SUCCESS)
 
 
 class IngredientInline(admin.TabularInline):
@@ -12,22 +29,66 @@ class IngredientInline(admin.TabularInline):
     raw_id_fields = ('ingredient',)
 
 
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class StateOwnerAdmin(LargeTableAdmin):
+    """Правка избранного, покупок и подписок меняет версию владельца.
+
+    Иначе /users/me/state/ продолжал бы отвечать 304 со старым ETag.
+    """
+
+    def save_model(self, request, obj, form, change):
+        rows = self.model.objects.filter(pk=obj.pk)
+        if change:
+            # Строка могла сменить владельца.
+            bump_state_owners(rows)
+        super().save_model(request, obj, form, change)
+        bump_state_owners(rows)
+
+    def delete_model(self, request, obj):
+        bump_state_owners(self.model.objects.filter(pk=obj.pk))
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        bump_state_owners(queryset)
+        super().delete_queryset(request, queryset)
+
+
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('name', 'get_image', 'author', 'pub_date')
+class RecipeAdmin(LargeTableAdmin):
+    list_display = ('name', 'get_image', 'author', 'pub_date', 'count_fav')
     fields = ('name', 'image', 'author', 'tags',
               'text', 'cooking_time', 'count_fav')
     readonly_fields = ('get_image', 'count_fav')
     list_select_related = ('author',)
     raw_id_fields = ('tags',)
+    autocomplete_fields = ('author',)
     inlines = (IngredientInline,)
     list_per_page = 6
-    list_filter = ('author', 'tags')
+    list_filter = (id_filter('author', _('Автор')), 'tags')
     search_fields = ('name',)
-
-    @admin.display(description='Кол-во добавлений в избранное')
+    actions = (export_csv('id', 'name', 'author_id', 'author__username',
+                          'cooking_time', 'pub_date'),
+               delete_in_batches)
+
+    def get_queryset(self, request):
+        favorites = Favorite.objects.filter(
+            recipe=OuterRef('pk'),
+        ).order_by().values('recipe').annotate(count=Count('pk'))
+        return super().get_queryset(request).annotate(
+            fav_count=Subquery(favorites.values('count')))
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        rebuild_snapshots(Recipe.objects.filter(pk=form.instance.pk))
+
+    @admin.display(description='Кол-во добавлений в избранное',
+                   ordering='fav_count')
     def count_fav(self, obj):
-        return obj.favorites.count()
+        return obj.fav_count or 0
 
     @admin.display(description='Картинка')
     def get_image(self, obj):
@@ -46,24 +107,40 @@ class IngredientAdmin(admin.ModelAdmin):
     list_display_links = ('name',)
     list_per_page = 20
     search_fields = ('^name',)
+    actions = (export_csv('id', 'name', 'measurement_unit'),)
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(StateOwnerAdmin):
     list_display = ('__str__',)
-    list_filter = ('owner',)
+    list_select_related = ('recipe', 'owner')
+    list_filter = (id_filter('owner', _('Пользователь')),
+                   id_filter('recipe', _('Рецепт')))
+    autocomplete_fields = ('recipe', 'owner')
     search_fields = ('recipe__name', 'owner__username', 'owner__first_name')
+    actions = (export_csv('id', 'recipe_id', 'recipe__name',
+                          'owner_id', 'owner__username'),)
 
 
 @admin.register(ShopCart)
-class ShopCartAdmin(admin.ModelAdmin):
+class ShopCartAdmin(StateOwnerAdmin):
     list_display = ('__str__',)
-    list_filter = ('owner',)
+    list_select_related = ('recipe', 'owner')
+    list_filter = (id_filter('owner', _('Пользователь')),
+                   id_filter('recipe', _('Рецепт')))
+    autocomplete_fields = ('recipe', 'owner')
     search_fields = ('recipe__name', 'owner__username', 'owner__first_name')
+    actions = (export_csv('id', 'recipe_id', 'recipe__name',
+                          'owner_id', 'owner__username'),)
 
 
 @admin.register(Subscription)
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(StateOwnerAdmin):
     list_display = ('__str__',)
-    list_filter = ('user', 'author')
+    list_select_related = ('user', 'author')
+    list_filter = (id_filter('user', _('Пользователь')),
+                   id_filter('author', _('Автор')))
+    autocomplete_fields = ('user', 'author')
     search_fields = ('user__username', 'user__first_name')
+    actions = (export_csv('id', 'user_id', 'user__username',
+                          'author_id', 'author__username'),)
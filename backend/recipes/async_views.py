@@ -0,0 +1,141 @@
+"""Асинхронные реализации самых нагруженных GET-эндпоинтов (ASGI-режим).
+
+Остальные методы тех же адресов обрабатываются обычными view.
+"""
+import functools
+import hashlib
+
+from core.cache import request_key
+from core.concurrency import async_view, run_sync
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.settings import api_settings
+from users.authentication import CachedTokenAuthentication
+
+from . import caching
+from .models import Ingredient, Recipe, Tag
+from .serializers import (IngredientSerializer, LeanRecipeSerializer,
+                          TagSerializer)
+from .utils import annotate_user_flags, shop_cart, shop_cart_ingredients
+from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+
+def render(data, status=200, headers=None):
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    return HttpResponse(
+        renderer.render(data),
+        status=status,
+        content_type=renderer.media_type,
+        headers=headers,
+    )
+
+
+async def authenticate(request):
+    result = await run_sync(CachedTokenAuthentication().authenticate, request)
+    request.user = result[0] if result else AnonymousUser()
+
+
+def check_throttles(request, viewset, action):
+    """Те же ограничения частоты, что у вьюсета для этого action."""
+    view = viewset(action=action, request=request)
+    for throttle in view.get_throttles():
+        if not throttle.allow_request(request, view):
+            raise exceptions.Throttled(throttle.wait())
+
+
+def async_get(fallback):
+    """GET обрабатывается асинхронно, остальные методы — fallback."""
+    viewset, action = fallback.cls, fallback.actions['get']
+    fallback = async_view(fallback)
+
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return await fallback(request, *args, **kwargs)
+            try:
+                await authenticate(request)
+                await run_sync(check_throttles, request, viewset, action)
+                return await view(request, *args, **kwargs)
+            except exceptions.APIException as exc:
+                headers = None
+                if exc.status_code == 401:
+                    headers = {'WWW-Authenticate': 'Token'}
+                if getattr(exc, 'wait', None):
+                    headers = {'Retry-After': str(exc.wait)}
+                return render({'detail': exc.detail}, exc.status_code,
+                              headers)
+        return wrapper
+    return decorator
+
+
+@async_get(TagViewSet.as_view({'get': 'list'}, basename='tags'))
+async def tag_list(request):
+    data = await run_sync(caching.tags.get, 'list', lambda: list(
+        TagSerializer(Tag.objects.all(), many=True).data))
+    return render(data)
+
+
+def _search_ingredients(search):
+    queryset = Ingredient.objects.all()
+    # Как SearchFilter с search_fields = ('^name',).
+    for term in search.replace('\x00', '').replace(',', ' ').split():
+        queryset = queryset.filter(name__istartswith=term)
+    return list(IngredientSerializer(queryset, many=True).data)
+
+
+@async_get(IngredientViewSet.as_view({'get': 'list'}, basename='ingredients'))
+async def ingredient_list(request):
+    search = request.GET.get(api_settings.SEARCH_PARAM, '')
+    digest = hashlib.sha256(search.lower().encode()).hexdigest()
+    data = await run_sync(caching.ingredients.get, digest,
+                          lambda: _search_ingredients(search))
+    return render(data)
+
+
+def _recipe_data(request, pk):
+    queryset = annotate_user_flags(
+        Recipe.objects.filter(pk=pk), request.user)
+    rows = list(LeanRecipeSerializer.get_rows(queryset, request))
+    if not rows:
+        raise exceptions.NotFound()
+    return LeanRecipeSerializer(rows, context={'request': request}).data[0]
+
+
+def _recipe_detail(request, pk):
+    if request.user.is_anonymous:
+        return render(caching.recipe_detail.get(
+            request_key(request), lambda: _recipe_data(request, pk),
+            group=pk))
+    return render(_recipe_data(request, pk))
+
+
+@async_get(RecipeViewSet.as_view(
+    {'get': 'retrieve', 'patch': 'partial_update', 'delete': 'destroy'},
+    basename='recipes', detail=True))
+async def recipe_detail(request, pk):
+    return await run_sync(_recipe_detail, request, pk)
+
+
+def _shop_cart_lines(owner):
+    if not owner.shopcarts.exists():
+        return None
+    return shop_cart(shop_cart_ingredients(owner))
+
+
+@async_get(RecipeViewSet.as_view(
+    {'get': 'download_shopping_cart'}, basename='recipes'))
+async def download_shopping_cart(request):
+    if request.user.is_anonymous:
+        raise exceptions.NotAuthenticated()
+    lines = await run_sync(_shop_cart_lines, request.user)
+    if lines is None:
+        return render([_('Список покупок пуст.')], 400)
+    return StreamingHttpResponse(
+        lines,
+        content_type='text/plain',
+        headers={
+            'Content-Disposition': 'attachment; filename=shop_cart.txt'
+        })
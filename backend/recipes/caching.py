@@ -0,0 +1,20 @@
+from core.cache import StaleCache
+
+# Полные ответы для анонимов: деталь по id (группа — id рецепта) и
+# страницы списка.
+recipe_detail = StaleCache('recipe')
+recipe_lists = StaleCache('recipes')
+tags = StaleCache('tags')
+ingredients = StaleCache('ingredients')
+
+# Больше рецептов — дешевле пометить устаревшими все детали сразу.
+GROUP_LIMIT = 100
+
+
+def recipes_changed(ids):
+    recipe_lists.invalidate()
+    if len(ids) > GROUP_LIMIT:
+        recipe_detail.invalidate()
+        return
+    for pk in ids:
+        recipe_detail.invalidate(pk)
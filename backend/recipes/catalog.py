@@ -0,0 +1,127 @@
+import fcntl
+import gzip
+import hashlib
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import orjson
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Ingredient, Tag
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CATALOGS = {
+    'ingredients': (Ingredient, ('id', 'name', 'measurement_unit')),
+    'tags': (Tag, ('id', 'name', 'color', 'slug')),
+}
+MANIFEST = 'manifest.json'
+
+logger = logging.getLogger(__name__)
+
+
+def root():
+    return Path(settings.CATALOG['ROOT'])
+
+
+def write_atomic(path, content):
+    """Файл появляется целиком: nginx не отдаст его наполовину."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp')
+    with os.fdopen(fd, 'wb') as file:
+        file.write(content)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+
+
+@contextmanager
+def locked():
+    """Публикации из разных процессов не затирают манифест друг друга."""
+    root().mkdir(parents=True, exist_ok=True)
+    with open(root() / '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def manifest():
+    """Текущие версии снимков: {название: {url, version, count, ...}}."""
+    try:
+        return orjson.loads((root() / MANIFEST).read_bytes())
+    except FileNotFoundError:
+        return {}
+
+
+def encodings(content):
+    yield '', content
+    yield '.gz', gzip.compress(content, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield '.br', brotli.compress(
+            content, mode=brotli.MODE_TEXT, quality=11)
+
+
+def prune(name, keep):
+    """Оставляет keep последних версий для клиентов со старым манифестом."""
+    snapshots = sorted(
+        root().glob(f'{name}.*.json'),
+        key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in snapshots[keep:]:
+        for suffix in ('', '.gz', '.br'):
+            Path(f'{path}{suffix}').unlink(missing_ok=True)
+
+
+def publish(name):
+    """Снимок каталога в JSON с хешем содержимого в имени файла.
+
+    Рядом кладутся .gz и .br для gzip_static/brotli_static в nginx.
+    Возвращает запись манифеста.
+    """
+    model, fields = CATALOGS[name]
+    rows = list(model.objects.order_by(
+        *model._meta.ordering or ['id']).values(*fields))
+    content = orjson.dumps(rows)
+    version = hashlib.sha256(content).hexdigest()[:16]
+    filename = f'{name}.{version}.json'
+    entry = {
+        'url': settings.CATALOG['URL'] + filename,
+        'version': version,
+        'count': len(rows),
+        'published': timezone.now().isoformat(),
+    }
+    with locked():
+        path = root() / filename
+        if not path.exists():
+            for suffix, body in encodings(content):
+                write_atomic(Path(f'{path}{suffix}'), body)
+        else:
+            os.utime(path)
+        current = manifest()
+        if current.get(name, {}).get('version') != version:
+            current[name] = entry
+            write_atomic(root() / MANIFEST, orjson.dumps(current))
+        prune(name, settings.CATALOG['KEEP'])
+    return current[name]
+
+
+def publish_on_commit(name):
+    """Одна публикация на транзакцию, сколько бы строк ни изменилось."""
+    connection = transaction.get_connection()
+    if any(getattr(func, 'catalog', None) == name
+           for _, func in connection.run_on_commit):
+        return
+
+    def run():
+        try:
+            publish(name)
+        except OSError:
+            # Изменение уже сохранено; снимок обновит publish_catalog.
+            logger.exception('Не удалось опубликовать каталог %s', name)
+
+    run.catalog = name
+    transaction.on_commit(run)
@@ -0,0 +1,81 @@
+from collections import Counter
+
+from core.jobs import enqueue
+from django.conf import settings
+from django.db import transaction
+from django.db.models import CASCADE
+from django.db.models.deletion import (Collector,
+                                       get_candidate_relations_to_delete)
+
+from . import caching
+from .jobs import remove_unreferenced_images
+from .models import Recipe
+from .utils import STATE_OWNER_FIELDS, bump_state_owners
+
+
+def cascades(model, ids, using):
+    """Querysets связанных строк с on_delete=CASCADE."""
+    for related in get_candidate_relations_to_delete(model._meta):
+        if related.field.remote_field.on_delete is CASCADE:
+            yield related.related_model._base_manager.using(using).filter(
+                **{f'{related.field.name}__in': ids})
+
+
+def recipes_fast_deletable():
+    return all(
+        related.field.remote_field.on_delete is CASCADE
+        for related in get_candidate_relations_to_delete(Recipe._meta))
+
+
+def delete_batch(model, ids, using):
+    """Удаляет одну порцию строк, связанные строки к этому моменту удалены."""
+    batch = model._base_manager.using(using).filter(pk__in=ids)
+    if model in STATE_OWNER_FIELDS:
+        # Быстрое удаление идёт мимо сигналов рецепта и автора.
+        bump_state_owners(batch)
+    if Collector(using=using).can_fast_delete(batch):
+        return batch._raw_delete(using)
+    if model is Recipe and recipes_fast_deletable():
+        # post_delete рецепта лишь освобождает картинку: делаем это сами,
+        # одной задачей очереди на порцию. Версии владельцев избранного и
+        # покупок изменены при удалении этих строк.
+        images = [name for name in batch.values_list('image', flat=True)
+                  if name]
+        if images:
+            enqueue(remove_unreferenced_images, names=images)
+        caching.recipes_changed(ids)
+        return batch._raw_delete(using)
+    return batch.delete()[1].get(model._meta.label, 0)
+
+
+def delete_objects(queryset, batch_size=None, progress=None):
+    """Удаляет queryset со всеми каскадами порциями по batch_size.
+
+    Каждая порция — отдельная короткая транзакция: сначала порциями
+    удаляются зависимые строки (рецепты автора, их ингредиенты, избранное
+    и т.д.), затем сами объекты. Таблицы не блокируются надолго, а
+    прерванное удаление можно просто запустить ещё раз.
+
+    progress(model, deleted, total) вызывается после каждой порции.
+    Возвращает Counter {модель: число удалённых строк}.
+    """
+    batch_size = batch_size or settings.DELETION_BATCH_SIZE
+    model = queryset.model
+    using = queryset.db
+    pks = queryset.order_by('pk').values_list('pk', flat=True)
+    total = pks.count()
+    deleted = Counter()
+    while True:
+        ids = list(pks[:batch_size])
+        if not ids:
+            break
+        for related in cascades(model, ids, using):
+            deleted.update(delete_objects(related, batch_size, progress))
+        with transaction.atomic(using=using):
+            count = delete_batch(model, ids, using)
+        if not count:
+            break
+        deleted[model] += count
+        if progress is not None:
+            progress(model, deleted[model], total)
+    return deleted
@@ -1,7 +1,7 @@
 from django.utils.translation import gettext_lazy as _
 from django_filters import rest_framework as filters
 
-from .models import Recipe
+from .models import Recipe, Tag
 
 
 class RecipeFilter(filters.FilterSet):
@@ -15,7 +15,13 @@ class RecipeFilter(filters.FilterSet):
         label=_('В списке покупок'),
         method='filter_owner',
     )
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    # Выбор из queryset: теги читаются, только когда ?tags= передан
+    # (AllValuesMultipleFilter строил варианты запросом на каждый запрос).
+    tags = filters.ModelMultipleChoiceFilter(
+        field_name='tags__slug',
+        to_field_name='slug',
+        queryset=Tag.objects.all(),
+    )
 
     class Meta:
         model = Recipe
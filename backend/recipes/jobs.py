@@ -0,0 +1,66 @@
+from core.jobs import enqueue, job
+from django.conf import settings
+from django.db import connection
+
+from .models import Recipe
+
+
+@job()
+def remove_unreferenced_images(names):
+    """Удаляет файлы картинок, на которые больше не ссылается ни один рецепт.
+
+    С хранилищем по хешу (HashedStorage) один файл может быть у разных
+    рецептов, поэтому ссылки проверяются одним запросом на порцию.
+    Недавно записанные файлы откладываются на IMAGE_DELETE_GRACE:
+    ссылка на них может быть в ещё не зафиксированной транзакции.
+    """
+    names = set(names)
+    referenced = set(Recipe.objects.filter(
+        image__in=names).values_list('image', flat=True))
+    storage = Recipe._meta.get_field('image').storage
+    recent = []
+    for name in names - referenced:
+        try:
+            if storage.is_recent(name):
+                recent.append(name)
+                continue
+        except FileNotFoundError:
+            continue
+        storage.delete(name)
+    if recent:
+        enqueue(remove_unreferenced_images,
+                delay=settings.IMAGE_DELETE_GRACE, names=recent)
+
+
+@job()
+def update_similar(recipe_id):
+    """Соседи одного рецепта после создания или изменения."""
+    from .similarity import update
+
+    update(recipe_id)
+
+
+@job(max_attempts=1)
+def rebuild_similar():
+    from .similarity import rebuild
+
+    rebuild()
+
+
+@job()
+def rebuild_snapshots(lookup):
+    """Снимки рецептов Recipe.objects.filter(**lookup) — порциями."""
+    from .snapshots import rebuild
+
+    rebuild(Recipe.objects.filter(**lookup))
+
+
+@job(max_attempts=1, every=settings.STATS_REFRESH_INTERVAL)
+def refresh_stats():
+    """Пересчёт материализованной статистики (только PostgreSQL)."""
+    from .stats import VIEWS, refresh
+
+    if connection.vendor != 'postgresql':
+        return
+    for model in VIEWS.values():
+        refresh(model)
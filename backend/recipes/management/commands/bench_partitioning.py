@@ -0,0 +1,99 @@
+import random
+import time
+
+from core.loadtest import percentile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils.translation import gettext_lazy as _
+from recipes import partitioning
+
+# Горячие запросы к избранному и спискам покупок: флаги на странице
+# рецептов, id для /api/users/me/state/, одна отметка и счётчик рецепта
+# (удаление рецепта и статистика идут по recipe_id через все секции).
+QUERIES = {
+    'page_flags': (
+        'SELECT recipe_id FROM {table} '
+        'WHERE owner_id = %s AND recipe_id = ANY(%s)',
+        lambda owner, recipe, page: [owner, page]),
+    'exists': (
+        'SELECT EXISTS (SELECT 1 FROM {table} '
+        'WHERE owner_id = %s AND recipe_id = %s)',
+        lambda owner, recipe, page: [owner, recipe]),
+    'owner_ids': (
+        'SELECT recipe_id FROM {table} WHERE owner_id = %s',
+        lambda owner, recipe, page: [owner]),
+    'recipe_count': (
+        'SELECT count(*) FROM {table} WHERE recipe_id = %s',
+        lambda owner, recipe, page: [recipe]),
+}
+
+
+class Command(BaseCommand):
+    help = _('Сравнение горячих запросов к обычной и секционированной '
+             'таблице (после partition_table --no-swap или --keep-old).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=sorted(partitioning.PARTITIONED))
+        parser.add_argument('--iterations', type=int, default=2000)
+        parser.add_argument(
+            '--samples', type=int, default=500,
+            help=_('Сколько случайных строк взять для параметров.'))
+
+    def get_tables(self, model):
+        table = model._meta.db_table
+        for suffix in (partitioning.SUFFIX, partitioning.OLD_SUFFIX):
+            if partitioning.table_exists(table + suffix):
+                tables = [table, table + suffix]
+                if partitioning.is_partitioned(model):
+                    tables.reverse()
+                return tables
+        raise CommandError(_(
+            'Нет второй таблицы: запустите partition_table с --no-swap '
+            'или --keep-old.'))
+
+    def get_params(self, table, samples):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT owner_id, recipe_id FROM {partitioning.quote(table)}'
+                f' ORDER BY random() LIMIT %s', [samples])
+            rows = cursor.fetchall()
+        if not rows:
+            raise CommandError(_('Таблица пуста.'))
+        recipes = [recipe for __, recipe in rows]
+        return [
+            (owner, recipe, random.sample(recipes, min(6, len(recipes))))
+            for owner, recipe in rows
+        ]
+
+    def measure(self, cursor, sql, params):
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        return time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError(_('Секционирование есть только в PostgreSQL.'))
+        model = partitioning.PARTITIONED[options['table']]
+        # Первая — обычная таблица, вторая — секционированная.
+        tables = self.get_tables(model)
+        params = self.get_params(tables[0], options['samples'])
+        self.stdout.write(
+            f'{"query":14} {"table":32} {"p50 мс":>8} {"p99 мс":>8}')
+        with connection.cursor() as cursor:
+            for name, (template, get_params) in QUERIES.items():
+                timings = {table: [] for table in tables}
+                for iteration in range(options['iterations']):
+                    values = get_params(*random.choice(params))
+                    # Таблицы чередуются, чтобы кеш и фон влияли поровну.
+                    for table in tables[::1 if iteration % 2 else -1]:
+                        timings[table].append(self.measure(
+                            cursor,
+                            template.format(table=partitioning.quote(table)),
+                            values))
+                for table in tables:
+                    values = sorted(timings[table])
+                    self.stdout.write(
+                        f'{name:14} {table:32} '
+                        f'{percentile(values, 0.5) * 1000:8.3f} '
+                        f'{percentile(values, 0.99) * 1000:8.3f}')
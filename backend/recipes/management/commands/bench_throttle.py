@@ -0,0 +1,43 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.utils.translation import gettext_lazy as _
+from recipes.views import IngredientViewSet
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = _('Замер накладных расходов ограничения частоты на запрос.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        request = RequestFactory().get(
+            '/api/ingredients/', REMOTE_ADDR='10.0.0.1')
+        request.user = User(pk=0)
+        view = IngredientViewSet(action='list', request=request)
+        throttles = view.get_throttles()
+        for throttle in throttles:
+            # Лимит, который бенчмарк не исчерпает.
+            throttle.THROTTLE_RATES = {
+                'ingredient_search': f'{iterations * 2}/d',
+                'ingredient_search_ip': f'{iterations * 2}/d',
+            }
+
+        start = time.perf_counter()
+        for __ in range(iterations):
+            for throttle in throttles:
+                assert throttle.allow_request(request, view)
+        elapsed = time.perf_counter() - start
+
+        per_request = elapsed / iterations * 1000
+        self.stdout.write(
+            _('{} запросов, {} ограничителя: {:.4f} мс на запрос.').format(
+                iterations, len(throttles), per_request))
+        if per_request >= 0.1:
+            self.stderr.write(_('Больше 0.1 мс на запрос.'))
@@ -0,0 +1,42 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.translation import gettext_lazy as _
+from recipes.deletion import delete_objects
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = _('Удаление пользователей или рецептов порциями.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=('users', 'recipes'))
+        parser.add_argument('ids', nargs='*', type=int)
+        parser.add_argument(
+            '--author', type=int,
+            help=_('Удалить все рецепты автора с этим id.'))
+        parser.add_argument('--batch-size', type=int)
+
+    def progress(self, model, deleted, total):
+        self.stdout.write(
+            f'{model._meta.verbose_name_plural}: {deleted}/{total}')
+
+    def handle(self, *args, **options):
+        if not options['ids'] and not options['author']:
+            raise CommandError(_('Укажите id или --author.'))
+        if options['model'] == 'users':
+            if options['author']:
+                raise CommandError(_('--author только для рецептов.'))
+            queryset = User.objects.all()
+        else:
+            queryset = Recipe.objects.all()
+            if options['author']:
+                queryset = queryset.filter(author_id=options['author'])
+        if options['ids']:
+            queryset = queryset.filter(pk__in=options['ids'])
+        deleted = delete_objects(
+            queryset, options['batch_size'], progress=self.progress)
+        for model, count in deleted.items():
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.label}: {count}'))
@@ -3,6 +3,7 @@ import csv
 from django.core.management.base import BaseCommand, CommandError
 from django.utils.translation import gettext_lazy as _
 from foodgram import settings
+from recipes.catalog import publish
 from recipes.models import Ingredient
 
 
@@ -20,7 +21,15 @@ class Command(BaseCommand):
                     ) for row in reader
                 ]
                 Ingredient.objects.bulk_create(ingredients)
-                print(_('Ингредиенты успешно загружены.'))
         except FileNotFoundError:
             raise CommandError(
                 _('Убедитесь, что ingredients.csv находится в ./data/'))
+        # bulk_create не отправляет сигналы.
+        try:
+            publish('ingredients')
+        except OSError as error:
+            # Ингредиенты уже в базе, снимок можно выложить отдельно.
+            self.stderr.write(_(
+                'Снимок каталога не опубликован: {}. Запустите '
+                'publish_catalog ingredients.').format(error))
+        print(_('Ингредиенты успешно загружены.'))
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils.translation import gettext_lazy as _
+from recipes import partitioning
+
+
+class Command(BaseCommand):
+    help = _('Перевод избранного и списков покупок на hash-секции '
+             'по owner_id (PostgreSQL) без остановки записи.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=sorted(partitioning.PARTITIONED))
+        parser.add_argument('--partitions', type=int, default=16)
+        parser.add_argument('--batch-size', type=int, default=50000)
+        parser.add_argument(
+            '--from-id', type=int,
+            help=_('Продолжить прерванное копирование с этого id.'))
+        parser.add_argument(
+            '--no-swap', action='store_true',
+            help=_('Только скопировать, подменить таблицу позже.'))
+        parser.add_argument(
+            '--keep-old', action='store_true',
+            help=_('Оставить старую таблицу (без внешних ключей) для '
+                   'сверки; удалить её потом можно с --drop-old.'))
+        parser.add_argument(
+            '--drop-old', action='store_true',
+            help=_('Удалить оставленную с --keep-old старую таблицу.'))
+
+    def progress(self, done, total):
+        self.stdout.write(f'id {done}/{total}')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError(_('Секционирование есть только в PostgreSQL.'))
+        model = partitioning.PARTITIONED[options['table']]
+        if options['drop_old']:
+            partitioning.drop_old(model)
+            self.stdout.write(self.style.SUCCESS(_('Старая таблица удалена.')))
+            return
+        if partitioning.is_partitioned(model):
+            raise CommandError(_('Таблица уже секционирована.'))
+        new = model._meta.db_table + partitioning.SUFFIX
+        try:
+            if not partitioning.table_exists(new):
+                partitioning.prepare(model, options['partitions'])
+                self.stdout.write(
+                    _('Создана {}, изменения идут в обе.').format(new))
+            partitioning.copy(
+                model, options['batch_size'], options['from_id'],
+                self.progress)
+            if options['no_swap']:
+                return
+            partitioning.swap(model, options['keep_old'])
+        except partitioning.DependencyError as error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(
+            _('{} секционирована.').format(model._meta.db_table)))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.translation import gettext_lazy as _
+from recipes.catalog import CATALOGS, publish
+
+
+class Command(BaseCommand):
+    help = _('Публикация снимков каталога ингредиентов и тегов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names', nargs='*',
+            help=_('Каталоги для публикации, по умолчанию все.'))
+
+    def handle(self, *args, **options):
+        names = options['names'] or list(CATALOGS)
+        unknown = set(names) - set(CATALOGS)
+        if unknown:
+            raise CommandError(
+                _('Неизвестные каталоги: {}.').format(
+                    ', '.join(sorted(unknown))))
+        for name in names:
+            try:
+                entry = publish(name)
+            except OSError as error:
+                raise CommandError(
+                    _('Не удалось опубликовать {}: {}').format(name, error))
+            self.stdout.write(f"{name}: {entry['url']} ({entry['count']})")
@@ -0,0 +1,36 @@
+from core.jobs import enqueue
+from django.core.management.base import BaseCommand
+from django.utils.translation import gettext_lazy as _
+from recipes.jobs import rebuild_snapshots
+from recipes.models import Recipe
+from recipes.snapshots import rebuild
+
+
+class Command(BaseCommand):
+    help = _('Пересборка снимков рецептов для чтения (Recipe.snapshot).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'ids', nargs='*', type=int,
+            help=_('Id рецептов; без них — все рецепты.'))
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument(
+            '--enqueue', action='store_true',
+            help=_('Поставить пересборку в очередь задач.'))
+
+    def progress(self, done):
+        self.stdout.write(str(done))
+
+    def handle(self, *args, **options):
+        lookup = {'pk__in': options['ids']} if options['ids'] else {}
+        if options['enqueue']:
+            enqueue(rebuild_snapshots, lookup=lookup)
+            self.stdout.write(_('Пересборка поставлена в очередь.'))
+            return
+        total = rebuild(
+            Recipe.objects.filter(**lookup),
+            batch_size=options['batch_size'],
+            progress=self.progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            _('Рецептов: {}.').format(total)))
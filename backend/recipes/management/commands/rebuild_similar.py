@@ -0,0 +1,34 @@
+from core.jobs import enqueue
+from django.core.management.base import BaseCommand
+from django.utils.translation import gettext_lazy as _
+from recipes.jobs import rebuild_similar
+from recipes.similarity import rebuild
+
+
+class Command(BaseCommand):
+    help = _('Пересчёт похожих рецептов (TF-IDF по ингредиентам и тегам).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--k', type=int)
+        parser.add_argument('--chunk-size', type=int)
+        parser.add_argument('--processes', type=int)
+        parser.add_argument(
+            '--enqueue', action='store_true',
+            help=_('Поставить пересчёт в очередь задач.'))
+
+    def progress(self, done, total):
+        self.stdout.write(f'{done}/{total}')
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            enqueue(rebuild_similar)
+            self.stdout.write(_('Пересчёт поставлен в очередь.'))
+            return
+        total = rebuild(
+            k=options['k'],
+            chunk_size=options['chunk_size'],
+            processes=options['processes'],
+            progress=self.progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            _('Рецептов: {}.').format(total)))
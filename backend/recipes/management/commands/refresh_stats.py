@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils.translation import gettext_lazy as _
+from recipes.stats import VIEWS, refresh
+
+
+class Command(BaseCommand):
+    help = _('Пересчёт статистики авторов, тегов и ингредиентов '
+             '(материализованные представления PostgreSQL) вне очереди: '
+             'по расписанию это делает задача refresh_stats воркера.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'views', nargs='*',
+            help=_('Что пересчитать: {}; по умолчанию всё.').format(
+                ', '.join(VIEWS)))
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError(
+                _('Материализованные представления есть только в '
+                  'PostgreSQL.'))
+        names = options['views'] or list(VIEWS)
+        unknown = set(names) - set(VIEWS)
+        if unknown:
+            raise CommandError(
+                _('Неизвестная статистика: {}.').format(
+                    ', '.join(sorted(unknown))))
+        for name in names:
+            start = time.monotonic()
+            refresh(VIEWS[name])
+            self.stdout.write(f'{name}: {time.monotonic() - start:.1f} с')
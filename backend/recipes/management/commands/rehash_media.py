@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from django.utils.translation import gettext_lazy as _
+from recipes import caching
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = _('Переименование картинок рецептов по хешу содержимого.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help=_('Только показать, что будет переименовано.'))
+        parser.add_argument(
+            '--prune', action='store_true',
+            help=_('Удалить файлы, на которые не ссылается ни один рецепт.'))
+
+    def handle(self, *args, **options):
+        field = Recipe._meta.get_field('image')
+        storage = field.storage
+        dry_run = options['dry_run']
+        renamed = missing = 0
+        rows = Recipe.objects.exclude(image='').values_list('pk', 'image')
+        for pk, name in rows.iterator():
+            if storage.is_hashed(name):
+                continue
+            if not storage.exists(name):
+                missing += 1
+                self.stderr.write(
+                    _('Нет файла {} (рецепт {}).').format(name, pk))
+                continue
+            with storage.open(name) as content:
+                if dry_run:
+                    new_name = storage.hashed_name(name, content)
+                else:
+                    new_name = storage.save(name, content)
+            self.stdout.write(f'{name} -> {new_name}')
+            renamed += 1
+            if not dry_run:
+                # update() идёт мимо post_save: кеш ответов сбрасываем сами.
+                Recipe.objects.filter(pk=pk).update(image=new_name)
+                caching.recipes_changed([pk])
+                Recipe.release_image(name)
+
+        pruned = 0
+        if options['prune']:
+            referenced = set(Recipe.objects.values_list('image', flat=True))
+            upload_to = field.upload_to
+            for filename in storage.listdir(upload_to)[1]:
+                name = upload_to + filename
+                # Свежий файл может ждать незафиксированный рецепт.
+                if name in referenced or storage.is_recent(name):
+                    continue
+                pruned += 1
+                if dry_run:
+                    self.stdout.write(_('Будет удалён {}.').format(name))
+                else:
+                    storage.delete(name)
+                    self.stdout.write(_('Удалён {}.').format(name))
+
+        self.stdout.write(_(
+            'Переименовано: {}, нет файла: {}, удалено лишних: {}.',
+        ).format(renamed, missing, pruned))
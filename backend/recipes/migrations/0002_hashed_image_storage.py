@@ -0,0 +1,19 @@
+# Generated by Django 3.2.3 on 2026-10-19 08:48
+
+from django.db import migrations, models
+import recipes.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(db_index=True, storage=recipes.storage.HashedStorage(), upload_to='recipe/img/', verbose_name='Картинка'),
+        ),
+    ]
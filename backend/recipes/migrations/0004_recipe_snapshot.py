@@ -0,0 +1,18 @@
+# Generated by Django 3.2.3 on 2026-10-19 09:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_recipe_neighbor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='snapshot',
+            field=models.JSONField(default=dict, editable=False, verbose_name='Снимок'),
+        ),
+    ]
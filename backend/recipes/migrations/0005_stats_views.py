@@ -0,0 +1,134 @@
+# Generated by Django 3.2.3 on 2026-10-19 09:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Представления заполняются при создании, чтобы API статистики работал
+# сразу после миграции; дальше их пересчитывает задача refresh_stats.
+VIEWS = {
+    'recipes_author_stats': ("""
+        SELECT u.id AS author_id,
+               coalesce(r.recipes_count, 0) AS recipes_count,
+               coalesce(f.favorites_count, 0) AS favorites_count,
+               coalesce(s.followers_count, 0) AS followers_count,
+               now() AS refreshed
+        FROM users_user u
+        LEFT JOIN (
+            SELECT author_id, count(*) AS recipes_count
+            FROM recipes_recipe GROUP BY author_id
+        ) r ON r.author_id = u.id
+        LEFT JOIN (
+            SELECT recipe.author_id, count(*) AS favorites_count
+            FROM recipes_favorite favorite
+            JOIN recipes_recipe recipe ON recipe.id = favorite.recipe_id
+            GROUP BY recipe.author_id
+        ) f ON f.author_id = u.id
+        LEFT JOIN (
+            SELECT author_id, count(*) AS followers_count
+            FROM recipes_subscription GROUP BY author_id
+        ) s ON s.author_id = u.id
+        WHERE r.recipes_count IS NOT NULL OR s.followers_count IS NOT NULL
+    """, 'author_id', 'favorites_count'),
+    'recipes_tag_stats': ("""
+        SELECT tag.id AS tag_id,
+               count(recipe.id) AS recipes_count,
+               percentile_cont(0.5) WITHIN GROUP (
+                   ORDER BY recipe.cooking_time) AS median_cooking_time,
+               now() AS refreshed
+        FROM recipes_tag tag
+        LEFT JOIN "RecipeTag" link ON link.tag_id = tag.id
+        LEFT JOIN recipes_recipe recipe ON recipe.id = link.recipe_id
+        GROUP BY tag.id
+    """, 'tag_id', None),
+    'recipes_ingredient_stats': ("""
+        SELECT ingredient_id,
+               count(DISTINCT recipe_id) AS recipes_count,
+               now() AS refreshed
+        FROM recipes_recipeingredient
+        GROUP BY ingredient_id
+    """, 'ingredient_id', 'recipes_count'),
+}
+
+
+def create_views(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, (query, key, order) in VIEWS.items():
+        schema_editor.execute(
+            f'CREATE MATERIALIZED VIEW {name} AS {query}')
+        # Уникальный индекс нужен для REFRESH ... CONCURRENTLY.
+        schema_editor.execute(
+            f'CREATE UNIQUE INDEX {name}_key ON {name} ({key})')
+        if order:
+            schema_editor.execute(
+                f'CREATE INDEX {name}_{order} ON {name} ({order} DESC)')
+
+
+def drop_views(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in VIEWS:
+        schema_editor.execute(f'DROP MATERIALIZED VIEW {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_state_version'),
+        ('recipes', '0004_recipe_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('recipes_count', models.PositiveIntegerField(verbose_name='Рецептов')),
+                ('refreshed', models.DateTimeField(verbose_name='Пересчитано')),
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to='users.user', verbose_name='Автор')),
+                ('favorites_count', models.PositiveIntegerField(verbose_name='Добавлений в избранное')),
+                ('followers_count', models.PositiveIntegerField(verbose_name='Подписчиков')),
+            ],
+            options={
+                'verbose_name': 'Статистика автора',
+                'verbose_name_plural': 'Статистика авторов',
+                'db_table': 'recipes_author_stats',
+                'ordering': ('-favorites_count', 'author'),
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='IngredientStats',
+            fields=[
+                ('recipes_count', models.PositiveIntegerField(verbose_name='Рецептов')),
+                ('refreshed', models.DateTimeField(verbose_name='Пересчитано')),
+                ('ingredient', models.OneToOneField(on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to='recipes.ingredient', verbose_name='Ингредиент')),
+            ],
+            options={
+                'verbose_name': 'Статистика ингредиента',
+                'verbose_name_plural': 'Статистика ингредиентов',
+                'db_table': 'recipes_ingredient_stats',
+                'ordering': ('-recipes_count', 'ingredient'),
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='TagStats',
+            fields=[
+                ('recipes_count', models.PositiveIntegerField(verbose_name='Рецептов')),
+                ('refreshed', models.DateTimeField(verbose_name='Пересчитано')),
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to='recipes.tag', verbose_name='Тег')),
+                ('median_cooking_time', models.FloatField(null=True, verbose_name='Медиана времени готовки')),
+            ],
+            options={
+                'verbose_name': 'Статистика тега',
+                'verbose_name_plural': 'Статистика тегов',
+                'db_table': 'recipes_tag_stats',
+                'ordering': ('tag',),
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_views, drop_views),
+    ]
@@ -1,11 +1,12 @@
-from pathlib import Path
-
+from core.jobs import enqueue
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from rest_framework.fields import MinValueValidator, RegexValidator
 
+from .storage import HashedStorage
+
 User = get_user_model()
 
 
@@ -47,7 +48,12 @@ class Recipe(models.Model):
         verbose_name=_('Список ингредиентов'),
     )
     name = models.CharField(_('Название'), max_length=200, unique=True)
-    image = models.ImageField(_('Картинка'), upload_to='recipe/img/')
+    image = models.ImageField(
+        _('Картинка'),
+        upload_to='recipe/img/',
+        storage=HashedStorage(),
+        db_index=True,
+    )
     text = models.TextField(_('Описание'))
     cooking_time = models.PositiveSmallIntegerField(
         _('Время готовки'),
@@ -59,6 +65,8 @@ class Recipe(models.Model):
         help_text=_('Время приготовления (в минутах).'),
     )
     pub_date = models.DateTimeField(_('Дата публикации'), auto_now_add=True)
+    # Автор, теги и ингредиенты для чтения без JOIN (recipes.snapshots).
+    snapshot = models.JSONField(_('Снимок'), default=dict, editable=False)
 
     class Meta:
         ordering = ['-pub_date']
@@ -68,25 +76,22 @@ class Recipe(models.Model):
     def __str__(self) -> str:
         return self.name
 
-    def delete(self, *args, **kwargs):
-        path = Path(self.image.path)
-        super().delete(*args, **kwargs)
-        # Удалить файл картинки при удалении рецепта.
-        if path:
-            path.unlink(missing_ok=True)
-
     def save(self, *args, **kwargs):
-        # Удалить старый файл картинки при обновлении.
-        try:
-            path = Path(Recipe.objects.get(pk=self.pk).image.path)
-        except Recipe.DoesNotExist:
-            path = None
+        # Старая картинка удаляется, только если на неё нет других ссылок.
+        old_image = None
+        if self.pk:
+            old_image = Recipe.objects.filter(pk=self.pk).values_list(
+                'image', flat=True).first()
         super().save(*args, **kwargs)
-        path_new = Path(Recipe.objects.get(pk=self.pk).image.path)
-        if path == path_new:
-            pass
-        if path:
-            path.unlink(missing_ok=True)
+        if old_image and old_image != self.image.name:
+            self.release_image(old_image)
+
+    @staticmethod
+    def release_image(name):
+        """Удаляет файл картинки в очереди задач, если он больше не нужен."""
+        from .jobs import remove_unreferenced_images
+
+        enqueue(remove_unreferenced_images, names=[name])
 
 
 class Ingredient(models.Model):
@@ -231,3 +236,104 @@ class Subscription(models.Model):
     def __str__(self) -> str:
         return (f'{self.user.first_name} подписан(а) '
                 f'на - {self.author.first_name}')
+
+
+class RecipeNeighbor(models.Model):
+    """Похожие рецепты, посчитанные recipes.similarity."""
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='neighbors',
+        verbose_name=_('Рецепт'),
+        # Индекс даёт unique_recipe_neighbor_rank.
+        db_index=False,
+    )
+    neighbor = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name=_('Похожий рецепт'),
+    )
+    rank = models.PositiveSmallIntegerField(_('Место'))
+    score = models.FloatField(_('Косинусная близость'))
+
+    class Meta:
+        verbose_name = _('Похожий рецепт')
+        verbose_name_plural = _('Похожие рецепты')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'rank'],
+                name='unique_recipe_neighbor_rank',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.recipe_id} → {self.neighbor_id} ({self.score:.3f})'
+
+
+class AbstractStats(models.Model):
+    """Строка материализованного представления (миграция 0005).
+
+    Представления раз в STATS_REFRESH_INTERVAL секунд пересчитывает
+    задача refresh_stats; refreshed — время последнего пересчёта.
+    """
+
+    recipes_count = models.PositiveIntegerField(_('Рецептов'))
+    refreshed = models.DateTimeField(_('Пересчитано'))
+
+    class Meta:
+        abstract = True
+        managed = False
+
+
+class AuthorStats(AbstractStats):
+    author = models.OneToOneField(
+        User,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        related_name='+',
+        verbose_name=_('Автор'),
+    )
+    favorites_count = models.PositiveIntegerField(_('Добавлений в избранное'))
+    followers_count = models.PositiveIntegerField(_('Подписчиков'))
+
+    class Meta(AbstractStats.Meta):
+        db_table = 'recipes_author_stats'
+        ordering = ('-favorites_count', 'author')
+        verbose_name = _('Статистика автора')
+        verbose_name_plural = _('Статистика авторов')
+
+
+class TagStats(AbstractStats):
+    tag = models.OneToOneField(
+        Tag,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        related_name='+',
+        verbose_name=_('Тег'),
+    )
+    median_cooking_time = models.FloatField(
+        _('Медиана времени готовки'), null=True)
+
+    class Meta(AbstractStats.Meta):
+        db_table = 'recipes_tag_stats'
+        ordering = ('tag',)
+        verbose_name = _('Статистика тега')
+        verbose_name_plural = _('Статистика тегов')
+
+
+class IngredientStats(AbstractStats):
+    ingredient = models.OneToOneField(
+        Ingredient,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        related_name='+',
+        verbose_name=_('Ингредиент'),
+    )
+
+    class Meta(AbstractStats.Meta):
+        db_table = 'recipes_ingredient_stats'
+        ordering = ('-recipes_count', 'ingredient')
+        verbose_name = _('Статистика ингредиента')
+        verbose_name_plural = _('Статистика ингредиентов')
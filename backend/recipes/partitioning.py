@@ -0,0 +1,244 @@
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection, transaction
+
+from .models import Favorite, Recipe, ShopCart
+
+User = get_user_model()
+
+PARTITIONED = {'favorite': Favorite, 'shopcart': ShopCart}
+SUFFIX = '_partitioned'
+OLD_SUFFIX = '_unpartitioned'
+VIEW_KINDS = {'v': 'VIEW', 'm': 'MATERIALIZED VIEW'}
+
+
+class DependencyError(DatabaseError):
+    pass
+
+
+def quote(name):
+    return connection.ops.quote_name(name)
+
+
+def is_partitioned(model):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relkind = 'p' FROM pg_class WHERE oid = %s::regclass",
+            [quote(model._meta.db_table)])
+        return cursor.fetchone()[0]
+
+
+def table_exists(name):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [quote(name)])
+        return cursor.fetchone()[0]
+
+
+def dependent_views(relation):
+    """Представления, читающие relation: [(oid, имя, вид, запрос)].
+
+    Представление ссылается на таблицу по oid, а не по имени, так что
+    после подмены оно читало бы старую таблицу.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT DISTINCT view.oid, view.relname, view.relkind,
+                   pg_get_viewdef(view.oid)
+            FROM pg_depend dependency
+            JOIN pg_rewrite rule ON rule.oid = dependency.objid
+            JOIN pg_class view ON view.oid = rule.ev_class
+            WHERE dependency.classid = 'pg_rewrite'::regclass
+              AND dependency.refclassid = 'pg_class'::regclass
+              AND dependency.refobjid = %s::regclass
+              AND view.oid <> dependency.refobjid
+            ORDER BY view.relname
+            """, [quote(relation)])
+        return cursor.fetchall()
+
+
+def check_dependents(model):
+    """DependencyError, если от таблицы зависит то, что swap не перенесёт.
+
+    swap пересоздаёт представления, читающие таблицу, но не
+    представления поверх них и не внешние ключи других таблиц на неё:
+    их нужно убрать до секционирования.
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT conname, conrelid::regclass::text FROM pg_constraint "
+            "WHERE confrelid = %s::regclass AND contype = 'f'",
+            [quote(table)])
+        problems = [
+            f'внешний ключ {name} таблицы {other}'
+            for name, other in cursor.fetchall()
+        ]
+    for _, view, _, _ in dependent_views(table):
+        problems.extend(
+            f'представление {name} поверх {view}'
+            for _, name, _, _ in dependent_views(view))
+    if problems:
+        raise DependencyError(
+            f'От {table} зависят объекты, которые нельзя перенести на '
+            f'секционированную таблицу: {", ".join(problems)}.')
+
+
+def prepare(model, partitions):
+    """Секционированная по hash(owner_id) копия таблицы и триггер.
+
+    Первичный ключ секционированной таблицы обязан включать ключ
+    секционирования, поэтому он (id, owner_id); id по-прежнему выдаёт
+    общая последовательность. Ограничение уникальности (recipe, owner)
+    уже содержит owner_id и переносится как есть. Триггер на старой
+    таблице повторяет в новой все изменения, сделанные во время копии.
+    """
+    check_dependents(model)
+    table = model._meta.db_table
+    new = table + SUFFIX
+    constraint = model._meta.constraints[0].name
+    statements = [
+        f'CREATE TABLE {quote(new)} (LIKE {quote(table)} INCLUDING DEFAULTS)'
+        f' PARTITION BY HASH (owner_id)',
+        *(
+            f'CREATE TABLE {quote(f"{new}_{remainder}")} PARTITION OF '
+            f'{quote(new)} FOR VALUES WITH '
+            f'(MODULUS {partitions}, REMAINDER {remainder})'
+            for remainder in range(partitions)
+        ),
+        f'ALTER TABLE {quote(new)} ADD CONSTRAINT {quote(new + "_pkey")} '
+        f'PRIMARY KEY (id, owner_id)',
+        f'ALTER TABLE {quote(new)} ADD CONSTRAINT '
+        f'{quote(constraint + SUFFIX)} UNIQUE (recipe_id, owner_id)',
+        f'CREATE INDEX {quote(new + "_owner_id")} ON {quote(new)} (owner_id)',
+        f'CREATE INDEX {quote(new + "_recipe_id")} '
+        f'ON {quote(new)} (recipe_id)',
+        f'ALTER TABLE {quote(new)} ADD CONSTRAINT {quote(new + "_owner_fk")} '
+        f'FOREIGN KEY (owner_id) REFERENCES {quote(User._meta.db_table)} (id)'
+        f' DEFERRABLE INITIALLY DEFERRED',
+        f'ALTER TABLE {quote(new)} ADD CONSTRAINT {quote(new + "_recipe_fk")}'
+        f' FOREIGN KEY (recipe_id) REFERENCES {quote(Recipe._meta.db_table)}'
+        f' (id) DEFERRABLE INITIALLY DEFERRED',
+        f'''
+        CREATE FUNCTION {quote(new + "_sync")}() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                DELETE FROM {quote(new)}
+                WHERE id = OLD.id AND owner_id = OLD.owner_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO {quote(new)} VALUES (NEW.*)
+                ON CONFLICT DO NOTHING;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        ''',
+        f'CREATE TRIGGER {quote(new + "_sync")} '
+        f'AFTER INSERT OR UPDATE OR DELETE ON {quote(table)} '
+        f'FOR EACH ROW EXECUTE FUNCTION {quote(new + "_sync")}()',
+    ]
+    with transaction.atomic(), connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def copy(model, batch_size, start=None, progress=None):
+    """Переносит строки, существовавшие до триггера, диапазонами id.
+
+    Каждый диапазон — своя транзакция. FOR SHARE не даёт удалить строку,
+    пока её копия не зафиксирована, иначе триггер удалил бы её раньше,
+    чем она появится в новой таблице. Повторный запуск безопасен.
+    """
+    table = model._meta.db_table
+    new = table + SUFFIX
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT min(id), max(id) FROM {quote(table)}')
+        first, last = cursor.fetchone()
+    if first is None:
+        return
+    for low in range(max(first, start or first), last + 1, batch_size):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {quote(new)} SELECT * FROM {quote(table)} '
+                f'WHERE id >= %s AND id < %s FOR SHARE '
+                f'ON CONFLICT DO NOTHING',
+                [low, low + batch_size])
+        if progress is not None:
+            progress(min(low + batch_size - 1, last), last)
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {quote(new)}')
+
+
+def swap(model, keep_old=False):
+    """Подменяет таблицу секционированной за одну короткую блокировку.
+
+    Последовательность id переходит к новой таблице, старая удаляется.
+    С keep_old она остаётся под именем *_unpartitioned для сверки, но без
+    внешних ключей: иначе удаление рецепта или пользователя, на которых
+    ссылаются её строки, упадёт на проверке ограничения.
+
+    Представления, читающие таблицу, пересоздаются поверх новой вместе с
+    индексами. Материализованные создаются пустыми и заполняются уже
+    после снятия блокировки, чтобы пересчёт не останавливал запись.
+    """
+    check_dependents(model)
+    table = model._meta.db_table
+    new = table + SUFFIX
+    old = table + OLD_SUFFIX
+    constraint = model._meta.constraints[0].name
+    statements = [
+        f'DROP TRIGGER {quote(new + "_sync")} ON {quote(table)}',
+        f'DROP FUNCTION {quote(new + "_sync")}()',
+        f'ALTER TABLE {quote(table)} RENAME TO {quote(old)}',
+        f'ALTER TABLE {quote(old)} RENAME CONSTRAINT {quote(constraint)} '
+        f'TO {quote(constraint + OLD_SUFFIX)}',
+        f'ALTER TABLE {quote(new)} RENAME TO {quote(table)}',
+        f'ALTER TABLE {quote(table)} RENAME CONSTRAINT '
+        f'{quote(constraint + SUFFIX)} TO {quote(constraint)}',
+    ]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'LOCK TABLE {quote(table)} IN ACCESS EXCLUSIVE MODE')
+        views = []
+        for oid, name, kind, query in dependent_views(table):
+            cursor.execute(
+                'SELECT pg_get_indexdef(indexrelid) FROM pg_index '
+                'WHERE indrelid = %s ORDER BY indexrelid', [oid])
+            views.append((name, kind, query, cursor.fetchall()))
+            cursor.execute(f'DROP {VIEW_KINDS[kind]} {quote(name)}')
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.execute(
+            'SELECT pg_get_serial_sequence(%s, %s)', [quote(old), 'id'])
+        sequence, = cursor.fetchone()
+        if sequence:
+            cursor.execute(
+                f'ALTER SEQUENCE {sequence} OWNED BY {quote(table)}.id')
+        for name, kind, query, indexes in views:
+            cursor.execute(
+                f'CREATE {VIEW_KINDS[kind]} {quote(name)} AS '
+                f'{query.rstrip(";")}'
+                f'{" WITH NO DATA" if kind == "m" else ""}')
+            for index, in indexes:
+                cursor.execute(index)
+        if keep_old:
+            cursor.execute(
+                "SELECT conname FROM pg_constraint "
+                "WHERE conrelid = %s::regclass AND contype = 'f'",
+                [quote(old)])
+            for name, in cursor.fetchall():
+                cursor.execute(
+                    f'ALTER TABLE {quote(old)} DROP CONSTRAINT '
+                    f'{quote(name)}')
+        else:
+            cursor.execute(f'DROP TABLE {quote(old)}')
+    with connection.cursor() as cursor:
+        for name, kind, _, _ in views:
+            if kind == 'm':
+                cursor.execute(f'REFRESH MATERIALIZED VIEW {quote(name)}')
+
+
+def drop_old(model):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DROP TABLE {quote(model._meta.db_table + OLD_SUFFIX)}')
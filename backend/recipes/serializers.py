@@ -1,10 +1,19 @@
+from collections import defaultdict
+from operator import attrgetter, itemgetter
+
+from core.jobs import enqueue
+from core.serializers import SparseFieldsMixin, requested_fields
 from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 from rest_framework import exceptions, serializers, validators
 from users.serializers import CustomUserSerializer
 
-from .models import Ingredient, Recipe, RecipeIngredient, Tag, User
-from .utils import Base64ImageField, ingredient_create
+from . import snapshots
+from .jobs import update_similar
+from .models import (AuthorStats, Ingredient, IngredientStats, Recipe,
+                     RecipeIngredient, Subscription, Tag, TagStats, User)
+from .utils import (Base64ImageField, BulkPrimaryKeyRelatedField,
+                    ingredient_create, latest_recipes, set_prefetched)
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -42,7 +51,52 @@ class TagSerializer(serializers.ModelSerializer):
         ]
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class AuthorStatsSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source='author.username')
+
+    class Meta:
+        model = AuthorStats
+        fields = (
+            'author',
+            'username',
+            'recipes_count',
+            'favorites_count',
+            'followers_count',
+            'refreshed',
+        )
+
+
+class TagStatsSerializer(serializers.ModelSerializer):
+    slug = serializers.CharField(source='tag.slug')
+
+    class Meta:
+        model = TagStats
+        fields = (
+            'tag',
+            'slug',
+            'recipes_count',
+            'median_cooking_time',
+            'refreshed',
+        )
+
+
+class IngredientStatsSerializer(serializers.ModelSerializer):
+    name = serializers.CharField(source='ingredient.name')
+    measurement_unit = serializers.CharField(
+        source='ingredient.measurement_unit')
+
+    class Meta:
+        model = IngredientStats
+        fields = (
+            'ingredient',
+            'name',
+            'measurement_unit',
+            'recipes_count',
+            'refreshed',
+        )
+
+
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     author = CustomUserSerializer(read_only=True)
     ingredients = serializers.SerializerMethodField()
@@ -69,6 +123,9 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
 
     def get_ingredients(self, obj):
+        # После записи ингредиенты уже в памяти (RecipeWriteSerializer).
+        if hasattr(obj, 'ingredient_amounts'):
+            return obj.ingredient_amounts
         return obj.ingredients.values(
             'id',
             'name',
@@ -86,7 +143,7 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
 
 
 class RecipeWriteSerializer(serializers.ModelSerializer):
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BulkPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all(),
     )
@@ -117,28 +174,35 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         if not data.get('ingredients'):
             raise serializers.ValidationError(
                 _('Пожалуйста, добавьте ингредиенты.'))
-        list_id = []
-        for ingredient in data.get('ingredients'):
-            id = ingredient.get('ingredient_id')
-            if not Ingredient.objects.filter(id=id).exists():
+        list_id = [
+            ingredient.get('ingredient_id')
+            for ingredient in data.get('ingredients')
+        ]
+        found = Ingredient.objects.in_bulk(list_id)
+        for id in list_id:
+            if id not in found:
                 raise exceptions.ValidationError(
                     _(f'id: {id} нет. Пожалуйста, '
                       'введите ID ингредиента из существующего списка.'),
                 )
-            list_id.append(id)
         if len(list_id) != len(set(list_id)):
             raise serializers.ValidationError(
                 _('Вы добавили одинаковые ингредиенты.'),
             )
+        for ingredient in data.get('ingredients'):
+            ingredient['ingredient'] = found[ingredient['ingredient_id']]
         return data
 
     @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
-        recipe = Recipe.objects.create(**validated_data)
-        recipe.tags.set(tags)
+        recipe = Recipe(**validated_data)
+        self.keep_written(recipe, tags, ingredients)
+        recipe.save()
+        recipe.tags.add(*tags)
         ingredient_create(recipe, ingredients)
+        enqueue(update_similar, recipe_id=recipe.pk)
         return recipe
 
     @transaction.atomic
@@ -148,9 +212,34 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         ingredients = validated_data.pop('ingredients')
         instance.ingredients.clear()
         ingredient_create(instance, ingredients)
+        enqueue(update_similar, recipe_id=instance.pk)
+        self.keep_written(instance, tags, ingredients)
         return super().update(instance, validated_data)
 
+    @staticmethod
+    def keep_written(recipe, tags, ingredients):
+        """Теги и ингредиенты для ответа и снимка — без чтения из базы.
+
+        Порядок тот же, что у RecipeSerializer при чтении.
+        """
+        recipe.written_tags = sorted(tags, key=attrgetter('pk'))
+        recipe.ingredient_amounts = sorted((
+            {
+                'id': item['ingredient'].id,
+                'name': item['ingredient'].name,
+                'measurement_unit': item['ingredient'].measurement_unit,
+                'amount': item['amount'],
+            }
+            for item in ingredients
+        ), key=itemgetter('name'))
+        recipe.snapshot = snapshots.from_written(
+            recipe.author, recipe.written_tags, recipe.ingredient_amounts)
+
     def to_representation(self, instance):
+        # Кеш prefetch заполняется здесь: UpdateModelMixin сбрасывает его
+        # после update().
+        if hasattr(instance, 'written_tags'):
+            set_prefetched(instance, 'tags', instance.written_tags)
         return RecipeSerializer(instance, context=self.context).data
 
 
@@ -190,3 +279,175 @@ class SubscriptionSerializer(CustomUserSerializer):
         return RecipeListSerializer(
             recipes, many=True, context=self.context
         ).data
+
+
+def image_url(request):
+    """Ссылка на картинку рецепта, как у ImageField(use_url=True)."""
+    storage = Recipe._meta.get_field('image').storage
+
+    def get_url(name):
+        if not name:
+            return None
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request else url
+    return get_url
+
+
+def itemgetter_by_id(mapping):
+    return lambda row: mapping[row['id']]
+
+
+class LeanRecipeSerializer:
+    """Быстрое чтение рецептов без полей DRF.
+
+    Автор, теги и ингредиенты берутся из Recipe.snapshot, так что
+    страница читается одним запросом к recipes_recipe плюс подписки
+    текущего пользователя — только для запрошенных полей. Рецепты без
+    снимка (ещё не пересобранные) достраиваются запросами порции.
+    Ответ совпадает с RecipeSerializer.
+    """
+
+    columns = {
+        'id': ('id',),
+        'name': ('name',),
+        'author': ('snapshot',),
+        'tags': ('snapshot',),
+        'ingredients': ('snapshot',),
+        'image': ('image',),
+        'text': ('text',),
+        'cooking_time': ('cooking_time',),
+        'is_favorited': ('is_fav',),
+        'is_in_shopping_cart': ('is_shop',),
+    }
+
+    def __init__(self, rows, context):
+        self.rows = rows
+        self.context = context
+        self.fields = self.get_fields(context.get('request'))
+
+    @staticmethod
+    def get_fields(request):
+        return requested_fields(request, RecipeSerializer.Meta.fields)
+
+    @classmethod
+    def get_rows(cls, queryset, request):
+        values = {'id'}
+        for field in cls.get_fields(request):
+            values.update(cls.columns.get(field, ()))
+        # is_fav и is_shop есть только у авторизованного пользователя.
+        values -= {'is_fav', 'is_shop'} - set(queryset.query.annotations)
+        return queryset.prefetch_related(None).values(*values)
+
+    def get_snapshots(self):
+        result = {
+            row['id']: row['snapshot'] and snapshots.ordered(row['snapshot'])
+            for row in self.rows
+        }
+        missing = [pk for pk, snapshot in result.items() if not snapshot]
+        if missing:
+            result.update(snapshots.build(missing))
+        return result
+
+    def author_getter(self, user, recipes):
+        subscribed = None
+        if not user.is_anonymous:
+            subscribed = set(Subscription.objects.filter(
+                user=user,
+                author_id__in={
+                    snapshot['author']['id'] for snapshot in recipes.values()
+                },
+            ).values_list('author_id', flat=True))
+
+        def get_author(row):
+            author = dict(recipes[row['id']]['author'])
+            if subscribed is not None and author['id'] != user.id:
+                author['is_subscribed'] = author['id'] in subscribed
+            return author
+        return get_author
+
+    def get_getters(self):
+        request = self.context.get('request')
+        getters = {
+            'is_favorited': lambda row: bool(row.get('is_fav', False)),
+            'is_in_shopping_cart': lambda row: bool(row.get('is_shop', False)),
+        }
+        if {'author', 'tags', 'ingredients'} & set(self.fields):
+            recipes = self.get_snapshots()
+        for field in self.fields:
+            if field == 'author':
+                getters[field] = self.author_getter(request.user, recipes)
+            elif field in ('tags', 'ingredients'):
+                getters[field] = (
+                    lambda row, field=field: recipes[row['id']][field])
+            elif field == 'image':
+                get_url = image_url(request)
+                getters[field] = lambda row: get_url(row['image'])
+            elif field not in getters:
+                getters[field] = itemgetter(field)
+        return [(field, getters[field]) for field in self.fields]
+
+    @property
+    def data(self):
+        getters = self.get_getters()
+        return [
+            {field: get(row) for field, get in getters}
+            for row in self.rows
+        ]
+
+
+class LeanSubscriptionSerializer:
+    """Быстрое чтение страницы подписок, ответ как у SubscriptionSerializer.
+
+    Все авторы на странице — подписки текущего пользователя.
+    """
+
+    def __init__(self, rows, context):
+        self.rows = rows
+        self.context = context
+        self.fields = self.get_fields(context['request'])
+
+    @staticmethod
+    def get_fields(request):
+        return requested_fields(
+            request, (*SubscriptionSerializer.Meta.fields, 'is_subscribed'))
+
+    @classmethod
+    def get_rows(cls, queryset, request):
+        fields = cls.get_fields(request)
+        values = {'id', *(set(fields) & set(snapshots.USER_FIELDS))}
+        if 'recipes_count' in fields:
+            queryset = queryset.values(
+                *values, recipes_count=models.Count('recipes'))
+        else:
+            queryset = queryset.values(*values)
+        # С GROUP BY Meta.ordering не применяется: без явного порядка
+        # страницы пагинации не детерминированы.
+        return queryset.order_by(*User._meta.ordering)
+
+    def get_recipes(self):
+        request = self.context['request']
+        limit = request.query_params.get('recipes_limit')
+        get_url = image_url(request)
+        recipes = defaultdict(list)
+        rows = latest_recipes(
+            [row['id'] for row in self.rows],
+            ('author_id', 'id', 'name', 'image', 'cooking_time'),
+            int(limit) if limit else None)
+        for row in rows:
+            row['image'] = get_url(row['image'])
+            recipes[row.pop('author_id')].append(row)
+        return recipes
+
+    @property
+    def data(self):
+        getters = {'is_subscribed': lambda row: True}
+        for field in self.fields:
+            if field == 'recipes':
+                getters[field] = itemgetter_by_id(self.get_recipes())
+            elif field not in getters:
+                getters[field] = itemgetter(field)
+        getters = [(field, getters[field]) for field in self.fields]
+        return [
+            {field: get(row) for field, get in getters}
+            for row in self.rows
+        ]
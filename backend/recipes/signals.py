@@ -0,0 +1,90 @@
+from core.jobs import enqueue
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import caching
+from .catalog import CATALOGS, publish_on_commit
+from .jobs import rebuild_snapshots
+from .models import (Favorite, Ingredient, Recipe, ShopCart, Subscription, Tag,
+                     User)
+from .snapshots import USER_FIELDS
+from .utils import bump_state_owners
+
+RECIPE_LOOKUPS = {Ingredient: 'ingredients', Tag: 'tags'}
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def catalog_changed(sender, **kwargs):
+    """Публикует новый снимок каталога после фиксации транзакции."""
+    for name, (model, fields) in CATALOGS.items():
+        if model is sender:
+            publish_on_commit(name)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredients_changed(sender, **kwargs):
+    caching.ingredients.invalidate()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tags_changed(sender, **kwargs):
+    caching.tags.invalidate()
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    caching.recipes_changed([instance.pk])
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=Tag)
+def snapshot_source_changed(sender, instance, created, **kwargs):
+    """Снимки рецептов с изменённым тегом или ингредиентом — в очередь."""
+    if not created:
+        enqueue(rebuild_snapshots,
+                lookup={RECIPE_LOOKUPS[sender]: instance.pk})
+
+
+@receiver(pre_delete, sender=Ingredient)
+@receiver(pre_delete, sender=Tag)
+def snapshot_source_deleted(sender, instance, **kwargs):
+    # После удаления связей с рецептами уже не найти.
+    ids = list(instance.recipes.values_list('pk', flat=True))
+    if ids:
+        enqueue(rebuild_snapshots, lookup={'pk__in': ids})
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    """Снимки рецептов автора, если изменились поля из снимка."""
+    if created or (update_fields
+                   and not set(update_fields) & set(USER_FIELDS)):
+        return
+    if instance.recipes.exists():
+        enqueue(rebuild_snapshots, lookup={'author': instance.pk})
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    """В том числе каскадное удаление вместе с автором."""
+    caching.recipes_changed([instance.pk])
+    if instance.image:
+        Recipe.release_image(instance.image.name)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_state_deleted(sender, instance, **kwargs):
+    """Каскадом уходят избранное и покупки других пользователей."""
+    bump_state_owners(Favorite.objects.filter(recipe=instance))
+    bump_state_owners(ShopCart.objects.filter(recipe=instance))
+
+
+@receiver(pre_delete, sender=User)
+def author_state_deleted(sender, instance, **kwargs):
+    """Каскадом уходят подписки на автора; рецепты — см. выше."""
+    bump_state_owners(Subscription.objects.filter(author=instance))
@@ -0,0 +1,127 @@
+import multiprocessing
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from . import vectors
+from .models import Recipe, RecipeIngredient, RecipeNeighbor
+
+
+def feature_pairs(recipe_ids=None):
+    """Уникальные пары (id рецепта, признак) в массиве numpy.
+
+    Признак кодируется числом: id ингредиента или -id тега.
+    """
+    ingredients = RecipeIngredient.objects.all()
+    tags = Recipe.tags.through.objects.all()
+    if recipe_ids is not None:
+        ingredients = ingredients.filter(recipe_id__in=recipe_ids)
+        tags = tags.filter(recipe_id__in=recipe_ids)
+    rows = list(ingredients.values_list('recipe_id', 'ingredient_id'))
+    rows += [(recipe, -tag)
+             for recipe, tag in tags.values_list('recipe_id', 'tag_id')]
+    if not rows:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.unique(np.array(rows, dtype=np.int64), axis=0)
+
+
+def document_frequency(features):
+    """Число рецептов с каждым признаком — одним запросом на вид."""
+    ingredients = [int(f) for f in features if f > 0]
+    tags = [-int(f) for f in features if f < 0]
+    df = dict(RecipeIngredient.objects.filter(
+        ingredient_id__in=ingredients,
+    ).values('ingredient_id').annotate(
+        count=Count('pk')).values_list('ingredient_id', 'count'))
+    df.update(
+        (-tag, count) for tag, count in Recipe.tags.through.objects.filter(
+            tag_id__in=tags,
+        ).values('tag_id').annotate(
+            count=Count('pk')).values_list('tag_id', 'count'))
+    return np.array([df.get(int(f), 0) for f in features], dtype=np.float64)
+
+
+def save_neighbors(results):
+    """results: {id рецепта: (id соседей, близости)}."""
+    with transaction.atomic():
+        RecipeNeighbor.objects.filter(recipe_id__in=list(results)).delete()
+        RecipeNeighbor.objects.bulk_create(
+            RecipeNeighbor(
+                recipe_id=recipe_id, neighbor_id=int(neighbor),
+                rank=rank, score=float(score))
+            for recipe_id, (neighbors, scores) in results.items()
+            for rank, (neighbor, score) in enumerate(zip(neighbors, scores))
+        )
+
+
+def rebuild(k=None, chunk_size=None, processes=None, progress=None):
+    """Пересчёт соседей всех рецептов.
+
+    Соседи — рецепты хотя бы с одним общим ингредиентом, как и в update.
+    Близости считаются порциями строк (см. vectors.chunks) в processes
+    дочерних процессах; запись в базу — в основном процессе, по
+    транзакции на порцию. Процессы запускаются через spawn: fork из
+    многопоточного run_worker небезопасен.
+    """
+    config = settings.SIMILARITY
+    k = k or config['K']
+    chunk_size = chunk_size or config['CHUNK_SIZE']
+    processes = processes or config['PROCESSES']
+
+    recipes, features, matrix = vectors.tfidf(
+        feature_pairs(), Recipe.objects.count())
+    ingredients, tags = vectors.split(matrix, features)
+    chunks = [(start, stop, k) for start, stop in vectors.chunks(
+        ingredients, chunk_size, config['CHUNK_PAIRS'])]
+    if processes > 1:
+        pool = multiprocessing.get_context('spawn').Pool(
+            processes, initializer=vectors.init,
+            initargs=(ingredients, tags))
+        results = pool.imap_unordered(vectors.neighbors, chunks)
+    else:
+        pool = None
+        vectors.init(ingredients, tags)
+        results = map(vectors.neighbors, chunks)
+    try:
+        done = 0
+        for start, rows in results:
+            save_neighbors({
+                int(recipes[start + offset]): (recipes[columns], scores)
+                for offset, (columns, scores) in enumerate(rows)
+            })
+            done += len(rows)
+            if progress is not None:
+                progress(done, len(recipes))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        vectors.init(None, None)
+    return len(recipes)
+
+
+def update(recipe_id, k=None):
+    """Пересчёт соседей одного рецепта после создания или изменения.
+
+    Кандидаты те же, что у rebuild, — рецепты хотя бы с одним общим
+    ингредиентом. IDF признаков берётся по всей базе, так что соседи
+    и близости совпадают с полным пересчётом.
+    """
+    k = k or settings.SIMILARITY['K']
+    ingredient_ids = RecipeIngredient.objects.filter(
+        recipe_id=recipe_id).values('ingredient_id')
+    candidates = RecipeIngredient.objects.filter(
+        ingredient_id__in=ingredient_ids).values('recipe_id')
+    pairs = feature_pairs(recipe_ids=candidates)
+    if not len(pairs) or recipe_id not in pairs[:, 0]:
+        RecipeNeighbor.objects.filter(recipe_id=recipe_id).delete()
+        return
+    features = np.unique(pairs[:, 1])
+    recipes, _, matrix = vectors.tfidf(
+        pairs, Recipe.objects.count(), document_frequency(features))
+    row = int(np.searchsorted(recipes, recipe_id))
+    similarities = (matrix[row] @ matrix.T).tocsr()
+    columns, scores = next(vectors.top_k(similarities, k, [row]))
+    save_neighbors({recipe_id: (recipes[columns], scores)})
@@ -0,0 +1,115 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from . import caching
+from .models import Recipe, RecipeIngredient
+
+USER_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name')
+TAG_FIELDS = ('id', 'name', 'color', 'slug')
+INGREDIENT_FIELDS = ('id', 'name', 'measurement_unit', 'amount')
+
+
+def tags_by_recipe(ids):
+    tags = defaultdict(list)
+    rows = Recipe.tags.through.objects.filter(
+        recipe_id__in=ids,
+    ).order_by('tag_id').values_list(
+        'recipe_id', 'tag_id', 'tag__name', 'tag__color', 'tag__slug')
+    for recipe_id, *tag in rows:
+        tags[recipe_id].append(dict(zip(TAG_FIELDS, tag)))
+    return tags
+
+
+def ingredients_by_recipe(ids):
+    ingredients = defaultdict(list)
+    rows = RecipeIngredient.objects.filter(
+        recipe_id__in=ids,
+    ).order_by('ingredient__name').values_list(
+        'recipe_id', 'ingredient_id', 'ingredient__name',
+        'ingredient__measurement_unit', 'amount')
+    for recipe_id, *ingredient in rows:
+        ingredients[recipe_id].append(
+            dict(zip(INGREDIENT_FIELDS, ingredient)))
+    return ingredients
+
+
+def build(ids):
+    """Снимки рецептов: {id: снимок} — три запроса на любой список id.
+
+    Снимок не зависит от пользователя: автор, теги и ингредиенты в том
+    виде, в каком их отдаёт RecipeSerializer.
+    """
+    authors = Recipe.objects.filter(pk__in=ids).values_list(
+        'pk', *(f'author__{field}' for field in USER_FIELDS))
+    tags = tags_by_recipe(ids)
+    ingredients = ingredients_by_recipe(ids)
+    return {
+        pk: {
+            'author': dict(zip(USER_FIELDS, author)),
+            'tags': tags[pk],
+            'ingredients': ingredients[pk],
+        }
+        for pk, *author in authors
+    }
+
+
+def from_written(author, tags, ingredients):
+    """Снимок по данным записи, без запросов.
+
+    tags отсортированы по id, ingredients — по названию, как в build().
+    """
+    return {
+        'author': {field: getattr(author, field) for field in USER_FIELDS},
+        'tags': [
+            {field: getattr(tag, field) for field in TAG_FIELDS}
+            for tag in tags
+        ],
+        'ingredients': ingredients,
+    }
+
+
+def ordered(snapshot):
+    """Снимок с ключами в порядке полей сериализаторов.
+
+    jsonb в PostgreSQL хранит ключи отсортированными по длине, а ответ
+    должен совпадать с RecipeSerializer побайтно.
+    """
+    return {
+        'author': {
+            field: snapshot['author'][field] for field in USER_FIELDS},
+        'tags': [
+            {field: tag[field] for field in TAG_FIELDS}
+            for tag in snapshot['tags']
+        ],
+        'ingredients': [
+            {field: ingredient[field] for field in INGREDIENT_FIELDS}
+            for ingredient in snapshot['ingredients']
+        ],
+    }
+
+
+def rebuild(queryset=None, batch_size=None, progress=None):
+    """Пересобирает снимки рецептов queryset порциями по batch_size.
+
+    Порции идут по возрастанию id, каждая — в своей транзакции, так что
+    долгих блокировок нет. Возвращает число обновлённых рецептов.
+    """
+    if queryset is None:
+        queryset = Recipe.objects.all()
+    batch_size = batch_size or settings.SNAPSHOT_BATCH_SIZE
+    ids = queryset.order_by('pk').values_list('pk', flat=True)
+    last, done = 0, 0
+    while batch := list(ids.filter(pk__gt=last)[:batch_size]):
+        with transaction.atomic():
+            Recipe.objects.bulk_update(
+                [Recipe(pk=pk, snapshot=snapshot)
+                 for pk, snapshot in build(batch).items()],
+                ['snapshot'])
+            caching.recipes_changed(batch)
+        last = batch[-1]
+        done += len(batch)
+        if progress is not None:
+            progress(done)
+    return done
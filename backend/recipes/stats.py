@@ -0,0 +1,31 @@
+from django.db import connection
+
+from .models import AuthorStats, IngredientStats, TagStats
+
+VIEWS = {
+    'authors': AuthorStats,
+    'tags': TagStats,
+    'ingredients': IngredientStats,
+}
+
+
+def is_populated(name):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT ispopulated FROM pg_matviews WHERE matviewname = %s',
+            [name])
+        return cursor.fetchone()[0]
+
+
+def refresh(model):
+    """Пересчёт материализованного представления модели.
+
+    CONCURRENTLY не блокирует чтение, но требует уже заполненного
+    представления — первый раз оно заполняется обычным REFRESH.
+    """
+    name = model._meta.db_table
+    concurrently = 'CONCURRENTLY ' if is_populated(name) else ''
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'REFRESH MATERIALIZED VIEW {concurrently}'
+            f'{connection.ops.quote_name(name)}')
@@ -0,0 +1,61 @@
+import hashlib
+import os
+import re
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+
+HASHED_NAME = re.compile(r'^[0-9a-f]{64}$')
+
+
+def content_hash(content):
+    sha = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        sha.update(chunk)
+    content.seek(0)
+    return sha.hexdigest()
+
+
+class HashedStorage(FileSystemStorage):
+    """Файлы с именем по sha256 содержимого: upload_to/<sha256>.<ext>.
+
+    Одинаковые картинки хранятся одним файлом, который можно отдавать
+    с вечным кешем. Удалять файл можно только когда на него не ссылается
+    ни один объект (Recipe.release_image) и он старше IMAGE_DELETE_GRACE:
+    новую ссылку может нести ещё не зафиксированная транзакция.
+    """
+
+    def hashed_name(self, name, content):
+        path = PurePosixPath(name)
+        return str(path.with_name(
+            content_hash(content) + path.suffix.lower()))
+
+    @staticmethod
+    def is_hashed(name):
+        return bool(HASHED_NAME.match(PurePosixPath(name).stem))
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        try:
+            # Файл уже есть: обновляем время изменения, чтобы удаление
+            # ненужных картинок не тронуло его, пока рецепт сохраняется.
+            os.utime(self.path(name))
+            return name
+        except FileNotFoundError:
+            pass
+        # При одновременной загрузке одной картинки вторая получит
+        # суффикс от get_available_name — это лишь лишняя копия.
+        return super().save(name, content, max_length)
+
+    def is_recent(self, name):
+        """Файл моложе IMAGE_DELETE_GRACE — удалять его рано."""
+        age = timezone.now() - self.get_modified_time(name)
+        return age.total_seconds() < settings.IMAGE_DELETE_GRACE
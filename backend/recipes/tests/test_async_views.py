@@ -0,0 +1,152 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from core import concurrency
+from django.core.cache import cache
+from django.db import connections
+from django.test import AsyncClient, TransactionTestCase
+from django.urls import include, path, resolve
+from recipes import async_views, snapshots
+from recipes import urls as recipes_urls
+from recipes.models import Ingredient, Recipe, RecipeIngredient, ShopCart, Tag
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+# urlconf ASGI-режима (settings.ASGI=True) для тестового AsyncClient.
+urlpatterns = concurrency.asyncify_urlpatterns([
+    path('api/', include((
+        recipes_urls.async_urlpatterns + recipes_urls.urlpatterns,
+        'recipes'))),
+    path('api/', include('users.urls')),
+])
+
+
+def create_user(name):
+    return User.objects.create_user(
+        email=f'{name}@example.com', username=name,
+        first_name=name.title(), last_name='Cook', password='pw')
+
+
+class AsyncViewsTests(TransactionTestCase):
+    """Ответы ASGI-режима совпадают с ответами обычных WSGI view.
+
+    Транзакционный тест: run_sync выполняет запросы к базе в других
+    потоках, со своими соединениями.
+    """
+
+    def setUp(self):
+        cache.clear()
+        # Один поток ORM, чтобы после теста закрыть его соединение.
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        patcher = mock.patch.object(concurrency, '_executor', self.executor)
+        patcher.start()
+        self.addCleanup(self.executor.shutdown)
+        self.addCleanup(patcher.stop)
+        self.addCleanup(
+            lambda: self.executor.submit(connections.close_all).result())
+        self.async_client = AsyncClient()
+
+        self.author = create_user('author')
+        self.reader = create_user('reader')
+        self.token = Token.objects.create(user=self.reader).key
+        tag = Tag.objects.create(name='Обед', color='#000000', slug='lunch')
+        salt, beet = (
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('Соль', 'Свёкла'))
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Борщ', text='Текст', cooking_time=30,
+            image='recipe/img/borsch.png')
+        self.recipe.tags.add(tag)
+        for ingredient in (salt, beet):
+            RecipeIngredient.objects.create(
+                recipe=self.recipe, ingredient=ingredient, amount=10)
+        snapshots.rebuild()
+
+    def fetch(self, method, path, token=None, data=None):
+        """(WSGI-ответ, ASGI-ответ) на один и тот же запрос."""
+        body = {}
+        if data is not None:
+            body = {'data': json.dumps(data),
+                    'content_type': 'application/json'}
+        extra = {'HTTP_AUTHORIZATION': f'Token {token}'} if token else {}
+        wsgi = getattr(self.client, method)(path, **body, **extra)
+        cache.clear()
+        # Лишние аргументы AsyncClient становятся заголовками ASGI.
+        headers = {'authorization': f'Token {token}'} if token else {}
+        request = getattr(self.async_client, method)
+
+        async def call():
+            return await request(path, **body, **headers)
+
+        with self.settings(ROOT_URLCONF=__name__):
+            asgi = async_to_sync(call)()
+        cache.clear()
+        return wsgi, asgi
+
+    def content(self, response):
+        if response.streaming:
+            return b''.join(response.streaming_content)
+        return response.content
+
+    def assertSameResponse(self, method, path, token=None, data=None,
+                           status=200):
+        wsgi, asgi = self.fetch(method, path, token, data)
+        self.assertEqual(wsgi.status_code, status, self.content(wsgi))
+        self.assertEqual(asgi.status_code, wsgi.status_code)
+        for header in ('Content-Type', 'Content-Disposition', 'Retry-After',
+                       'WWW-Authenticate'):
+            self.assertEqual(asgi.get(header), wsgi.get(header), header)
+        wsgi, asgi = self.content(wsgi), self.content(asgi)
+        if wsgi.startswith((b'{', b'[')):
+            self.assertEqual(json.loads(asgi), json.loads(wsgi))
+        else:
+            self.assertEqual(asgi, wsgi)
+        return asgi
+
+    def test_asyncify_urlpatterns(self):
+        self.assertIs(
+            resolve('/api/tags/', __name__).func, async_views.tag_list)
+        for url in ('/api/recipes/', '/api/users/me/'):
+            with self.subTest(url=url):
+                self.assertTrue(asyncio.iscoroutinefunction(
+                    resolve(url, __name__).func))
+                # Маршруты WSGI-режима остаются синхронными.
+                self.assertFalse(asyncio.iscoroutinefunction(
+                    resolve(url).func))
+
+    def test_tags_and_ingredients(self):
+        self.assertSameResponse('get', '/api/tags/')
+        for search in ('', 'с', 'Свё', 'нет'):
+            with self.subTest(search=search):
+                self.assertSameResponse(
+                    'get', f'/api/ingredients/?name={search}')
+
+    def test_recipe_detail(self):
+        path = f'/api/recipes/{self.recipe.pk}/'
+        ShopCart.objects.create(owner=self.reader, recipe=self.recipe)
+        for token in (None, self.token):
+            with self.subTest(token=token):
+                self.assertSameResponse('get', path, token)
+        self.assertSameResponse('get', '/api/recipes/0/', status=404)
+        self.assertSameResponse(
+            'get', path, token='bad', status=401)
+
+    def test_download_shopping_cart(self):
+        path = '/api/recipes/download_shopping_cart/'
+        self.assertSameResponse('get', path, status=401)
+        self.assertSameResponse('get', path, self.token, status=400)
+        ShopCart.objects.create(owner=self.reader, recipe=self.recipe)
+        content = self.assertSameResponse('get', path, self.token)
+        self.assertIn('Соль', content.decode())
+
+    def test_other_methods_and_routes(self):
+        # PATCH идёт в обычный view через async_view, как и все прочие
+        # маршруты urlconf.
+        self.assertSameResponse(
+            'patch', f'/api/recipes/{self.recipe.pk}/', self.token,
+            data={'name': 'Щи'}, status=403)
+        self.assertSameResponse('get', '/api/recipes/')
+        self.assertSameResponse('get', '/api/users/me/', self.token)
@@ -0,0 +1,134 @@
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            Subscription, Tag)
+from rest_framework.test import APIClient, APITestCase
+from users.models import User
+
+
+def create_user(name):
+    return User.objects.create_user(
+        email=f'{name}@example.com', username=name,
+        first_name=name.title(), last_name='Cook', password='pw')
+
+
+class BatchTests(APITestCase):
+    """/recipes/batch/ и /users/batch/: число запросов не зависит от id."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        # Без пароля: хеширование сотни паролей заметно замедляет тест.
+        cls.authors = [
+            User.objects.create(
+                email=f'author{number}@example.com',
+                username=f'author{number}', first_name='Author',
+                last_name='Cook')
+            for number in range(settings.BATCH_MAX_SIZE)
+        ]
+        tag = Tag.objects.create(name='Обед', color='#000000', slug='lunch')
+        ingredient = Ingredient.objects.create(
+            name='Соль', measurement_unit='г')
+        cls.recipes = [
+            Recipe.objects.create(
+                author=author, name=f'Рецепт {number}', text='Текст',
+                cooking_time=5, image='recipe/img/borsch.png')
+            for number, author in enumerate(cls.authors)
+        ]
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=tag)
+            for recipe in cls.recipes)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+            for recipe in cls.recipes)
+        Favorite.objects.create(owner=cls.reader, recipe=cls.recipes[1])
+        Subscription.objects.create(user=cls.reader, author=cls.authors[1])
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = APIClient()
+        self.reader_client.force_authenticate(self.reader)
+
+    def batch(self, client, url, ids, method):
+        if method == 'get':
+            return client.get(url, {'ids': ','.join(map(str, ids))})
+        return client.post(
+            url, json.dumps({'ids': ids}), content_type='application/json')
+
+    def assertBatch(self, url, objects, queries, check=None):
+        """Ответ на 1 id, BATCH_MAX_SIZE id и id с пропусками, GET и POST.
+
+        queries — {клиент: число запросов}; оно одно для любого числа id.
+        """
+        ids = [obj.pk for obj in objects]
+        absent = max(ids) + 1
+        cases = {
+            'one': [ids[1]],
+            'max': ids[::-1],
+            'missing': [ids[2], absent, ids[1]],
+        }
+        for method in ('get', 'post'):
+            for client, count in queries.items():
+                for name, requested in cases.items():
+                    with self.subTest(method=method, case=name,
+                                      user=client is self.reader_client):
+                        with self.assertNumQueries(count):
+                            response = self.batch(
+                                client, url, requested, method)
+                        self.assertEqual(response.status_code, 200)
+                        results = response.json()['results']
+                        # Порядок ответа — порядок запроса.
+                        self.assertEqual(
+                            [item['id'] for item in results], requested)
+                        missing = [absent] if absent in requested else []
+                        self.assertEqual(response.json()['missing'], missing)
+                        for item in results:
+                            if item['id'] == absent:
+                                self.assertEqual(
+                                    item['detail'], 'Не найдено.')
+                            elif check is not None:
+                                check(client, item)
+
+    def test_recipes(self):
+        def check(client, item):
+            self.assertEqual(item['name'], f'Рецепт {item["id"] - first}')
+            self.assertEqual(len(item['tags']), 1)
+            self.assertEqual(len(item['ingredients']), 1)
+            if client is self.reader_client:
+                self.assertEqual(
+                    item['is_favorited'], item['id'] == self.recipes[1].pk)
+
+        first = self.recipes[0].pk
+        # Рецепты, теги, ингредиенты, авторы; с токеном ещё подписки.
+        self.assertBatch('/api/recipes/batch/', self.recipes,
+                         {self.client: 4, self.reader_client: 5}, check)
+
+    def test_users(self):
+        def check(client, item):
+            if client is self.reader_client:
+                self.assertEqual(
+                    item['is_subscribed'], item['id'] == self.authors[1].pk)
+
+        # Один запрос: is_subscribed — аннотация.
+        self.assertBatch('/api/users/batch/', self.authors,
+                         {self.client: 1, self.reader_client: 1}, check)
+
+    def test_invalid_ids(self):
+        cases = {
+            '': 'Передайте список id.',
+            '1,x': 'Id должны быть целыми числами.',
+            ','.join(map(str, range(settings.BATCH_MAX_SIZE + 1))):
+                f'Не больше {settings.BATCH_MAX_SIZE} id за запрос.',
+        }
+        for ids, message in cases.items():
+            with self.subTest(message=message), self.assertNumQueries(0):
+                response = self.client.get(
+                    '/api/recipes/batch/', {'ids': ids})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'ids': message})
+        # Повторы не считаются в лимит.
+        response = self.client.get('/api/recipes/batch/', {
+            'ids': ','.join([str(self.recipes[0].pk)] * 200)})
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,150 @@
+import gzip
+import io
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import brotli
+import orjson
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from foodgram import settings as project_settings
+from recipes import catalog
+from recipes.models import Ingredient, Tag
+
+
+class CatalogMixin:
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+        override = override_settings(CATALOG={
+            'ROOT': str(self.root), 'URL': '/catalog/', 'KEEP': 2})
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def files(self):
+        return sorted(
+            path.name for path in self.root.iterdir()
+            if not path.name.startswith('.'))
+
+
+class PublishTests(CatalogMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        Tag.objects.create(name='Обед', color='#000000', slug='lunch')
+        Tag.objects.create(name='Завтрак', color='#ffffff', slug='breakfast')
+
+    def test_files_and_manifest(self):
+        entry = catalog.publish('tags')
+        filename = f'tags.{entry["version"]}.json'
+        self.assertEqual(self.files(), [
+            'manifest.json', filename, f'{filename}.br', f'{filename}.gz'])
+        self.assertEqual(entry['url'], f'/catalog/{filename}')
+        self.assertEqual(entry['count'], 2)
+        self.assertEqual(catalog.manifest(), {'tags': entry})
+
+        content = (self.root / filename).read_bytes()
+        self.assertEqual(orjson.loads(content), list(
+            Tag.objects.order_by(*Tag._meta.ordering or ['id']).values(
+                'id', 'name', 'color', 'slug')))
+        self.assertEqual(
+            gzip.decompress((self.root / f'{filename}.gz').read_bytes()),
+            content)
+        self.assertEqual(
+            brotli.decompress((self.root / f'{filename}.br').read_bytes()),
+            content)
+        self.assertEqual(
+            os.stat(self.root / filename).st_mode & 0o777, 0o644)
+
+    def test_same_content_keeps_version(self):
+        first = catalog.publish('tags')
+        self.assertEqual(catalog.publish('tags'), first)
+        self.assertEqual(len(self.files()), 4)
+
+    def test_old_versions_pruned(self):
+        versions = []
+        for number in range(4):
+            Tag.objects.create(
+                name=f'Тег {number}', color=f'#00000{number}',
+                slug=f'tag{number}')
+            versions.append(catalog.publish('tags')['version'])
+            # Порядок версий — по времени изменения файла.
+            path = self.root / f'tags.{versions[-1]}.json'
+            os.utime(path, (number, number))
+        kept = {name.split('.')[1] for name in self.files()
+                if name.startswith('tags.')}
+        self.assertEqual(kept, set(versions[-2:]))
+        self.assertEqual(catalog.manifest()['tags']['version'], versions[-1])
+
+    def test_one_publication_per_transaction(self):
+        with mock.patch.object(catalog, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                for number in range(3):
+                    Ingredient.objects.create(
+                        name=f'Соль {number}', measurement_unit='г')
+        publish.assert_called_once_with('ingredients')
+
+    def test_failed_publication_keeps_change(self):
+        with mock.patch.object(
+                catalog, 'publish', side_effect=PermissionError('ro')):
+            with self.assertLogs('recipes.catalog', 'ERROR'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    Ingredient.objects.create(
+                        name='Соль', measurement_unit='г')
+        self.assertTrue(Ingredient.objects.exists())
+
+
+class CommandTests(CatalogMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        data = self.root / 'base' / 'data'
+        data.mkdir(parents=True)
+        (data / 'ingredients.csv').write_text(
+            'Соль,г\nСвёкла,г\n', encoding='utf-8')
+        patcher = mock.patch.object(
+            project_settings, 'BASE_DIR', self.root / 'base')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_publish_catalog(self):
+        Ingredient.objects.create(name='Соль', measurement_unit='г')
+        stdout = io.StringIO()
+        call_command('publish_catalog', stdout=stdout)
+        entries = catalog.manifest()
+        self.assertEqual(set(entries), {'ingredients', 'tags'})
+        for name, entry in entries.items():
+            self.assertIn(f"{name}: {entry['url']}", stdout.getvalue())
+            self.assertTrue(
+                (self.root / f'{name}.{entry["version"]}.json').exists())
+        self.assertEqual(entries['ingredients']['count'], 1)
+
+    def test_publish_catalog_errors(self):
+        with self.assertRaisesMessage(CommandError, 'Неизвестные каталоги'):
+            call_command('publish_catalog', 'recipes')
+        with mock.patch.object(
+                catalog.Path, 'mkdir', side_effect=PermissionError('ro')):
+            with self.assertRaisesMessage(CommandError, 'ro'):
+                call_command('publish_catalog', 'tags')
+
+    def test_load_ingredients_publishes(self):
+        with mock.patch('builtins.print'):
+            call_command('load_ingredients')
+        self.assertEqual(Ingredient.objects.count(), 2)
+        self.assertEqual(catalog.manifest()['ingredients']['count'], 2)
+
+    def test_load_ingredients_without_catalog_root(self):
+        # Каталог нельзя создать: на месте родителя — файл.
+        (self.root / 'file').touch()
+        stderr = io.StringIO()
+        with override_settings(CATALOG={
+                'ROOT': str(self.root / 'file' / 'catalog'),
+                'URL': '/catalog/', 'KEEP': 2}), \
+                mock.patch('builtins.print'):
+            call_command('load_ingredients', stderr=stderr)
+        # Загрузка не откатывается и не выдаётся за отсутствие csv.
+        self.assertEqual(Ingredient.objects.count(), 2)
+        self.assertIn('publish_catalog', stderr.getvalue())
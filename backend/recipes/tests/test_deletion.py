@@ -0,0 +1,133 @@
+from unittest import mock
+
+from core.models import Job
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from recipes.deletion import delete_objects
+from recipes.jobs import remove_unreferenced_images
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            RecipeNeighbor, ShopCart, Subscription, Tag)
+from users.models import User
+
+
+def create_user(name):
+    return User.objects.create_user(
+        email=f'{name}@example.com', username=name,
+        first_name=name.title(), last_name='Cook', password='pw')
+
+
+class DeletionTests(TestCase):
+    """Порционное удаление с каскадами, как у Model.delete()."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = create_user('author')
+        self.other = create_user('other')
+        self.tag = Tag.objects.create(
+            name='Обед', color='#000000', slug='lunch')
+        self.ingredient = Ingredient.objects.create(
+            name='Соль', measurement_unit='г')
+        self.kept = self.create_recipe(self.other, 'recipe/img/shared.png')
+
+    def create_recipe(self, author, image):
+        recipe = Recipe.objects.create(
+            author=author, name=f'Рецепт {Recipe.objects.count()}',
+            text='Текст', cooking_time=5, image=image)
+        recipe.tags.add(self.tag)
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=self.ingredient, amount=1)
+        return recipe
+
+    def create_author_recipes(self, count):
+        recipes = [
+            self.create_recipe(self.author, f'recipe/img/{number}.png')
+            for number in range(count)
+        ]
+        for recipe in recipes:
+            Favorite.objects.create(owner=self.other, recipe=recipe)
+            ShopCart.objects.create(owner=self.other, recipe=recipe)
+            RecipeNeighbor.objects.create(
+                recipe=self.kept, neighbor=recipe,
+                rank=RecipeNeighbor.objects.count(), score=1)
+        return recipes
+
+    def image_jobs(self):
+        return sorted(
+            name
+            for payload in Job.objects.filter(
+                name=remove_unreferenced_images.job_name,
+            ).values_list('payload', flat=True)
+            for name in payload['names']
+        )
+
+    def test_user_cascades(self):
+        recipes = self.create_author_recipes(3)
+        Favorite.objects.create(owner=self.author, recipe=self.kept)
+        ShopCart.objects.create(owner=self.author, recipe=self.kept)
+        Subscription.objects.create(user=self.author, author=self.other)
+        Subscription.objects.create(user=self.other, author=self.author)
+
+        deleted = delete_objects(
+            User.objects.filter(pk=self.author.pk), batch_size=2)
+
+        self.assertEqual(deleted[User], 1)
+        self.assertEqual(deleted[Recipe], 3)
+        self.assertEqual(deleted[RecipeIngredient], 3)
+        self.assertEqual(deleted[Favorite], 4)
+        self.assertEqual(deleted[ShopCart], 4)
+        self.assertEqual(deleted[Subscription], 2)
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertEqual(list(Recipe.objects.all()), [self.kept])
+        ids = [recipe.pk for recipe in recipes]
+        self.assertFalse(RecipeIngredient.objects.filter(
+            recipe__in=ids).exists())
+        self.assertFalse(Recipe.tags.through.objects.filter(
+            recipe__in=ids).exists())
+        self.assertFalse(RecipeNeighbor.objects.exists())
+        self.assertFalse(Favorite.objects.exists())
+        self.assertFalse(ShopCart.objects.exists())
+        self.assertFalse(Subscription.objects.exists())
+        # Рецепт другого автора со всеми связями на месте.
+        self.assertEqual(list(self.kept.tags.all()), [self.tag])
+        self.assertEqual(self.kept.recipe_ingredient.count(), 1)
+
+    def test_images_removed_only_when_unreferenced(self):
+        self.create_author_recipes(2)
+        self.create_recipe(self.author, 'recipe/img/shared.png')
+        delete_objects(Recipe.objects.filter(author=self.author))
+        self.assertEqual(self.image_jobs(), [
+            'recipe/img/0.png', 'recipe/img/1.png', 'recipe/img/shared.png',
+        ])
+
+        storage = Recipe._meta.get_field('image').storage
+        with mock.patch.object(storage, 'is_recent', return_value=False), \
+                mock.patch.object(storage, 'delete') as delete:
+            remove_unreferenced_images(self.image_jobs())
+        # Картинку ещё показывает рецепт другого автора.
+        self.assertEqual(
+            sorted(call.args[0] for call in delete.call_args_list),
+            ['recipe/img/0.png', 'recipe/img/1.png'])
+
+    def count_queries(self, recipes, batch_size):
+        self.create_author_recipes(recipes)
+        with CaptureQueriesContext(connection) as queries:
+            deleted = delete_objects(
+                User.objects.filter(pk=self.author.pk), batch_size)
+        self.assertEqual(deleted[Recipe], recipes)
+        self.author = create_user('author')
+        return len(queries)
+
+    def test_queries_per_batch(self):
+        # В одной порции число запросов не зависит от числа рецептов.
+        self.assertEqual(
+            self.count_queries(2, batch_size=10),
+            self.count_queries(8, batch_size=10))
+        # Каждая следующая порция рецептов добавляет одно и то же число:
+        # по несколько запросов на каждую зависимую таблицу, не на строку.
+        one, two, three = (
+            self.count_queries(4 * batches, batch_size=4)
+            for batches in (1, 2, 3))
+        self.assertEqual(two - one, three - two)
+        self.assertLessEqual(two - one, 40)
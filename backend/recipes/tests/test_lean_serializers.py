@@ -0,0 +1,150 @@
+import warnings
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipes import snapshots
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShopCart, Subscription, Tag)
+from recipes.serializers import (LeanRecipeSerializer,
+                                 LeanSubscriptionSerializer, RecipeSerializer,
+                                 SubscriptionSerializer)
+from recipes.utils import annotate_user_flags
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+from users.models import User
+
+
+def create_user(name):
+    return User.objects.create_user(
+        email=f'{name}@example.com', username=name,
+        first_name=name.title(), last_name='Cook', password='pw')
+
+
+class LeanSerializerContractTests(APITestCase):
+    """Быстрые сериализаторы отдают то же, что и обычные, байт в байт."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = create_user('viewer')
+        cls.authors = [create_user(f'author{number}') for number in range(4)]
+        tags = [
+            Tag.objects.create(name=name, color='#fff000', slug=slug)
+            for name, slug in (('Обед', 'lunch'), ('Завтрак', 'breakfast'))
+        ]
+        ingredients = [
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('Свёкла', 'Капуста', 'Соль')
+        ]
+        for number in range(10):
+            author = cls.authors[number % 3]
+            recipe = Recipe.objects.create(
+                author=author, name=f'Рецепт {number}', text='Текст',
+                cooking_time=number + 1, image=f'recipe/img/{number}.png')
+            recipe.tags.set(tags[:number % 2 + 1])
+            for ingredient in ingredients[:number % 3 + 1]:
+                RecipeIngredient.objects.create(
+                    recipe=recipe, ingredient=ingredient, amount=number + 1)
+            if number % 2:
+                Favorite.objects.create(owner=cls.viewer, recipe=recipe)
+            if number % 3:
+                ShopCart.objects.create(owner=cls.viewer, recipe=recipe)
+        snapshots.rebuild()
+        # Часть рецептов без снимка: их достраивает LeanRecipeSerializer.
+        Recipe.objects.filter(name__in=('Рецепт 1', 'Рецепт 4')).update(
+            snapshot={})
+        for author in cls.authors:
+            Subscription.objects.create(user=cls.viewer, author=author)
+
+    def setUp(self):
+        cache.clear()
+
+    def request(self, url, user=None):
+        request = Request(APIRequestFactory().get(url))
+        request.user = user or AnonymousUser()
+        return request
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def test_recipes(self):
+        for user in (None, self.viewer, self.authors[0]):
+            for query in ('', '?fields=id,name,author',
+                          '?omit=ingredients,tags', '?fields=is_favorited',
+                          '?fields=image,is_in_shopping_cart'):
+                with self.subTest(user=user, query=query):
+                    request = self.request(f'/api/recipes/{query}', user)
+                    queryset = annotate_user_flags(
+                        Recipe.objects.all(), request.user)
+                    context = {'request': request}
+                    expected = RecipeSerializer(
+                        queryset.prefetch_related('tags', 'ingredients'),
+                        many=True, context=context).data
+                    rows = list(
+                        LeanRecipeSerializer.get_rows(queryset, request))
+                    actual = LeanRecipeSerializer(rows, context).data
+                    self.assertEqual(
+                        self.render(actual), self.render(expected))
+
+    def test_recipe_api_pages(self):
+        self.client.force_authenticate(self.viewer)
+        request = self.request('/api/recipes/', self.viewer)
+        expected = RecipeSerializer(
+            annotate_user_flags(Recipe.objects.all(), self.viewer),
+            many=True, context={'request': request}).data
+        actual = []
+        for page in (1, 2, 3):
+            response = self.client.get(
+                f'/api/recipes/?limit=4&page={page}')
+            actual.extend(response.data['results'])
+        self.assertEqual(self.render(actual), self.render(expected))
+
+    def test_subscriptions(self):
+        for query in ('', '?recipes_limit=1', '?recipes_limit=2',
+                      '?fields=id,recipes_count', '?omit=recipes'):
+            with self.subTest(query=query):
+                request = self.request(
+                    f'/api/users/subscriptions/{query}', self.viewer)
+                context = {'request': request}
+                expected = SubscriptionSerializer(
+                    User.objects.filter(subscribing__user=self.viewer),
+                    many=True, context=context).data
+                rows = LeanSubscriptionSerializer.get_rows(
+                    User.objects.filter(subscribing__user=self.viewer),
+                    request)
+                actual = LeanSubscriptionSerializer(list(rows), context).data
+                self.assertEqual(
+                    self.render(actual), self.render(expected))
+
+    def test_subscription_pages_are_ordered(self):
+        self.client.force_authenticate(self.viewer)
+        request = self.request(
+            '/api/users/subscriptions/?recipes_limit=2', self.viewer)
+        expected = SubscriptionSerializer(
+            User.objects.filter(subscribing__user=self.viewer),
+            many=True, context={'request': request}).data
+        actual = []
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            for page in (1, 2):
+                response = self.client.get(
+                    '/api/users/subscriptions/'
+                    f'?recipes_limit=2&limit=2&page={page}')
+                self.assertEqual(response.status_code, 200)
+                actual.extend(response.data['results'])
+        self.assertEqual(self.render(actual), self.render(expected))
+
+    def test_recipes_limit_in_sql(self):
+        self.client.force_authenticate(self.viewer)
+        self.client.get('/api/users/me/')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                '/api/users/subscriptions/?recipes_limit=1')
+        self.assertEqual(response.status_code, 200)
+        limited = [query['sql'] for query in queries
+                   if 'ROW_NUMBER' in query['sql'].upper()]
+        self.assertEqual(len(limited), 1)
+        for author in response.data['results']:
+            self.assertLessEqual(len(author['recipes']), 1)
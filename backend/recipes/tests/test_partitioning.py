@@ -0,0 +1,141 @@
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TransactionTestCase
+from recipes import partitioning
+from recipes.jobs import refresh_stats
+from recipes.models import (AuthorStats, Favorite, Recipe, ShopCart,
+                            Subscription)
+from recipes.stats import is_populated
+from users.models import User
+
+
+def create_user(name):
+    return User.objects.create_user(
+        email=f'{name}@example.com', username=name,
+        first_name=name.title(), last_name='Cook', password='pw')
+
+
+@skipUnless(connection.vendor == 'postgresql',
+            'Секционирование есть только в PostgreSQL.')
+class PartitioningTests(TransactionTestCase):
+    """Перевод на секции в PostgreSQL; удаления после него работают."""
+
+    def setUp(self):
+        self.author = create_user('author')
+        self.readers = [create_user(f'reader{number}') for number in range(3)]
+        self.recipes = [
+            Recipe.objects.create(
+                author=self.author, name=f'Рецепт {number}', text='Текст',
+                cooking_time=5, image=f'recipe/img/{number}.png')
+            for number in range(3)
+        ]
+
+    def execute(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+
+    def fill(self, model):
+        for reader in self.readers:
+            for recipe in self.recipes[:2]:
+                model.objects.create(owner=reader, recipe=recipe)
+
+    def assertDeletesCascade(self, model):
+        recipe, reader = self.recipes[0].pk, self.readers[0].pk
+        expected = {
+            (owner, recipe_id) for owner, recipe_id
+            in model.objects.values_list('owner_id', 'recipe_id')
+            if owner != reader and recipe_id != recipe
+        }
+        self.recipes[0].delete()
+        self.readers[0].delete()
+        self.assertEqual(
+            set(model.objects.values_list('owner_id', 'recipe_id')),
+            expected)
+
+    def test_changes_during_copy(self):
+        self.fill(Favorite)
+        refresh_stats()
+        partitioning.prepare(Favorite, 4)
+        # Триггер переносит изменения, сделанные до и во время копии.
+        Favorite.objects.create(owner=self.readers[0], recipe=self.recipes[2])
+        Favorite.objects.filter(
+            owner=self.readers[2], recipe=self.recipes[1]).delete()
+        partitioning.copy(Favorite, 2)
+        Favorite.objects.create(owner=self.readers[1], recipe=self.recipes[2])
+        expected = set(Favorite.objects.values_list(
+            'id', 'owner_id', 'recipe_id'))
+        partitioning.swap(Favorite)
+
+        self.assertTrue(partitioning.is_partitioned(Favorite))
+        self.assertFalse(partitioning.table_exists(
+            Favorite._meta.db_table + partitioning.OLD_SUFFIX))
+        self.assertEqual(
+            set(Favorite.objects.values_list('id', 'owner_id', 'recipe_id')),
+            expected)
+        # Последовательность id перешла к новой таблице.
+        favorite = Favorite.objects.create(
+            owner=self.readers[2], recipe=self.recipes[1])
+        self.assertGreater(favorite.pk, max(row[0] for row in expected))
+        # Статистика авторов пересоздана поверх новой таблицы и заполнена.
+        self.assertTrue(is_populated(AuthorStats._meta.db_table))
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).favorites_count,
+            len(expected))
+        # Уникальный индекс на месте: работает REFRESH CONCURRENTLY.
+        refresh_stats()
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).favorites_count,
+            len(expected) + 1)
+        self.assertDeletesCascade(Favorite)
+
+    def test_dependents(self):
+        table = Subscription._meta.db_table
+        self.execute(
+            f'CREATE VIEW follower_counts AS SELECT author_id, count(*) '
+            f'FROM {table} GROUP BY author_id')
+        self.execute(
+            'CREATE VIEW top_authors AS SELECT * FROM follower_counts')
+        self.execute(
+            f'CREATE TABLE subscription_notes (subscription_id integer '
+            f'REFERENCES {table} (id))')
+        self.addCleanup(self.execute, 'DROP TABLE subscription_notes')
+        self.addCleanup(self.execute, 'DROP VIEW follower_counts CASCADE')
+
+        with self.assertRaises(partitioning.DependencyError) as context:
+            partitioning.check_dependents(Subscription)
+        message = str(context.exception)
+        self.assertIn('top_authors', message)
+        self.assertIn('subscription_notes', message)
+        self.assertNotIn('follower_counts поверх', message)
+
+    def test_keep_old(self):
+        self.fill(ShopCart)
+        old = ShopCart._meta.db_table + partitioning.OLD_SUFFIX
+        # Обычное представление тоже переезжает на новую таблицу.
+        self.execute(
+            f'CREATE VIEW shopcart_counts AS SELECT recipe_id, count(*) '
+            f'FROM {ShopCart._meta.db_table} GROUP BY recipe_id')
+        self.addCleanup(self.execute, 'DROP VIEW shopcart_counts')
+        call_command('partition_table', 'shopcart', partitions=4,
+                     batch_size=2, keep_old=True, stdout=StringIO())
+        self.addCleanup(partitioning.drop_old, ShopCart)
+
+        self.assertTrue(partitioning.is_partitioned(ShopCart))
+        self.assertTrue(partitioning.table_exists(old))
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {partitioning.quote(old)}')
+            self.assertEqual(cursor.fetchone()[0], 6)
+        self.assertEqual(ShopCart.objects.count(), 6)
+        ShopCart.objects.create(owner=self.readers[0], recipe=self.recipes[2])
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT recipe_id, count FROM shopcart_counts')
+            self.assertEqual(dict(cursor.fetchall()), {
+                self.recipes[0].pk: 3, self.recipes[1].pk: 3,
+                self.recipes[2].pk: 1,
+            })
+        ShopCart.objects.filter(recipe=self.recipes[2]).delete()
+        # Строки старой таблицы не мешают удалять рецепты и пользователей.
+        self.assertDeletesCascade(ShopCart)
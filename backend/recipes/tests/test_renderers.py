@@ -0,0 +1,130 @@
+import datetime
+import decimal
+import random
+import uuid
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.parsers import ORJSONParser
+from recipes.renderers import ORJSONRenderer
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from users.models import User
+
+DATA = {
+    'ascii': 'text',
+    'unicode': 'Борщ — суп 🍲',
+    'escapes': 'кавычки " \\ \n \t \x00 \x1f',
+    'separators': 'line paragraph ',
+    'html': '<script>&</script>',
+    'lazy': _('Рецепт'),
+    'int': 1,
+    'big': 2 ** 53 + 1,
+    'negative': -7,
+    'float': 0.1,
+    'whole_float': 3.0,
+    'exp': 1e-7,
+    'small': [1.5e-05, -0.00001, 0.0001, 0.00012, 5e-324],
+    'large': [1e16, -1.2345e17, 1e22, 1.7976931348623157e308, 1e15],
+    'numeric_strings': ['1e-7', '0.000015', 'a3e5,', '"1e16"'],
+    'true': True,
+    'false': False,
+    'null': None,
+    'decimal': decimal.Decimal('12.50'),
+    'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'datetime': datetime.datetime(
+        2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+    'aware': timezone.make_aware(datetime.datetime(2024, 5, 1, 12, 30)),
+    'naive': datetime.datetime(2024, 5, 1, 12, 30, 15, 1000),
+    'date': datetime.date(2024, 5, 1),
+    'time': datetime.time(12, 30, 15, 500000),
+    'timedelta': datetime.timedelta(hours=1, seconds=3),
+    'tuple': (1, 'a'),
+    'empty': {'list': [], 'dict': {}, 'string': ''},
+    'nested': [{'id': 1, 'tags': [{'slug': 'breakfast'}]}],
+    1: 'int key',
+}
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    def assertSameOutput(self, data, media_type='application/json'):
+        self.assertEqual(
+            ORJSONRenderer().render(data, media_type),
+            JSONRenderer().render(data, media_type))
+
+    def test_identical_to_drf(self):
+        for key, value in DATA.items():
+            with self.subTest(key=key):
+                self.assertSameOutput({key: value})
+        self.assertSameOutput(DATA)
+
+    def test_top_level_values(self):
+        for value in ([1, 2], 'string', 1, None, [], {}):
+            with self.subTest(value=value):
+                self.assertSameOutput(value)
+
+    def test_floats(self):
+        rng = random.Random(0)
+        values = [
+            rng.uniform(-1, 1) * 10 ** rng.randint(-30, 30)
+            for _ in range(2000)
+        ]
+        self.assertSameOutput(values)
+        self.assertSameOutput({'score': values, 'text': 'e-7'})
+        for value in values[:200]:
+            self.assertSameOutput(value)
+
+    def test_non_finite_floats(self):
+        # DRF в строгом режиме падает, orjson пишет null.
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({'score': float('nan')})
+        self.assertEqual(
+            ORJSONRenderer().render({'score': float('nan')}),
+            b'{"score":null}')
+
+    def test_indent_falls_back_to_drf(self):
+        self.assertSameOutput(DATA, 'application/json; indent=4')
+
+    def test_parser_roundtrip(self):
+        data = {'name': 'Борщ', 'tags': [1, 2], 'ingredients': [
+            {'id': 1, 'amount': 10}], 'text': 'line '}
+        rendered = ORJSONRenderer().render(data)
+
+        class Stream:
+            def read(self):
+                return rendered
+
+        self.assertEqual(ORJSONParser().parse(Stream()), data)
+
+
+class APIRenderingTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            email='cook@example.com', username='cook',
+            first_name='Повар', last_name='Cook', password='pw')
+        tag = Tag.objects.create(
+            name='Завтрак', color='#fff000', slug='breakfast')
+        ingredient = Ingredient.objects.create(
+            name='Свёкла', measurement_unit='г')
+        recipe = Recipe.objects.create(
+            author=author, name='Борщ', text='Текст с переносом',
+            cooking_time=5, image='recipe/img/borsch.png')
+        recipe.tags.add(tag)
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=ingredient, amount=3)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_responses_identical_to_drf(self):
+        for url in ('/api/recipes/', '/api/tags/', '/api/ingredients/',
+                    '/api/users/'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response.content, JSONRenderer().render(response.data))
@@ -0,0 +1,104 @@
+import numpy as np
+from django.test import SimpleTestCase, TestCase, override_settings
+from recipes import similarity, vectors
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            RecipeNeighbor, Tag)
+from users.models import User
+
+# Ингредиенты и теги рецептов: у «Компота» с остальными общие только
+# теги, «Соль» есть почти везде.
+RECIPES = {
+    'Борщ': (('Свёкла', 'Капуста', 'Картофель', 'Соль'), ('Обед',)),
+    'Щи': (('Капуста', 'Картофель', 'Морковь', 'Соль'), ('Обед',)),
+    'Винегрет': (('Свёкла', 'Картофель', 'Морковь', 'Соль'),
+                 ('Обед', 'Ужин')),
+    'Омлет': (('Яйцо', 'Молоко', 'Соль'), ('Завтрак',)),
+    'Сырники': (('Творог', 'Яйцо', 'Мука'), ('Завтрак', 'Ужин')),
+    'Блины': (('Мука', 'Молоко', 'Яйцо', 'Соль'), ('Завтрак',)),
+    'Компот': (('Вишня', 'Сахар'), ('Обед', 'Завтрак')),
+}
+
+
+class SimilarityTests(TestCase):
+    """Пошаговый пересчёт соседей совпадает с полным."""
+
+    def setUp(self):
+        author = User.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Author', last_name='Cook', password='pw')
+        ingredients, tags = {}, {}
+        for name, (ingredient_names, tag_names) in RECIPES.items():
+            recipe = Recipe.objects.create(
+                author=author, name=name, text='Текст', cooking_time=5,
+                image=f'recipe/img/{len(ingredients)}.png')
+            for ingredient in ingredient_names:
+                if ingredient not in ingredients:
+                    ingredients[ingredient] = Ingredient.objects.create(
+                        name=ingredient, measurement_unit='г')
+                RecipeIngredient.objects.create(
+                    recipe=recipe, ingredient=ingredients[ingredient],
+                    amount=1)
+            for tag in tag_names:
+                if tag not in tags:
+                    tags[tag] = Tag.objects.create(
+                        name=tag, color=f'#{len(tags):06d}',
+                        slug=f'tag{len(tags)}')
+                recipe.tags.add(tags[tag])
+        self.recipes = dict(Recipe.objects.values_list('name', 'pk'))
+
+    def neighbors(self):
+        result = {}
+        for recipe, neighbor, score in RecipeNeighbor.objects.order_by(
+                'recipe', 'rank').values_list('recipe', 'neighbor', 'score'):
+            result.setdefault(recipe, []).append((neighbor, round(score, 9)))
+        return result
+
+    def test_update_matches_rebuild(self):
+        for k in (1, 2, 10):
+            with self.subTest(k=k):
+                similarity.rebuild(k=k, processes=1)
+                full = self.neighbors()
+                RecipeNeighbor.objects.all().delete()
+                for pk in self.recipes.values():
+                    similarity.update(pk, k=k)
+                self.assertEqual(self.neighbors(), full)
+
+    def test_neighbors_share_an_ingredient(self):
+        similarity.rebuild(processes=1)
+        neighbors = self.neighbors()
+        self.assertNotIn(self.recipes['Компот'], neighbors)
+        self.assertEqual(neighbors[self.recipes['Борщ']][0][0],
+                         self.recipes['Щи'])
+        self.assertEqual(
+            {neighbor for neighbor, _ in neighbors[self.recipes['Сырники']]},
+            {self.recipes['Омлет'], self.recipes['Блины']})
+
+    def test_chunks_do_not_change_result(self):
+        similarity.rebuild(processes=1)
+        full = self.neighbors()
+        with override_settings(SIMILARITY={
+                'K': 10, 'CHUNK_SIZE': 1000, 'CHUNK_PAIRS': 1,
+                'PROCESSES': 1}):
+            similarity.rebuild(chunk_size=2)
+        self.assertEqual(self.neighbors(), full)
+
+    def test_spawned_processes(self):
+        similarity.rebuild(processes=1)
+        full = self.neighbors()
+        similarity.rebuild(processes=2)
+        self.assertEqual(self.neighbors(), full)
+
+
+class ChunksTests(SimpleTestCase):
+
+    def test_limits(self):
+        pairs = np.array([(1, 1), (1, 2), (2, 1), (3, 1), (3, 3)])
+        _, features, matrix = vectors.tfidf(pairs, 3)
+        ingredients, _ = vectors.split(matrix, features)
+        # Оценки пар по строкам: 4, 3 и 4.
+        self.assertEqual(list(vectors.chunks(ingredients, 10, 7)),
+                         [(0, 2), (2, 3)])
+        self.assertEqual(list(vectors.chunks(ingredients, 1, 100)),
+                         [(0, 1), (1, 2), (2, 3)])
+        self.assertEqual(list(vectors.chunks(ingredients, 10, 1)),
+                         [(0, 1), (1, 2), (2, 3)])
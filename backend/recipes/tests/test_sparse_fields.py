@@ -0,0 +1,114 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipes import snapshots
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShopCart, Tag)
+from rest_framework.test import APIClient, APITestCase
+from users.models import User
+
+# Таблицы связей и аннотаций рецепта.
+RELATED_TABLES = (
+    'RecipeTag', 'recipes_tag', 'recipes_recipeingredient',
+    'recipes_ingredient', 'users_user', 'recipes_subscription',
+    Favorite._meta.db_table, ShopCart._meta.db_table,
+)
+SHORT = 'id,name,image,cooking_time'
+OMIT = 'author,tags,ingredients,is_favorited,is_in_shopping_cart'
+
+
+def create_user(name):
+    return User.objects.create_user(
+        email=f'{name}@example.com', username=name,
+        first_name=name.title(), last_name='Cook', password='pw')
+
+
+class SparseFieldsQueryTests(APITestCase):
+    """?fields= и ?omit= убирают из запросов ненужные связи и аннотации."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        author = create_user('author')
+        tag = Tag.objects.create(name='Обед', color='#000000', slug='lunch')
+        Tag.objects.create(name='Ужин', color='#ffffff', slug='dinner')
+        ingredient = Ingredient.objects.create(
+            name='Соль', measurement_unit='г')
+        cls.recipes = []
+        for number in range(3):
+            recipe = Recipe.objects.create(
+                author=author, name=f'Рецепт {number}', text='Текст',
+                cooking_time=5, image='recipe/img/borsch.png')
+            recipe.tags.add(tag)
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=1)
+            cls.recipes.append(recipe)
+        Favorite.objects.create(owner=cls.reader, recipe=cls.recipes[0])
+        snapshots.rebuild()
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = APIClient()
+        self.reader_client.force_authenticate(self.reader)
+
+    def get(self, client, url, queries):
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(captured), queries, '\n'.join(
+            query['sql'] for query in captured.captured_queries))
+        return response.json(), [
+            query['sql'] for query in captured.captured_queries]
+
+    def assertNoRelations(self, queries):
+        for sql in queries:
+            for table in RELATED_TABLES:
+                self.assertNotIn(f'"{table}"', sql)
+
+    def test_list(self):
+        cases = {
+            f'fields={SHORT}': {'id', 'name', 'image', 'cooking_time'},
+            f'omit={OMIT}': {'id', 'name', 'image', 'cooking_time', 'text'},
+        }
+        for client in (self.client, self.reader_client):
+            for query, fields in cases.items():
+                with self.subTest(query, user=client is self.reader_client):
+                    # COUNT(*) пагинации и одна выборка рецептов.
+                    data, queries = self.get(
+                        client, f'/api/recipes/?{query}', 2)
+                    self.assertNoRelations(queries)
+                    self.assertEqual(len(data['results']), 3)
+                    for item in data['results']:
+                        self.assertEqual(set(item), fields)
+
+    def test_detail(self):
+        url = f'/api/recipes/{self.recipes[0].pk}/'
+        for client in (self.client, self.reader_client):
+            for query in (f'fields={SHORT}', f'omit={OMIT}'):
+                with self.subTest(query, user=client is self.reader_client):
+                    data, queries = self.get(client, f'{url}?{query}', 1)
+                    self.assertNoRelations(queries)
+                    self.assertNotIn('tags', data)
+
+    def test_only_requested_annotation(self):
+        data, queries = self.get(
+            self.reader_client, '/api/recipes/?fields=id,is_favorited', 2)
+        self.assertEqual(
+            {item['id']: item['is_favorited'] for item in data['results']},
+            {recipe.pk: recipe == self.recipes[0] for recipe in self.recipes})
+        self.assertIn(f'"{Favorite._meta.db_table}"', queries[-1])
+        self.assertNotIn(f'"{ShopCart._meta.db_table}"', queries[-1])
+        self.assertNotIn('"RecipeTag"', ''.join(queries))
+
+    def test_tags_filter(self):
+        # Теги читаются только ради ?tags=.
+        data, __ = self.get(
+            self.client, f'/api/recipes/?tags=lunch&fields={SHORT}', 3)
+        self.assertEqual(data['count'], 3)
+        # Тег без рецептов — пустой список, а не ошибка; пустую страницу
+        # выбирать не нужно.
+        data, __ = self.get(
+            self.client, f'/api/recipes/?tags=dinner&fields={SHORT}', 2)
+        self.assertEqual(data['count'], 0)
+        response = self.client.get('/api/recipes/?tags=unknown')
+        self.assertEqual(response.status_code, 400)
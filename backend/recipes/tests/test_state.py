@@ -0,0 +1,69 @@
+from django.core.cache import cache
+from recipes.deletion import delete_objects
+from recipes.models import Favorite, Recipe, ShopCart, Subscription
+from rest_framework.test import APIClient, APITestCase
+from users.models import User
+
+
+def create_user(name):
+    return User.objects.create_user(
+        email=f'{name}@example.com', username=name,
+        first_name=name.title(), last_name='Cook', password='pw')
+
+
+class StateVersionTests(APITestCase):
+    """ETag /users/me/state/ меняется и при каскадном удалении."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = create_user('author')
+        self.reader = create_user('reader')
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Борщ', text='Текст', cooking_time=5,
+            image='recipe/img/borsch.png')
+        Favorite.objects.create(owner=self.reader, recipe=self.recipe)
+        ShopCart.objects.create(owner=self.reader, recipe=self.recipe)
+        Subscription.objects.create(user=self.reader, author=self.author)
+        self.reader_client = APIClient()
+        self.reader_client.force_authenticate(self.reader)
+        self.etag = self.state_etag()
+
+    def state_etag(self):
+        response = self.reader_client.get('/api/users/me/state/')
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def assertStateChanged(self):
+        response = self.reader_client.get(
+            '/api/users/me/state/', HTTP_IF_NONE_MATCH=self.etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], self.etag)
+        return response.data
+
+    def test_unchanged(self):
+        response = self.reader_client.get(
+            '/api/users/me/state/', HTTP_IF_NONE_MATCH=self.etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_recipe_deleted_by_author(self):
+        client = APIClient()
+        client.force_authenticate(self.author)
+        response = client.delete(f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(response.status_code, 204)
+        data = self.assertStateChanged()
+        self.assertEqual(data['favorites'], [])
+        self.assertEqual(data['shopping_cart'], [])
+
+    def test_recipes_deleted_in_batches(self):
+        delete_objects(Recipe.objects.all())
+        self.assertStateChanged()
+
+    def test_author_deleted(self):
+        self.author.delete()
+        data = self.assertStateChanged()
+        self.assertEqual(data['subscriptions'], [])
+
+    def test_author_deleted_in_batches(self):
+        delete_objects(User.objects.filter(pk=self.author.pk))
+        data = self.assertStateChanged()
+        self.assertEqual(data['subscriptions'], [])
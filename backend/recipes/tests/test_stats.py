@@ -0,0 +1,43 @@
+from unittest import skipUnless
+
+from django.db import connection
+from recipes.jobs import refresh_stats
+from recipes.models import Favorite, Recipe, Tag
+from recipes.stats import VIEWS, is_populated
+from rest_framework.test import APITestCase
+from users.models import User
+
+
+@skipUnless(connection.vendor == 'postgresql',
+            'Материализованные представления есть только в PostgreSQL.')
+class StatsTests(APITestCase):
+    """Статистика доступна сразу после миграции и пересчитывается задачей."""
+
+    def test_populated_by_migration(self):
+        for model in VIEWS.values():
+            with self.subTest(view=model._meta.db_table):
+                self.assertTrue(is_populated(model._meta.db_table))
+        for url in ('/api/stats/authors/', '/api/stats/tags/',
+                    '/api/stats/ingredients/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_refresh_job(self):
+        author = User.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Author', last_name='Cook', password='pw')
+        tag = Tag.objects.create(name='Обед', color='#000000', slug='lunch')
+        recipe = Recipe.objects.create(
+            author=author, name='Борщ', text='Текст', cooking_time=30,
+            image='recipe/img/borsch.png')
+        recipe.tags.add(tag)
+        Favorite.objects.create(owner=author, recipe=recipe)
+        refresh_stats()
+        response = self.client.get('/api/stats/authors/')
+        self.assertEqual(response.status_code, 200)
+        rows = response.data['results']
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['recipes_count'], 1)
+        self.assertEqual(rows[0]['favorites_count'], 1)
+        response = self.client.get('/api/stats/tags/')
+        self.assertEqual(response.data[0]['median_cooking_time'], 30)
@@ -0,0 +1,62 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from core.models import Job
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from recipes.jobs import remove_unreferenced_images
+from recipes.models import Recipe
+
+OLD = time.time() - 24 * 60 * 60
+
+
+class HashedStorageTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        override = override_settings(MEDIA_ROOT=media, IMAGE_DELETE_GRACE=60)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.storage = Recipe._meta.get_field('image').storage
+
+    def save(self, content=b'image'):
+        return self.storage.save('recipe/img/a.png', ContentFile(content))
+
+    def age(self, name):
+        os.utime(self.storage.path(name), (OLD, OLD))
+
+    def test_duplicate_refreshes_file(self):
+        name = self.save()
+        self.age(name)
+        self.assertFalse(self.storage.is_recent(name))
+        self.assertEqual(self.save(), name)
+        self.assertTrue(self.storage.is_recent(name))
+
+    def test_removes_old_unreferenced(self):
+        name = self.save()
+        self.age(name)
+        remove_unreferenced_images([name])
+        self.assertFalse(self.storage.exists(name))
+
+    def test_postpones_recent(self):
+        name = self.save()
+        remove_unreferenced_images([name])
+        self.assertTrue(self.storage.exists(name))
+        job = Job.objects.get()
+        self.assertEqual(job.payload, {'names': [name]})
+
+    def test_prune_dry_run(self):
+        old, recent = self.save(b'old'), self.save(b'recent')
+        self.age(old)
+        out = StringIO()
+        call_command('rehash_media', '--prune', '--dry-run', stdout=out)
+        self.assertIn(f'Будет удалён {old}.', out.getvalue())
+        self.assertNotIn(recent, out.getvalue())
+        self.assertTrue(self.storage.exists(old))
+        call_command('rehash_media', '--prune', stdout=StringIO())
+        self.assertFalse(self.storage.exists(old))
+        self.assertTrue(self.storage.exists(recent))
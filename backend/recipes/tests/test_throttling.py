@@ -0,0 +1,96 @@
+from unittest import mock
+
+from django.core.cache import cache
+from recipes.models import Recipe, ShopCart
+from recipes.throttling import SlidingWindowThrottle
+from rest_framework.test import APIClient, APITestCase
+from users.models import User
+
+# Начало окна: shopping_cart — 10 запросов в минуту.
+START = 60 * 1000.0
+
+
+class Clock:
+    def __init__(self):
+        self.now = START
+
+    def __call__(self):
+        return self.now
+
+
+class ThrottleTests(APITestCase):
+    """429 и Retry-After у скачивания списка покупок (лимит 10/m)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='cook@example.com', username='cook',
+            first_name='Cook', last_name='Cook', password='pw')
+        recipe = Recipe.objects.create(
+            author=cls.user, name='Борщ', text='Текст', cooking_time=5,
+            image='recipe/img/borsch.png')
+        ShopCart.objects.create(owner=cls.user, recipe=recipe)
+
+    def setUp(self):
+        cache.clear()
+        self.clock = Clock()
+        patcher = mock.patch.object(SlidingWindowThrottle, 'timer', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user_client = APIClient()
+        self.user_client.force_authenticate(self.user)
+
+    def download(self, at, count=1):
+        self.clock.now = START + at
+        for _ in range(count):
+            response = self.user_client.get(
+                '/api/recipes/download_shopping_cart/')
+        return response
+
+    def retry_after(self, response):
+        self.assertEqual(response.status_code, 429)
+        return int(response['Retry-After'])
+
+    def assertRetryAfterIsExact(self, setup):
+        """Через Retry-After секунд запрос проходит, секундой раньше — нет."""
+        at, response = setup()
+        seconds = self.retry_after(response)
+        self.assertEqual(self.download(at + seconds).status_code, 200)
+        cache.clear()
+        at, response = setup()
+        self.retry_after(self.download(at + seconds - 1))
+        return seconds
+
+    def test_limit_in_one_window(self):
+        def setup():
+            self.assertEqual(self.download(0, count=10).status_code, 200)
+            return 0, self.download(0)
+
+        # Оценка 11 опустится до 10 (с новым запросом) в следующем окне:
+        # 11 * (1 - 11 / 60) + 1 <= 10.
+        self.assertEqual(self.assertRetryAfterIsExact(setup), 71)
+
+    def test_previous_window_weighted(self):
+        def setup():
+            self.download(15, count=7)
+            # Следующее окно, четверть пройдена: прошлые 7 весят 5.25.
+            self.assertEqual(self.download(75, count=4).status_code, 200)
+            return 75, self.download(75)
+
+        self.assertEqual(self.assertRetryAfterIsExact(setup), 11)
+
+    def test_rejected_requests_count(self):
+        self.download(0, count=11)
+        first = self.retry_after(self.download(0))
+        self.assertGreater(self.retry_after(self.download(0)), first)
+
+    def test_other_user_not_limited(self):
+        self.download(0, count=11)
+        other = User.objects.create_user(
+            email='other@example.com', username='other',
+            first_name='Other', last_name='Cook', password='pw')
+        ShopCart.objects.create(owner=other, recipe=Recipe.objects.get())
+        client = APIClient()
+        client.force_authenticate(other)
+        response = client.get('/api/recipes/download_shopping_cart/')
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,91 @@
+import base64
+import io
+
+from django.core.cache import cache
+from PIL import Image
+from recipes.models import Ingredient, Recipe, Tag
+from rest_framework.test import APITestCase
+from users.models import User
+
+
+def png():
+    buffer = io.BytesIO()
+    Image.new('RGB', (1, 1)).save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()).decode()
+
+
+class RecipeWriteQueriesTests(APITestCase):
+    """Число запросов POST и PATCH рецепта не зависит от числа строк.
+
+    Числа одни и те же на SQLite и PostgreSQL (тесты проходят на обеих):
+    пакетные вставки и savepoint — по одному оператору на любой базе.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Author', last_name='Cook', password='pw')
+        self.client.force_authenticate(self.user)
+        self.tags = [
+            Tag.objects.create(
+                name=f'Тег {number}', color=f'#00000{number}',
+                slug=f'tag{number}')
+            for number in range(5)
+        ]
+        self.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(5)
+        ]
+
+    def payload(self, size):
+        return {
+            'name': f'Рецепт из {size}',
+            'text': 'Текст',
+            'cooking_time': 10,
+            'image': png(),
+            'tags': [tag.pk for tag in self.tags[:size]],
+            'ingredients': [
+                {'id': ingredient.pk, 'amount': number + 1}
+                for number, ingredient in enumerate(self.ingredients[:size])
+            ],
+        }
+
+    def post(self, size):
+        response = self.client.post(
+            '/api/recipes/', self.payload(size), format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response
+
+    def patch(self, recipe_id, size):
+        response = self.client.patch(
+            f'/api/recipes/{recipe_id}/', self.payload(size), format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response
+
+    def assertMatchesRead(self, response):
+        cache.clear()
+        read = self.client.get(f'/api/recipes/{response.data["id"]}/')
+        self.assertEqual(response.data, read.data)
+
+    def test_create(self):
+        # Проверка имени, теги, ингредиенты, savepoint, рецепт, связи с
+        # тегами, строки ингредиентов, задача похожих рецептов, release.
+        for size in (1, 5):
+            with self.subTest(size=size), self.assertNumQueries(9):
+                response = self.post(size)
+            self.assertMatchesRead(response)
+
+    def test_update(self):
+        # Рецепт с флагами, проверка имени, теги, ингредиенты, savepoint,
+        # текущие теги, новые связи, удаление и вставка строк
+        # ингредиентов, задача похожих рецептов, старая картинка, рецепт,
+        # release.
+        recipe_id = self.post(1).data['id']
+        for size in (5, 2):
+            with self.subTest(size=size), self.assertNumQueries(13):
+                response = self.patch(recipe_id, size)
+            self.assertMatchesRead(response)
+        self.assertEqual(Recipe.objects.count(), 1)
@@ -0,0 +1,93 @@
+import math
+import time
+
+from django.core.cache import cache as default_cache
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """Ограничение частоты по скользящему окну на общем кеше.
+
+    Счётчики текущего и прошлого окна; прошлое учитывается с весом
+    оставшейся доли окна. Инкремент атомарный (cache.incr), к базе
+    запросов нет. Отклонённые запросы тоже считаются: клиент, который
+    продолжает долбить API, не получит доступ, пока не притормозит.
+    """
+
+    cache = default_cache
+    timer = time.time
+
+    def get_rate(self):
+        # scope без настроенной частоты — ограничения нет.
+        return self.THROTTLE_RATES.get(self.scope)
+
+    def get_scope(self, view):
+        return getattr(view, 'throttle_scopes', {}).get(
+            getattr(view, 'action', None))
+
+    def allow_request(self, request, view):
+        self.scope = self.get_scope(view)
+        if self.scope is None:
+            return True
+        self.rate = self.get_rate()
+        if self.rate is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        self.elapsed = self.now / self.duration - window
+        current_key = f'{self.key}:{window}'
+        try:
+            self.current = self.cache.incr(current_key)
+        except ValueError:
+            if self.cache.add(current_key, 1, 2 * self.duration):
+                self.current = 1
+            else:
+                self.current = self.cache.incr(current_key)
+        self.previous = self.cache.get(f'{self.key}:{window - 1}', 0)
+        return self.estimate() <= self.num_requests
+
+    def estimate(self):
+        return self.previous * (1 - self.elapsed) + self.current
+
+    def wait(self):
+        """Секунды до того, как оценка опустится ниже лимита."""
+        limit = self.num_requests - 1
+        if self.current <= limit and self.previous:
+            # Хватит того, что прошлое окно «уедет» дальше.
+            fraction = 1 - (limit - self.current) / self.previous
+            seconds = (fraction - self.elapsed) * self.duration
+        else:
+            fraction = 1 - limit / self.current
+            seconds = (1 - self.elapsed + fraction) * self.duration
+        return max(1, math.ceil(seconds))
+
+
+class UserActionThrottle(SlidingWindowThrottle):
+    """Лимит на пользователя, для анонимов — на IP.
+
+    Частота — THROTTLE_RATES[scope], scope берётся из
+    view.throttle_scopes по текущему action.
+    """
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        return f'throttle:{self.scope}:{ident}'
+
+
+class IPActionThrottle(SlidingWindowThrottle):
+    """Лимит на IP для всех клиентов: THROTTLE_RATES[f'{scope}_ip']."""
+
+    def get_scope(self, view):
+        scope = super().get_scope(view)
+        return scope and f'{scope}_ip'
+
+    def get_cache_key(self, request, view):
+        return f'throttle:{self.scope}:{self.get_ident(request)}'
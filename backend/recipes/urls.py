@@ -1,7 +1,11 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+from . import async_views
+from .views import (AuthorStatsViewSet, IngredientStatsViewSet,
+                    IngredientViewSet, RecipeViewSet, TagStatsViewSet,
+                    TagViewSet, catalog)
 
 app_name = 'recipes'
 
@@ -9,7 +13,28 @@ router = DefaultRouter()
 router.register('recipes', RecipeViewSet, basename='recipes')
 router.register('ingredients', IngredientViewSet, basename='ingredients')
 router.register('tags', TagViewSet, basename='tags')
+router.register('stats/authors', AuthorStatsViewSet, basename='stats-authors')
+router.register('stats/tags', TagStatsViewSet, basename='stats-tags')
+router.register('stats/ingredients', IngredientStatsViewSet,
+                basename='stats-ingredients')
 
 urlpatterns = [
+    path('catalog/', catalog, name='catalog'),
     path('', include(router.urls)),
 ]
+
+# Асинхронные GET самых нагруженных адресов; подключаются в ASGI-режиме
+# перед обычными маршрутами.
+async_urlpatterns = [
+    path('tags/', async_views.tag_list, name='tags-list-async'),
+    path('ingredients/', async_views.ingredient_list,
+         name='ingredients-list-async'),
+    path('recipes/download_shopping_cart/',
+         async_views.download_shopping_cart,
+         name='recipes-download-shopping-cart-async'),
+    path('recipes/<int:pk>/', async_views.recipe_detail,
+         name='recipes-detail-async'),
+]
+
+if settings.ASGI:
+    urlpatterns = async_urlpatterns + urlpatterns
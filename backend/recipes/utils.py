@@ -1,13 +1,24 @@
 import base64
 
+from core.metrics import action_outcome
+from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.core.files.base import ContentFile
+from django.db import connections
+from django.db.models import Exists, F, OuterRef, Sum, Window
+from django.db.models.functions import RowNumber
 from django.http import Http404
 from django.utils.translation import gettext_lazy as _
 from rest_framework import exceptions, serializers, status
 from rest_framework.generics import get_object_or_404
+from rest_framework.relations import (MANY_RELATION_KWARGS, ManyRelatedField,
+                                      PrimaryKeyRelatedField)
 from rest_framework.response import Response
 
-from .models import RecipeIngredient
+from .models import (Favorite, Ingredient, Recipe, RecipeIngredient, ShopCart,
+                     Subscription)
+
+User = get_user_model()
 
 
 def action_method(self, request, model, pk=None):
@@ -30,19 +41,151 @@ def action_method(self, request, model, pk=None):
                 _(f'Такого рецепта нет в списке {model._meta.verbose_name}.')
             )
         instance.delete()
+        bump_state_version(owner)
+        action_outcome(model, 'deleted')
         return Response(
             _(f'Рецепт успешно удален из списка {model._meta.verbose_name}.'),
             status=status.HTTP_204_NO_CONTENT)
 
     if model.objects.filter(owner=owner, recipe=recipe).exists():
+        action_outcome(model, 'duplicate')
         raise exceptions.ParseError(
             _(f'Рецепт уже в списке {model._meta.verbose_name}.'))
 
     model.objects.create(owner=owner, recipe=recipe)
+    bump_state_version(owner)
+    action_outcome(model, 'created')
     serializer = RecipeListSerializer(recipe)
     return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
+def bump_state_version(user):
+    """Меняет версию избранного, покупок и подписок пользователя."""
+    User.objects.filter(pk=user.pk).update(
+        state_version=F('state_version') + 1)
+
+
+# Владелец строки в списках /users/me/state/.
+STATE_OWNER_FIELDS = {
+    Favorite: 'owner',
+    ShopCart: 'owner',
+    Subscription: 'user',
+}
+
+
+def bump_state_owners(queryset):
+    """Меняет версию владельцам строк избранного, покупок или подписок.
+
+    Вызывается до удаления строк, в том числе каскадного: после него
+    владельцев уже не найти. Один UPDATE с подзапросом.
+    """
+    field = STATE_OWNER_FIELDS[queryset.model]
+    User.objects.filter(
+        pk__in=queryset.order_by().values(f'{field}_id'),
+    ).update(state_version=F('state_version') + 1)
+
+
+def delta_encode(ids):
+    """Сортированные id как первый id и разности соседних."""
+    ids = sorted(ids)
+    return [current - previous for previous, current in zip([0] + ids, ids)]
+
+
+def annotate_user_flags(queryset, user, favorited=True, in_cart=True):
+    """Добавляет рецептам признаки is_fav и is_shop для пользователя."""
+    if user.is_anonymous:
+        return queryset
+    if favorited:
+        queryset = queryset.annotate(is_fav=Exists(
+            Favorite.objects.filter(recipe=OuterRef('pk'), owner=user)))
+    if in_cart:
+        queryset = queryset.annotate(is_shop=Exists(
+            ShopCart.objects.filter(recipe=OuterRef('pk'), owner=user)))
+    return queryset
+
+
+def latest_recipes(author_ids, fields, limit=None):
+    """Рецепты авторов в виде словарей fields, новые первыми.
+
+    limit ограничивает число рецептов каждого автора прямо в SQL: номер
+    рецепта у автора считает row_number(). В Django 3.2 фильтровать по
+    Window нельзя, поэтому запрос с номером оборачивается в подзапрос.
+    """
+    queryset = Recipe.objects.filter(author_id__in=author_ids)
+    if limit is None:
+        return list(queryset.values(*fields))
+    ranked = queryset.annotate(position=Window(
+        RowNumber(),
+        partition_by=[F('author_id')],
+        order_by=[F('pub_date').desc(), F('id').desc()],
+    )).values(*fields, 'position')
+    sql, params = ranked.query.sql_with_params()
+    connection = connections[ranked.db]
+    quote = connection.ops.quote_name
+    columns = ', '.join(
+        quote(Recipe._meta.get_field(field).column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT {columns} FROM ({sql}) ranked '
+            f'WHERE {quote("position")} <= %s '
+            f'ORDER BY {quote("author_id")}, {quote("position")}',
+            (*params, limit))
+        return [dict(zip(fields, row)) for row in cursor.fetchall()]
+
+
+def annotate_is_subscribed(queryset, user):
+    """Добавляет авторам признак is_subscribed для пользователя."""
+    if user.is_anonymous:
+        return queryset
+    return queryset.annotate(is_subscribed=Exists(
+        Subscription.objects.filter(author=OuterRef('pk'), user=user)))
+
+
+def batch_ids(request):
+    """Id объектов пакетного запроса: ?ids=1,2,3 или {"ids": [1, 2, 3]}."""
+    if request.method == 'POST':
+        ids = request.data.get('ids', [])
+    else:
+        ids = request.query_params.get('ids', '')
+    if isinstance(ids, str):
+        ids = [pk for pk in ids.split(',') if pk.strip()]
+    if not isinstance(ids, list) or not ids:
+        raise exceptions.ValidationError(
+            {'ids': _('Передайте список id.')})
+    try:
+        ids = [int(pk) for pk in ids]
+    except (TypeError, ValueError):
+        raise exceptions.ValidationError(
+            {'ids': _('Id должны быть целыми числами.')})
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > settings.BATCH_MAX_SIZE:
+        raise exceptions.ValidationError(
+            {'ids': _('Не больше %(limit)s id за запрос.') % {
+                'limit': settings.BATCH_MAX_SIZE}})
+    return ids
+
+
+def batch_response(ids, found):
+    """Ответ в порядке запроса; отсутствующие id отмечаются в списке."""
+    return Response({
+        'results': [
+            found.get(pk, {'id': pk, 'detail': _('Не найдено.')})
+            for pk in ids
+        ],
+        'missing': [pk for pk in ids if pk not in found],
+    })
+
+
+def shop_cart_ingredients(owner):
+    """Суммы ингредиентов рецептов из списка покупок."""
+    return Ingredient.objects.filter(
+        recipes__shopcarts__owner=owner
+    ).values(
+        'name', 'measurement_unit',
+    ).annotate(
+        amount=Sum('recipe_ingredient__amount'))
+
+
 def ingredient_create(recipe, ingredients):
     """Сохраняет ингредиенты."""
     objs = []
@@ -75,3 +218,46 @@ class Base64ImageField(serializers.ImageField):
             ext = format.split('/')[-1]
             data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
         return super().to_internal_value(data)
+
+
+class BulkManyRelatedField(ManyRelatedField):
+    """Список id, который проверяется одним запросом in_bulk."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        child = self.child_relation
+        pks = []
+        for pk in data:
+            try:
+                pks.append(int(pk))
+            except (TypeError, ValueError):
+                child.fail('incorrect_type', data_type=type(pk).__name__)
+        found = child.get_queryset().in_bulk(pks)
+        for pk in pks:
+            if pk not in found:
+                child.fail('does_not_exist', pk_value=pk)
+        return [found[pk] for pk in pks]
+
+
+class BulkPrimaryKeyRelatedField(PrimaryKeyRelatedField):
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+
+def set_prefetched(instance, name, objects):
+    """Кладёт связанные объекты в кеш prefetch_related экземпляра."""
+    queryset = getattr(instance, name).get_queryset()
+    queryset._result_cache = list(objects)
+    queryset._prefetch_done = True
+    instance._prefetched_objects_cache = {
+        **getattr(instance, '_prefetched_objects_cache', {}),
+        name: queryset,
+    }
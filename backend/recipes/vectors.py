@@ -0,0 +1,110 @@
+"""TF-IDF векторы рецептов и их близости.
+
+Модуль не зависит от Django: recipes.similarity запускает его функции в
+дочерних процессах (spawn), где приложения не настроены.
+"""
+import numpy as np
+from scipy import sparse
+
+# Матрицы для neighbors в дочернем процессе, см. init.
+_ingredients = None
+_tags = None
+
+
+def tfidf(pairs, n_docs, df=None):
+    """Нормированная TF-IDF матрица рецептов (строки) по признакам.
+
+    pairs — уникальные пары (id рецепта, признак), признак тега
+    отрицательный. TF бинарный: ингредиент или тег либо есть в рецепте,
+    либо нет. df по умолчанию считается по самим pairs.
+    Возвращает (id рецептов, признаки, матрица CSR).
+    """
+    recipes, rows = np.unique(pairs[:, 0], return_inverse=True)
+    features, cols = np.unique(pairs[:, 1], return_inverse=True)
+    if df is None:
+        df = np.bincount(cols).astype(np.float64)
+    idf = np.log((1 + n_docs) / (1 + df)) + 1
+    matrix = sparse.csr_matrix(
+        (idf[cols], (rows, cols)), shape=(len(recipes), len(features)))
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return recipes, features, (sparse.diags(1 / norms) @ matrix).tocsr()
+
+
+def split(matrix, features):
+    """Делит столбцы матрицы на ингредиенты и теги."""
+    tags = features < 0
+    return (matrix[:, np.flatnonzero(~tags)].tocsr(),
+            matrix[:, np.flatnonzero(tags)].tocsr())
+
+
+def chunks(ingredients, chunk_size, max_pairs):
+    """Границы порций строк для neighbors.
+
+    В порции не больше chunk_size строк и не больше max_pairs пар
+    рецептов с общим ингредиентом (оценка сверху по частоте
+    ингредиентов), так что память не растёт из-за популярных
+    ингредиентов вроде соли.
+    """
+    binary = ingredients.copy()
+    binary.data[:] = 1
+    df = np.asarray(binary.sum(axis=0)).ravel()
+    costs = binary @ df
+    start = total = 0
+    for row, cost in enumerate(costs):
+        if row > start and (
+                row - start >= chunk_size or total + cost > max_pairs):
+            yield start, row
+            start, total = row, 0
+        total += cost
+    if start < len(costs):
+        yield start, len(costs)
+
+
+def similarities(ingredients, tags, start, stop):
+    """Близости строк start:stop к рецептам с общим ингредиентом (CSR).
+
+    Разреженное произведение считается только по ингредиентам: теги
+    есть почти у каждого рецепта, и с ними порция была бы плотной —
+    строки на все рецепты. Вклад тегов в косинус добавляется лишь в
+    найденных ячейках.
+    """
+    product = (ingredients[start:stop] @ ingredients.T).tocsr()
+    if tags.shape[1] and product.nnz:
+        rows = start + np.repeat(
+            np.arange(stop - start), np.diff(product.indptr))
+        product.data += np.asarray(
+            tags[rows].multiply(tags[product.indices]).sum(axis=1)).ravel()
+    return product
+
+
+def top_k(similarities, k, exclude):
+    """Лучшие k соседей каждой строки CSR-матрицы близостей.
+
+    exclude[i] — столбец самого рецепта строки i.
+    """
+    for i in range(similarities.shape[0]):
+        start, stop = similarities.indptr[i], similarities.indptr[i + 1]
+        columns = similarities.indices[start:stop]
+        scores = similarities.data[start:stop]
+        mask = (columns != exclude[i]) & (scores > 0)
+        columns, scores = columns[mask], scores[mask]
+        if len(scores) > k:
+            best = np.argpartition(-scores, k)[:k]
+            columns, scores = columns[best], scores[best]
+        order = np.lexsort((columns, -scores))
+        yield columns[order], scores[order]
+
+
+def init(ingredients, tags):
+    """Инициализатор процесса: матрицы передаются в него один раз."""
+    global _ingredients, _tags
+    _ingredients, _tags = ingredients, tags
+
+
+def neighbors(task):
+    """Соседи строк порции (start, stop, k) матриц из init."""
+    start, stop, k = task
+    return start, list(top_k(
+        similarities(_ingredients, _tags, start, stop),
+        k, range(start, stop)))
@@ -1,29 +1,61 @@
+import hashlib
+
+from core.cache import request_key
+from core.serializers import requested_fields
 from django.contrib.auth import get_user_model
-from django.db.models import Exists, OuterRef, Sum
 from django.http import Http404, HttpResponse
+from django.utils.http import parse_etags, quote_etag
 from django.utils.translation import gettext_lazy as _
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import (decorators, exceptions, filters, permissions,
                             status, viewsets)
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
+from . import caching
+from .catalog import manifest
 from .filters import RecipeFilter
-from .models import Favorite, Ingredient, Recipe, ShopCart, Subscription, Tag
+from .models import (AuthorStats, Favorite, Ingredient, IngredientStats,
+                     Recipe, RecipeNeighbor, ShopCart, Subscription, Tag,
+                     TagStats)
 from .permissions import IsAuthorOrReadOnly
-from .serializers import (IngredientSerializer, RecipeSerializer,
+from .serializers import (AuthorStatsSerializer, IngredientSerializer,
+                          IngredientStatsSerializer, LeanRecipeSerializer,
+                          LeanSubscriptionSerializer, RecipeSerializer,
                           RecipeWriteSerializer, SubscriptionSerializer,
-                          TagSerializer)
-from .utils import action_method, shop_cart
+                          TagSerializer, TagStatsSerializer, image_url)
+from .throttling import IPActionThrottle, UserActionThrottle
+from .utils import (action_method, annotate_user_flags, batch_ids,
+                    batch_response, bump_state_version, delta_encode,
+                    shop_cart, shop_cart_ingredients)
 
 User = get_user_model()
 
 
+@decorators.api_view(['GET'])
+@decorators.permission_classes([permissions.AllowAny])
+def catalog(request):
+    """Адреса текущих снимков каталога (recipes.catalog)."""
+    return Response({
+        name: {**entry, 'url': request.build_absolute_uri(entry['url'])}
+        for name, entry in manifest().items()
+    }, headers={'Cache-Control': 'no-cache'})
+
+
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
     filter_backends = (filters.SearchFilter,)
     search_fields = ('^name',)
+    throttle_classes = (UserActionThrottle, IPActionThrottle)
+    throttle_scopes = {'list': 'ingredient_search'}
+
+    def list(self, request, *args, **kwargs):
+        search = request.query_params.get(api_settings.SEARCH_PARAM, '')
+        return Response(caching.ingredients.get(
+            hashlib.sha256(search.lower().encode()).hexdigest(),
+            lambda: super(IngredientViewSet, self).list(request).data))
 
 
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
@@ -31,6 +63,31 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = TagSerializer
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        return Response(caching.tags.get(
+            'list', lambda: super(TagViewSet, self).list(request).data))
+
+
+class AuthorStatsViewSet(viewsets.ReadOnlyModelViewSet):
+    """Статистика из материализованных представлений (refresh_stats)."""
+
+    queryset = AuthorStats.objects.select_related('author')
+    serializer_class = AuthorStatsSerializer
+    permission_classes = (permissions.AllowAny,)
+
+
+class TagStatsViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = TagStats.objects.select_related('tag')
+    serializer_class = TagStatsSerializer
+    permission_classes = (permissions.AllowAny,)
+    pagination_class = None
+
+
+class IngredientStatsViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = IngredientStats.objects.select_related('ingredient')
+    serializer_class = IngredientStatsSerializer
+    permission_classes = (permissions.AllowAny,)
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.select_related(
@@ -42,28 +99,85 @@ class RecipeViewSet(viewsets.ModelViewSet):
     permission_classes = (IsAuthorOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    throttle_classes = (UserActionThrottle, IPActionThrottle)
+    throttle_scopes = {
+        'create': 'recipe_create',
+        'download_shopping_cart': 'shopping_cart',
+    }
 
     def get_queryset(self):
-        current_user = self.request.user
-        queryset = super().get_queryset()
-        if current_user.is_anonymous:
-            return queryset
-
-        favorite = Favorite.objects.filter(
-            recipe=OuterRef('pk'), owner=current_user)
-        shopcart = ShopCart.objects.filter(
-            recipe=OuterRef('pk'), owner=current_user)
-        return (queryset.annotate(is_fav=Exists(favorite)
-                                  ).annotate(is_shop=Exists(shopcart)))
+        # Связи и аннотации только для запрошенных полей (?fields=, ?omit=).
+        fields = requested_fields(self.request, RecipeSerializer.Meta.fields)
+        queryset = Recipe.objects.all()
+        if 'author' in fields:
+            queryset = queryset.select_related('author')
+        prefetch = [name for name in ('ingredients', 'tags') if name in fields]
+        # Ответ на запись собирается из записанных данных.
+        if prefetch and self.action not in ('update', 'partial_update'):
+            queryset = queryset.prefetch_related(*prefetch)
+        return annotate_user_flags(
+            queryset,
+            self.request.user,
+            favorited='is_favorited' in fields,
+            in_cart='is_in_shopping_cart' in fields,
+        )
 
     def get_serializer_class(self):
         if self.action in ('create', 'update', 'partial_update'):
             return RecipeWriteSerializer
         return RecipeSerializer
 
+    def list(self, request, *args, **kwargs):
+        # Страницы для анонимов одинаковы у всех — из кеша.
+        if request.user.is_anonymous:
+            return Response(caching.recipe_lists.get(
+                request_key(request), self.list_data))
+        return Response(self.list_data())
+
+    def list_data(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(
+            LeanRecipeSerializer.get_rows(queryset, self.request))
+        serializer = LeanRecipeSerializer(
+            page, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data).data
+
+    def retrieve(self, request, pk=None):
+        if not pk.isdigit():
+            raise exceptions.NotFound()
+        if request.user.is_anonymous:
+            return Response(caching.recipe_detail.get(
+                request_key(request), lambda: self.detail_data(pk), group=pk))
+        return Response(self.detail_data(pk))
+
+    def detail_data(self, pk):
+        # Строка рецепта со снимком и флагами пользователя, без JOIN.
+        rows = list(LeanRecipeSerializer.get_rows(
+            self.filter_queryset(self.get_queryset()).filter(pk=pk),
+            self.request))
+        if not rows:
+            raise exceptions.NotFound()
+        serializer = LeanRecipeSerializer(
+            rows, context=self.get_serializer_context())
+        return serializer.data[0]
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @decorators.action(['get', 'post'],
+                       detail=False,
+                       permission_classes=[permissions.AllowAny])
+    def batch(self, request):
+        ids = batch_ids(request)
+        rows = list(LeanRecipeSerializer.get_rows(
+            self.get_queryset().filter(pk__in=ids), request))
+        serializer = LeanRecipeSerializer(
+            rows, context=self.get_serializer_context())
+        found = {
+            row['id']: item for row, item in zip(rows, serializer.data)
+        }
+        return batch_response(ids, found)
+
     @decorators.action(detail=False,
                        permission_classes=[permissions.IsAuthenticated])
     def download_shopping_cart(self, request):
@@ -73,13 +187,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 {_('Список покупок пуст.')},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        ingredients = Ingredient.objects.filter(
-            recipes__shopcarts__owner=owner
-        ).values(
-            'name', 'measurement_unit',
-        ).annotate(
-            amount=Sum('recipe_ingredient__amount'))
-
+        ingredients = shop_cart_ingredients(owner)
         response = HttpResponse(
             content_type='text/plain',
             headers={
@@ -88,6 +196,26 @@ class RecipeViewSet(viewsets.ModelViewSet):
         response.writelines(shop_cart(ingredients))
         return response
 
+    @decorators.action(detail=True,
+                       permission_classes=[permissions.AllowAny])
+    def similar(self, request, pk=None):
+        """Похожие рецепты из RecipeNeighbor — один запрос по индексу."""
+        if not pk.isdigit():
+            raise exceptions.NotFound()
+        fields = ('id', 'name', 'image', 'cooking_time', 'score')
+        rows = list(RecipeNeighbor.objects.filter(
+            recipe_id=pk,
+        ).order_by('rank').values_list(
+            'neighbor_id', 'neighbor__name', 'neighbor__image',
+            'neighbor__cooking_time', 'score'))
+        if not rows and not Recipe.objects.filter(pk=pk).exists():
+            raise exceptions.NotFound()
+        get_url = image_url(request)
+        data = [dict(zip(fields, row)) for row in rows]
+        for item in data:
+            item['image'] = get_url(item['image'])
+        return Response(data)
+
     @decorators.action(['post', 'delete'],
                        detail=True,
                        permission_classes=[permissions.IsAuthenticated])
@@ -104,17 +232,59 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
 
 class SubscriptionViewSet():
+    @decorators.action(['get', 'post'],
+                       detail=False,
+                       permission_classes=[permissions.AllowAny])
+    def batch(self, request):
+        ids = batch_ids(request)
+        users = list(self.get_queryset().filter(pk__in=ids))
+        serializer = self.get_serializer(users, many=True)
+        found = {
+            user.id: item for user, item in zip(users, serializer.data)
+        }
+        return batch_response(ids, found)
+
     @decorators.action(['get'],
                        detail=False,
                        permission_classes=[permissions.IsAuthenticated])
     def subscriptions(self, request):
         subscribers = self.queryset.filter(subscribing__user=request.user)
-        page = self.paginate_queryset(subscribers)
-        serializer = SubscriptionSerializer(
-            page, many=True, context={'request': request}
+        page = self.paginate_queryset(
+            LeanSubscriptionSerializer.get_rows(subscribers, request))
+        serializer = LeanSubscriptionSerializer(
+            page, context={'request': request}
         )
         return self.get_paginated_response(serializer.data)
 
+    @decorators.action(['get'],
+                       detail=False,
+                       url_path='me/state',
+                       permission_classes=[permissions.IsAuthenticated])
+    def state(self, request):
+        """Id избранного, покупок и авторов в подписках пользователя.
+
+        Списки закодированы разностями (delta_encode); ETag меняется
+        вместе с User.state_version при каждой записи.
+        """
+        user = request.user
+        version = User.objects.filter(pk=user.pk).values_list(
+            'state_version', flat=True).get()
+        etag = quote_etag(f'{user.pk}-{version}')
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers=headers)
+        return Response({
+            'version': version,
+            'encoding': 'delta',
+            'favorites': delta_encode(
+                user.favorites.values_list('recipe_id', flat=True)),
+            'shopping_cart': delta_encode(
+                user.shopcarts.values_list('recipe_id', flat=True)),
+            'subscriptions': delta_encode(
+                user.subscribers.values_list('author_id', flat=True)),
+        }, headers=headers)
+
     @decorators.action(['post', 'delete'],
                        detail=True,
                        permission_classes=[permissions.IsAuthenticated])
@@ -130,6 +300,7 @@ class SubscriptionViewSet():
             try:
                 subscribe = Subscription.objects.get(user=user, author=author)
                 subscribe.delete()
+                bump_state_version(user)
                 return Response({_('Успешная отписка.')},
                                 status=status.HTTP_204_NO_CONTENT)
             except Subscription.DoesNotExist:
@@ -144,6 +315,8 @@ class SubscriptionViewSet():
                 _('Нельзя подписаться на самого себя!')
             )
         Subscription.objects.create(user=user, author=author)
+        bump_state_version(user)
+        author.is_subscribed = True
         serializer = SubscriptionSerializer(
             author, context={'request': request}
         )
@@ -1,6 +1,8 @@
+from core.admin_tools import EstimatedCountPaginator, export_csv
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.utils.translation import gettext_lazy as _
+from recipes.admin import delete_in_batches
 
 from .models import User
 
@@ -57,6 +59,11 @@ class CustomUserAdmin(UserAdmin):
         'admin',
     )
     search_fields = ('email', 'username')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = (export_csv('id', 'email', 'username', 'first_name',
+                          'last_name', 'date_joined'),
+               delete_in_batches)
 
 
 admin.site.register(User, CustomUserAdmin)
@@ -6,3 +6,6 @@ class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
     verbose_name = _('Пользователи')
+
+    def ready(self):
+        from . import signals  # noqa: F401
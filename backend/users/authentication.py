@@ -0,0 +1,60 @@
+from core.metrics import cache_lookup
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+
+
+def token_cache_key(key):
+    return f'auth:token:{key}'
+
+
+def invalidate_token(key):
+    cache.delete(token_cache_key(key))
+
+
+# Поля снимка: нужные аутентификации, правам и /users/me/. Пароль и
+# прочие поля в кеш не попадают и при обращении читаются из базы.
+# state_version меняется через update() в обход кеша и тоже не хранится,
+# чтобы save() у пользователя из кеша его не затирал.
+SNAPSHOT_FIELDS = (
+    'id', 'email', 'username', 'first_name', 'last_name',
+    'is_active', 'is_staff', 'is_superuser', 'admin',
+)
+
+
+def user_snapshot(user):
+    # Model.from_db ждёт значения в порядке полей модели.
+    return {
+        field.attname: getattr(user, field.attname)
+        for field in User._meta.concrete_fields
+        if field.attname in SNAPSHOT_FIELDS
+    }
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без запроса к базе на каждый запрос.
+
+    Снимок пользователя хранится в кеше AUTH_TOKEN_CACHE_TTL секунд
+    и сбрасывается сигналами users.signals.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        snapshot = cache.get(cache_key)
+        cache_lookup('auth_token', snapshot is not None)
+        if snapshot is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(cache_key, user_snapshot(user),
+                      settings.AUTH_TOKEN_CACHE_TTL)
+            return user, token
+
+        user = User.from_db(
+            DEFAULT_DB_ALIAS, list(snapshot), list(snapshot.values()))
+        token = Token(key=key, user=user)
+        token._state.adding = False
+        return user, token
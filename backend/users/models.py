@@ -26,6 +26,11 @@ class User(AbstractUser):
         verbose_name=_('статус администратора'),
         default=False,
     )
+    state_version = models.PositiveIntegerField(
+        verbose_name=_('версия избранного, покупок и подписок'),
+        default=0,
+        editable=False,
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
@@ -1,3 +1,4 @@
+from core.serializers import SparseFieldsMixin
 from django.contrib.auth import get_user_model
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework.exceptions import NotAuthenticated
@@ -5,7 +6,9 @@ from rest_framework.exceptions import NotAuthenticated
 User = get_user_model()
 
 
-class CustomUserSerializer(UserSerializer):
+class CustomUserSerializer(SparseFieldsMixin, UserSerializer):
+    extra_output_fields = ('is_subscribed',)
+
     class Meta:
         model = User
         fields = (
@@ -21,9 +24,13 @@ class CustomUserSerializer(UserSerializer):
             raise NotAuthenticated()
         rep = super().to_representation(instance)
         cu = self.context.get('request').user
-        if instance.id is not cu.id and not cu.is_anonymous:
-            rep['is_subscribed'] = \
-                instance.subscribing.filter(user=cu).exists()
+        if ('is_subscribed' in self.output_fields
+                and instance.id is not cu.id and not cu.is_anonymous):
+            # Аннотация из UserViewSet.get_queryset избавляет от запроса.
+            subscribed = getattr(instance, 'is_subscribed', None)
+            if subscribed is None:
+                subscribed = instance.subscribing.filter(user=cu).exists()
+            rep['is_subscribed'] = subscribed
         return rep
 
 
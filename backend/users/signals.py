@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_token
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Выход через djoser удаляет токен."""
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, **kwargs):
+    """Смена пароля, блокировка, изменение флага admin и профиля."""
+    invalidate_tokens(list(Token.objects.filter(
+        user_id=instance.pk).values_list('key', flat=True)))
+
+
+def invalidate_tokens(keys):
+    """Сбрасывает снимки после фиксации транзакции.
+
+    Иначе параллельный запрос успел бы закешировать ещё не изменённую
+    строку, и заблокированный пользователь или удалённый токен работали
+    бы до истечения AUTH_TOKEN_CACHE_TTL.
+    """
+    def invalidate():
+        for key in keys:
+            invalidate_token(key)
+    if keys:
+        transaction.on_commit(invalidate)
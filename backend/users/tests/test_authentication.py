@@ -0,0 +1,51 @@
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from users.authentication import SNAPSHOT_FIELDS, token_cache_key
+from users.models import User
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='cook@example.com', username='cook',
+            first_name='Cook', last_name='Cook', password='pw')
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_snapshot_has_no_secrets(self):
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        snapshot = cache.get(token_cache_key(self.token.key))
+        self.assertEqual(set(snapshot), set(SNAPSHOT_FIELDS))
+        self.assertNotIn('password', snapshot)
+
+    def test_cached_user(self):
+        self.client.get('/api/users/me/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/users/me/')
+        self.assertEqual(response.json()['email'], self.user.email)
+
+    def test_invalidated_on_commit(self):
+        self.client.get('/api/users/me/')
+        with self.captureOnCommitCallbacks() as callbacks:
+            User.objects.filter(pk=self.user.pk).update(is_active=False)
+            self.user.is_active = False
+            self.user.save()
+            # До фиксации снимок на месте: его нельзя заменить старой
+            # строкой, прочитанной параллельным запросом.
+            self.assertIsNotNone(cache.get(token_cache_key(self.token.key)))
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(cache.get(token_cache_key(self.token.key)))
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    def test_logout(self):
+        self.client.get('/api/users/me/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(
+                self.client.post('/api/auth/token/logout/').status_code, 204)
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
@@ -1,6 +1,9 @@
 from djoser.views import UserViewSet as DjoserViewSet
+from recipes.utils import annotate_is_subscribed
 from recipes.views import SubscriptionViewSet
 
 
 class UserViewSet(DjoserViewSet, SubscriptionViewSet):
-    pass
+    def get_queryset(self):
+        return annotate_is_subscribed(
+            super().get_queryset(), self.request.user)